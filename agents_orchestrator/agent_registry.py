@@ -5,6 +5,16 @@ import yaml
 from crewai import Agent, LLM
 import os
 
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.hierarchical_index import HierarchicalIndex
+from shared.keyword_index import KeywordIndex
+from shared.knowledge_parser import iter_knowledge, record_text
+from shared.semantic_index import SemanticIndex
+from shared.text_normalizer import normalize_text
+from shared.uf_lookup import UF_NAMES
+
+KNOWLEDGE_ROUTING_FIELDS = ['TEMA', 'SECAO', 'TOPICO', 'TAGS', 'DESCRICAO DETALHADA']
+
 class AgentRegistry:
     def __init__(self, config_path: str = "config/agents_control.yaml"):
         self.base_dir = Path(__file__).parent
@@ -14,9 +24,23 @@ class AgentRegistry:
         self.agents_cache: Dict[str, Agent] = {}
         self.agents_config: Dict[str, dict] = {}
         self.active_agents: List[str] = []
+        self.global_config: dict = {}
+        self.routing_config: dict = {}
+        self.keyword_index: Optional[KeywordIndex] = None
+        self.semantic_index: Optional[SemanticIndex] = None
+        self.hierarchical_index: Optional[HierarchicalIndex] = None
+        self.context_map: Dict[str, str] = {}
         
         self._load_global_config()
         self._load_agents_config()
+        self._build_keyword_index()
+        self._build_context_map()
+        
+        routing_mode = self.routing_config.get('mode', 'keyword')
+        if routing_mode == 'semantic':
+            self._build_semantic_index()
+        elif routing_mode == 'hierarchical':
+            self._build_hierarchical_index()
         
         print(f"✅ AgentRegistry: {len(self.active_agents)} agente(s) ativo(s)")
     
@@ -32,6 +56,7 @@ class AgentRegistry:
             
             self.active_agents = config.get('active_agents', [])
             self.global_config = config.get('global_config', {})
+            self.routing_config = config.get('routing_config', {}) or {}
             
         except Exception as e:
             print(f"❌ Erro ao carregar config: {e}")
@@ -56,6 +81,62 @@ class AgentRegistry:
             except Exception as e:
                 print(f"  ❌ Erro em {agent_id}: {e}")
     
+    def _build_keyword_index(self):
+        index = KeywordIndex(weights=self.routing_config.get('keyword_weights'))
+        
+        for agent_id in self.active_agents:
+            index.add_agent(agent_id, self.get_agent_keyword_groups(agent_id))
+        
+        self.keyword_index = index.build()
+    
+    def _build_context_map(self):
+        context_map = {}
+        
+        for agent_id in self.active_agents:
+            config = self.agents_config.get(agent_id, {})
+            for alias in [agent_id] + list(config.get('api_contexts', []) or []):
+                context_map[self._context_key(alias)] = agent_id
+        
+        self.context_map = context_map
+    
+    @staticmethod
+    def _context_key(value: str) -> str:
+        return str(value).strip().lower().replace('-', '_')
+    
+    def resolve_agent_id(self, identifier: Optional[str]) -> Optional[str]:
+        """Converte um ID de agente ou agent_context do frontend em um agente ativo."""
+        if not identifier:
+            return None
+        
+        agent_id = self.context_map.get(self._context_key(identifier))
+        if agent_id not in self.get_all_agent_ids():
+            return None
+        return agent_id
+    
+    def _build_semantic_index(self):
+        semantic_config = self.routing_config.get('semantic', {}) or {}
+        embedder = HashedNgramEmbedder(dim=semantic_config.get('dim', 1024))
+        index = SemanticIndex(embedder, semantic_config.get('source_weights'))
+        max_records = semantic_config.get('max_knowledge_records', 500)
+        
+        for agent_id in self.active_agents:
+            knowledge = []
+            knowledge_path = self.get_agent_knowledge_path(agent_id)
+            if knowledge_path:
+                for record in iter_knowledge(knowledge_path):
+                    knowledge.append(record_text(record, KNOWLEDGE_ROUTING_FIELDS))
+                    if len(knowledge) >= max_records:
+                        break
+            
+            index.add_agent(agent_id, {
+                'description': [self.get_agent_description(agent_id)],
+                'keywords': self.get_agent_keywords(agent_id),
+                'knowledge': knowledge
+            })
+        
+        self.semantic_index = index.build()
+        print(f"  ✅ Índice semântico: {len(index.agent_ids)} agente(s)")
+    
     def get_agent(self, agent_id: str) -> Optional[Agent]:
         if agent_id not in self.active_agents:
             print(f"⚠️  Agente '{agent_id}' não está ativo")
@@ -84,7 +165,8 @@ class AgentRegistry:
                 model=llm_config.get('model', 'gemini/gemini-2.0-flash-exp'),
                 temperature=llm_config.get('temperature', 0.7),
                 max_tokens=llm_config.get('max_tokens', 1200),
-                top_p=llm_config.get('top_p', 0.8)
+                top_p=llm_config.get('top_p', 0.8),
+                **({'stream': True} if llm_config.get('stream') else {})
             )
             
             agent = Agent(
@@ -110,11 +192,79 @@ class AgentRegistry:
     def get_agent_config(self, agent_id: str) -> Optional[dict]:
         return self.agents_config.get(agent_id)
     
-    def get_agent_keywords(self, agent_id: str) -> List[str]:
+    def _build_hierarchical_index(self):
+        hierarchical_config = self.routing_config.get('hierarchical', {}) or {}
+        index = HierarchicalIndex(weights=self.routing_config.get('keyword_weights'))
+        
+        for agent_id in self.active_agents:
+            index.add_agent(
+                agent_id,
+                self.get_agent_category(agent_id),
+                self.get_agent_uf(agent_id),
+                self.get_agent_keyword_groups(agent_id)
+            )
+        
+        for category, keywords in (hierarchical_config.get('category_keywords', {}) or {}).items():
+            index.add_category_keywords(category, keywords)
+        
+        self.hierarchical_index = index.build()
+        print(f"  ✅ Índice hierárquico: {len(index.branches)} ramo(s)")
+    
+    def get_agent_category(self, agent_id: str) -> str:
+        config = self.agents_config.get(agent_id, {})
+        category = config.get('category') or (config.get('metadata', {}) or {}).get('category', '')
+        return normalize_text(str(category)).replace(' ', '_') or 'geral'
+    
+    def get_agent_uf(self, agent_id: str) -> Optional[str]:
+        config = self.agents_config.get(agent_id, {})
+        uf = (config.get('metadata', {}) or {}).get('uf') or config.get('uf')
+        if uf:
+            return str(uf).upper()
+        
+        suffix = agent_id.rsplit('_', 1)[-1].upper()
+        if '_' in agent_id and suffix in UF_NAMES:
+            return suffix
+        return None
+    
+    def get_agent_description(self, agent_id: str) -> str:
         config = self.agents_config.get(agent_id, {})
-        routing = config.get('routing_keywords', {})
+        agent_config = config.get('agent_config', {}) or {}
         
-        primary = routing.get('primary', [])
-        secondary = routing.get('secondary', [])
+        parts = [
+            config.get('agent_name', ''),
+            config.get('description', ''),
+            agent_config.get('role', ''),
+            agent_config.get('goal', '')
+        ]
+        return "\n".join(str(part).strip() for part in parts if part)
+    
+    def get_agent_knowledge_path(self, agent_id: str) -> Optional[Path]:
+        rag_config = self.agents_config.get(agent_id, {}).get('rag_config', {}) or {}
+        knowledge_path = rag_config.get('knowledge_path')
+        
+        if not knowledge_path:
+            return None
         
-        return primary + secondary
+        path = (self.base_dir / knowledge_path).resolve()
+        return path if path.exists() else None
+    
+    def get_agent_vectorstore_path(self, agent_id: str) -> Optional[Path]:
+        rag_config = self.agents_config.get(agent_id, {}).get('rag_config', {}) or {}
+        vectorstore_path = rag_config.get('vectorstore_path')
+        
+        if not vectorstore_path:
+            return None
+        return (self.base_dir / vectorstore_path).resolve()
+    
+    def get_agent_keyword_groups(self, agent_id: str) -> Dict[str, List[str]]:
+        config = self.agents_config.get(agent_id, {})
+        routing = config.get('routing_keywords', {}) or {}
+        
+        return {
+            'primary': routing.get('primary', []) or [],
+            'secondary': routing.get('secondary', []) or []
+        }
+    
+    def get_agent_keywords(self, agent_id: str) -> List[str]:
+        groups = self.get_agent_keyword_groups(agent_id)
+        return groups['primary'] + groups['secondary']
@@ -1,20 +1,33 @@
 ﻿"""Agent Router."""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Tuple
 
+from shared.lru_cache import LRUCache
+from shared.text_normalizer import normalize_text
+
 @dataclass
 class RoutingResult:
     primary_agent: str
     confidence: float
     reasoning: str
+    ranking: List[Tuple[str, float]] = field(default_factory=list)
 
 class AgentRouter:
     def __init__(self, registry):
         self.registry = registry
-        print("✅ AgentRouter inicializado")
+        self.mode = registry.routing_config.get('mode', 'keyword')
+        self.min_score = registry.routing_config.get('min_score', 0.1)
+        
+        if self.mode == 'semantic':
+            semantic_config = registry.routing_config.get('semantic', {}) or {}
+            self.min_score = semantic_config.get('min_score', 0.05)
+        
+        cache_config = registry.routing_config.get('cache', {}) or {}
+        self.cache = LRUCache(cache_config.get('max_size', 10000))
+        
+        print(f"✅ AgentRouter inicializado (modo: {self.mode})")
     
     def route(self, query: str, context: dict = None) -> RoutingResult:
-        query_lower = query.lower()
         active_agents = self.registry.get_all_agent_ids()
         
         if not active_agents:
@@ -28,40 +41,126 @@ class AgentRouter:
             return RoutingResult(
                 primary_agent=active_agents[0],
                 confidence=1.0,
-                reasoning=f"Único agente: {active_agents[0]}"
+                reasoning=f"Único agente: {active_agents[0]}",
+                ranking=[(active_agents[0], 1.0)]
             )
         
-        scores = []
+        key = self._cache_key(query)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._route_uncached(query, active_agents)
+            self.cache.put(key, result)
+        return result
+    
+    def route_batch(self, queries: List[str]) -> List[RoutingResult]:
+        """Roteia várias consultas; duplicatas e hits de cache são pontuados uma vez só.
+
+        Nos modos keyword e semantic as consultas novas são pontuadas juntas
+        (uma passada do automato / uma multiplicação de matrizes); o modo
+        hierárquico ainda pontua consulta a consulta.
+        """
+        active_agents = self.registry.get_all_agent_ids()
+        if len(active_agents) <= 1:
+            return [self.route(query) for query in queries]
+        
+        keys = [self._cache_key(query) for query in queries]
+        resolved = {}
+        pending = {}
         
-        for agent_id in active_agents:
-            keywords = self.registry.get_agent_keywords(agent_id)
-            score = self._calculate_keyword_score(query_lower, keywords)
-            scores.append((agent_id, score))
+        for key, query in zip(keys, queries):
+            if key in resolved or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                pending[key] = query
+            else:
+                resolved[key] = cached
         
-        scores.sort(key=lambda x: x[1], reverse=True)
+        if pending and self.mode != 'hierarchical':
+            rankings = self.rank_batch(list(pending.values()))
+            computed = [self._result_from_ranking(ranking, active_agents) for ranking in rankings]
+        else:
+            computed = [self._route_uncached(query, active_agents) for query in pending.values()]
         
-        best_agent, best_score = scores[0]
+        for key, result in zip(pending, computed):
+            self.cache.put(key, result)
+            resolved[key] = result
         
-        if best_score < 0.1:
+        return [resolved[key] for key in keys]
+    
+    def get_cache_stats(self) -> dict:
+        return self.cache.stats()
+    
+    def _cache_key(self, query: str) -> str:
+        # No modo hierárquico a caixa importa ("MG" é sigla, "para" não é "Pará").
+        if self.mode == 'hierarchical':
+            return " ".join(query.split())
+        return normalize_text(query).rstrip("?!. ")
+    
+    def _route_uncached(self, query: str, active_agents: List[str]) -> RoutingResult:
+        if self.mode == 'hierarchical':
+            return self._route_hierarchical(query, active_agents)
+        return self._result_from_ranking(self.rank(query), active_agents)
+    
+    def _result_from_ranking(self, ranking: List[Tuple[str, float]], active_agents: List[str]) -> RoutingResult:
+        best_agent, best_score = ranking[0]
+        
+        if best_score < self.min_score:
             return RoutingResult(
                 primary_agent=active_agents[0],
                 confidence=0.5,
-                reasoning=f"Fallback para {active_agents[0]}"
+                reasoning=f"Fallback para {active_agents[0]}",
+                ranking=ranking
             )
         
         return RoutingResult(
             primary_agent=best_agent,
             confidence=min(best_score, 1.0),
-            reasoning=f"Match: {best_score:.2f}"
+            reasoning=f"Match: {best_score:.2f}",
+            ranking=ranking
         )
     
-    def _calculate_keyword_score(self, query: str, keywords: List[str]) -> float:
-        if not keywords:
-            return 0.0
+    def _route_hierarchical(self, query: str, active_agents: List[str]) -> RoutingResult:
+        category, uf, ranking = self.registry.hierarchical_index.rank(query)
+        branch = f"{category}/{uf}" if uf else f"{category}"
         
-        matches = 0
-        for keyword in keywords:
-            if keyword.lower() in query:
-                matches += 1
+        if not ranking:
+            return RoutingResult(
+                primary_agent=active_agents[0],
+                confidence=0.5,
+                reasoning=f"Fallback para {active_agents[0]} (categoria não identificada)",
+                ranking=ranking
+            )
+        
+        best_agent, best_score = ranking[0]
+        
+        if best_score < self.min_score:
+            return RoutingResult(
+                primary_agent=best_agent,
+                confidence=0.5,
+                reasoning=f"Ramo {branch}: fallback para {best_agent}",
+                ranking=ranking
+            )
         
-        return matches / len(keywords)
+        return RoutingResult(
+            primary_agent=best_agent,
+            confidence=min(best_score, 1.0),
+            reasoning=f"Ramo {branch}: match {best_score:.2f}",
+            ranking=ranking
+        )
+    
+    def rank(self, query: str) -> List[Tuple[str, float]]:
+        """Pontua todos os agentes ativos em uma única passada sobre a consulta."""
+        if self.mode == 'semantic':
+            return self.registry.semantic_index.rank(query)
+        if self.mode == 'hierarchical':
+            return self.registry.hierarchical_index.rank(query)[2]
+        return self.registry.keyword_index.rank(query)
+    
+    def rank_batch(self, queries: List[str]) -> List[List[Tuple[str, float]]]:
+        if self.mode == 'semantic':
+            return self.registry.semantic_index.rank_batch(queries)
+        return self.registry.keyword_index.rank_batch(queries)
+    
+    def get_routing_suggestions(self, query: str, top_n: int = 3) -> List[Tuple[str, float]]:
+        return self.route(query).ranking[:top_n]
@@ -0,0 +1,156 @@
+﻿"""Gera/atualiza os índices vetoriais a partir de knowledge/<agente>/*.txt.
+
+Uso:
+    python build_indices.py                  # todos os agentes
+    python build_indices.py --agent irpj_csll
+    python build_indices.py --force          # reindexa tudo (o cache de embeddings continua valendo)
+    python build_indices.py --no-cache       # não usa o cache de embeddings
+    python build_indices.py --quantize ivf_pq --eval-recall   # índice comprimido + recall@k
+    python build_indices.py --unified        # um só índice, particionado por agente
+    python build_indices.py --segments --agent carf   # índice BM25 em segmentos (só acrescenta)
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR))
+
+from shared.embedding_cache import CachedEmbedder, EmbeddingCache
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.index_builder import IndexBuilder
+from shared.knowledge_parser import iter_knowledge
+from shared.quantized_index import INDEX_TYPES, QUANTIZE_FASTER_FROM, QuantizedIndex, evaluate
+from shared.segment_index import SegmentedIndex
+from shared.vector_store import UNIFIED_INDEX, VectorStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Construção incremental dos índices vetoriais")
+    parser.add_argument("--agent", action="append", dest="agents",
+                        help="Agente a indexar (pode repetir). Padrão: todos em --knowledge-dir")
+    parser.add_argument("--knowledge-dir", default=str(BASE_DIR / "knowledge"))
+    parser.add_argument("--output-dir", default=str(BASE_DIR / "vectorstore_indices"))
+    parser.add_argument("--dim", type=int, default=1024, help="Dimensão do embedding")
+    parser.add_argument("--force", action="store_true", help="Ignora o índice anterior e reembute tudo")
+    parser.add_argument("--cache", default=str(BASE_DIR / "vectorstore_indices" / "embeddings.sqlite"),
+                        help="Arquivo SQLite do cache de embeddings compartilhado entre agentes")
+    parser.add_argument("--cache-max-entries", type=int, default=200_000)
+    parser.add_argument("--no-cache", action="store_true", help="Desativa o cache de embeddings")
+    parser.add_argument("--unified", action="store_true",
+                        help=f"Gera um índice único em <output-dir>/{UNIFIED_INDEX}/ com uma partição por agente")
+    parser.add_argument("--segments", action="store_true",
+                        help="Acrescenta o conhecimento ao índice em segmentos <output-dir>/<agente>/segments/ "
+                             "(registros com [ID] já indexado são ignorados)")
+    parser.add_argument("--quantize", choices=INDEX_TYPES,
+                        help="Também treina o índice comprimido (IVF + int8/PQ) de cada agente")
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="Listas IVF (padrão: raiz do nº de chunks, com ao menos 39 chunks por lista)")
+    parser.add_argument("--pq-m", type=int, default=None,
+                        help="Subespaços do PQ (precisa dividir --dim; padrão: --dim / 8)")
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--rerank", type=int, default=100)
+    parser.add_argument("--eval-recall", type=int, nargs="?", const=10, metavar="K",
+                        help="Mede recall@K do índice comprimido contra a busca completa")
+    return parser.parse_args()
+
+
+def quantize(args, index_dir: Path):
+    store = VectorStore.load(index_dir)
+    params = {"nlist": args.nlist}
+    if args.quantize == "ivf_pq":
+        params["pq_m"] = args.pq_m
+
+    start = time.perf_counter()
+    index = QuantizedIndex.load_or_train(store.path, store.vectors, args.quantize,
+                                         store.manifest.get("built_at", ""), **params)
+    print(f"     🗜️  {args.quantize}: {index.nlist} listas, {index.nbytes / 2 ** 20:.2f} MB "
+          f"(float32: {store.vectors.nbytes / 2 ** 20:.2f} MB, {store.vectors.nbytes / index.nbytes:.1f}x) "
+          f"em {time.perf_counter() - start:.2f}s")
+    if store.num_chunks < QUANTIZE_FASTER_FROM:
+        print(f"     ℹ️  Com menos de {QUANTIZE_FASTER_FROM} chunks a busca completa já é tão rápida quanto "
+              "a comprimida; o ganho aqui é só de memória")
+
+    if args.eval_recall:
+        store.attach_quantized(index, args.nprobe, args.rerank)
+        queries = [record.get("TOPICO") or record.get("TEMA", "") for record in store.records[:200]]
+        report = evaluate(store, [query for query in queries if query], top_k=args.eval_recall)
+        print("     📏 " + ", ".join(f"{key}={value}" for key, value in report.items()))
+
+
+def main() -> int:
+    args = parse_args()
+    knowledge_dir = Path(args.knowledge_dir)
+    output_dir = Path(args.output_dir)
+
+    if not knowledge_dir.is_dir():
+        print(f"❌ Diretório de conhecimento não encontrado: {knowledge_dir}")
+        return 1
+
+    agents = args.agents or sorted(p.name for p in knowledge_dir.iterdir() if p.is_dir())
+    embedder = HashedNgramEmbedder(dim=args.dim)
+    cache = None if args.no_cache else EmbeddingCache(args.cache, args.cache_max_entries)
+    builder = IndexBuilder(CachedEmbedder(embedder, cache) if cache is not None else embedder)
+
+    print("\n" + "="*70)
+    print(f"📚 INDEXAÇÃO: {len(agents)} agente(s)")
+    print("="*70)
+
+    start = time.perf_counter()
+    failures = 0
+
+    sources = {}
+    for agent_id in agents:
+        agent_knowledge = knowledge_dir / agent_id
+        if not agent_knowledge.is_dir():
+            print(f"⚠️  {agent_id}: sem diretório de conhecimento")
+            failures += 1
+            continue
+        sources[agent_id] = agent_knowledge
+
+    if args.segments:
+        for agent_id, agent_knowledge in sources.items():
+            index = SegmentedIndex(output_dir / agent_id / "segments")
+            added = index.append(iter_knowledge(agent_knowledge))
+            while index.merge_once():
+                pass
+            stats = index.stats()
+            print(f"  ✅ {agent_id}: +{added} documentos → {stats['documents']} em "
+                  f"{stats['segments']} segmento(s), {stats['disk_mb']} MB")
+        jobs = []
+    elif args.unified:
+        jobs = [(UNIFIED_INDEX, lambda: builder.build_partitioned(
+            sources, output_dir / UNIFIED_INDEX, force=args.force))]
+    else:
+        jobs = [(agent_id, lambda agent_id=agent_id: builder.build(
+            agent_id, sources[agent_id], output_dir / agent_id, force=args.force)) for agent_id in sources]
+
+    for name, build in jobs:
+        try:
+            stats = build()
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            failures += 1
+            continue
+
+        if stats.status == "up_to_date":
+            print(f"  ✅ {name}: atualizado ({stats.records} registros)")
+        else:
+            print(f"  ✅ {name}: {stats.records} registros, {stats.chunks} chunks "
+                  f"({stats.embedded} embutidos, {stats.reused} reaproveitados) em {stats.seconds:.2f}s")
+
+        if args.quantize and stats.chunks:
+            quantize(args, output_dir / name)
+
+    print("="*70)
+    if cache is not None:
+        stats = cache.stats()
+        print(f"💾 Cache de embeddings: {stats['hits']} acertos, {stats['misses']} novos, {stats['size']} vetores")
+        cache.close()
+    print(f"✅ Concluído em {time.perf_counter() - start:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+"""Configuração do pytest: testes automatizados ficam em tests/.
+
+Rodar a partir de agents_orchestrator/ com ``python -m pytest -q tests``.
+Os testes que sobem o Flask/CrewAI são pulados se as dependências não
+estiverem instaladas.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Scripts manuais que dependem do servidor rodando em localhost:5000.
+collect_ignore = ["test_sistema.py", "test_system_mvp.py"]
@@ -1,11 +1,15 @@
 ﻿"""Orchestrator Modular."""
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from crewai import Crew, Process, Task
 from pathlib import Path
-import sys, os, yaml
+import sys, os, json, yaml
 from dotenv import load_dotenv
 from datetime import datetime
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
+import time
 import traceback
 
 BASE_DIR = Path(__file__).parent
@@ -14,6 +18,20 @@ load_dotenv()
 
 from agent_registry import AgentRegistry
 from agent_router import AgentRouter
+from shared.index_prefetcher import IndexPrefetcher
+from shared.job_manager import CANCELLED, JobLimitError, JobManager
+from shared.latency_budget import LatencyBudget, PrimaryStream, race
+from shared.metrics import LatencyStats
+from shared.response_cache import ResponseCache, TemplateVersion, create_backend, normalize_query
+from shared.crew_executor import CrewExecutor, ExecutionTiming, QueueFullError
+from shared.fan_out import merge_replies, plan_sub_questions, select_agents
+from shared.faq_index import FaqIndexes
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.retriever import KnowledgeRetriever, RetrievalResult
+from shared.semantic_cache import SemanticCache, canonical_query
+from shared.single_flight import SingleFlight
+from shared.streaming import kickoff, split_tokens, sse
+from shared.temporal_index import parse_date
 
 api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 if not api_key:
@@ -31,10 +49,70 @@ print("="*70)
 
 registry = AgentRegistry()
 router = AgentRouter(registry)
+prefetch_config = registry.global_config.get('index_prefetch', {}) or {}
+retriever = KnowledgeRetriever(registry, prefetch_config.get('window_seconds', 900))
+prefetcher = IndexPrefetcher(
+    retriever,
+    interval_seconds=prefetch_config.get('interval_seconds', 60),
+    top_n=prefetch_config.get('top_n', 5)
+)
+if prefetch_config.get('enabled', False):
+    prefetcher.start()
+
+template_versions = TemplateVersion(registry.agents_dir)
+response_cache_config = registry.global_config.get('response_cache', {}) or {}
+response_cache = None
+if response_cache_config.get('enabled', False):
+    try:
+        response_cache = ResponseCache(
+            create_backend(response_cache_config, BASE_DIR),
+            template_versions,
+            ttl_seconds=response_cache_config.get('ttl_seconds', 86400)
+        )
+        print(f"✅ Cache de respostas: {type(response_cache.backend).__name__}")
+    except Exception as e:
+        print(f"⚠️  Cache de respostas desabilitado: {e}")
+
+semantic_cache_config = registry.global_config.get('semantic_cache', {}) or {}
+semantic_cache = None
+if semantic_cache_config.get('enabled', False):
+    semantic_cache = SemanticCache(
+        HashedNgramEmbedder(dim=semantic_cache_config.get('dim', 1024)),
+        max_entries=semantic_cache_config.get('max_entries', 5000),
+        max_age_seconds=semantic_cache_config.get('max_age_seconds', 86400)
+    )
+
+faq_indexes = FaqIndexes(registry, HashedNgramEmbedder())
+for agent_id in registry.get_all_agent_ids():
+    if faq_indexes.settings(agent_id):
+        faq_indexes.get(agent_id)
+single_flight = SingleFlight() if (registry.global_config.get('single_flight', {}) or {}).get('enabled', True) else None
+executor_config = registry.global_config.get('crew_executor', {}) or {}
+agent_concurrency = dict(executor_config.get('agent_concurrency', {}) or {})
+crew_executor = CrewExecutor(
+    max_workers=executor_config.get('max_workers', 8),
+    queue_depth=executor_config.get('queue_depth', 32),
+    default_agent_limit=agent_concurrency.pop('default', None),
+    agent_limits=agent_concurrency
+)
+jobs_config = registry.global_config.get('jobs', {}) or {}
+job_manager = JobManager(
+    max_workers=jobs_config.get('max_workers', 4),
+    ttl_seconds=jobs_config.get('ttl_seconds', 3600),
+    max_pending=jobs_config.get('max_pending', 1000)
+)
+latency = LatencyStats(window=registry.global_config.get('metrics_window', 1000))
 
 print(f"✅ Registry: {len(registry.get_all_agent_ids())} agente(s)")
 print("="*70 + "\n")
 
+TASK_MAP = {
+    "padrao": "consulta_padrao",
+    "simples": "consulta_simples",
+    "rapida": "resposta_rapida",
+    "edape": "analise_edape"
+}
+
 def load_agent_tasks(agent_id: str) -> dict:
     tasks_file = BASE_DIR / "agents" / agent_id / "tasks.yaml"
     
@@ -48,29 +126,77 @@ def load_agent_tasks(agent_id: str) -> dict:
         print(f"⚠️  Erro ao carregar tasks: {e}")
         return {}
 
-def execute_crew_with_agent(agent_id: str, query: str, task_type: str = "padrao") -> dict:
+def check_task_map() -> dict:
+    """{agente: tasks do TASK_MAP ausentes no tasks.yaml}; sem a task, o task_type cai no prompt genérico."""
+    missing = {}
+    for agent_id in registry.get_all_agent_ids():
+        tasks = load_agent_tasks(agent_id) or {}
+        absent = [task_name for task_name in TASK_MAP.values() if task_name not in tasks]
+        if absent:
+            missing[agent_id] = absent
+            print(f"⚠️  {agent_id}: tasks.yaml sem {', '.join(absent)} (usa o prompt genérico)")
+    return missing
+
+check_task_map()
+
+def semantic_cache_settings(agent_id: str) -> dict:
+    """Bloco ``semantic_cache`` do config.yaml do agente ({} se desabilitado)."""
+    if semantic_cache is None:
+        return {}
+    config = (registry.get_agent_config(agent_id) or {}).get('semantic_cache', {}) or {}
+    return config if config.get('enabled', False) else {}
+
+def answer_from_faq(agent_id: str, query: str, task_type: str, filters: dict = None,
+                    reference_date: str = None, any_task_type: bool = False):
+    """Resposta pronta do FAQ para ``rapida``/``simples`` (None se não houver match confiável)."""
+    if filters:
+        return None
+    start = time.perf_counter()
+    match = faq_indexes.match(agent_id, query, task_type, reference_date, any_task_type)
+    if match is None:
+        return None
+    print(f"📋 FAQ: {match.record_id} (confiança {match.confidence:.2f})")
+    return {
+        "status": "success",
+        "reply": match.reply,
+        "agent_used": agent_id,
+        "confidence": match.confidence,
+        "timestamp": datetime.now().isoformat(),
+        "faq": {"faq_record": match.record_id, "faq_margin": match.margin},
+        "retrieval": {
+            "retrieval_ms": round((time.perf_counter() - start) * 1000, 3),
+            "retrieved_records": [match.record_id],
+            "retrieval_filters": None,
+            "retrieval_partitions": None,
+            "reference_date": reference_date
+        }
+    }
+
+def execute_crew_with_agent(agent_id: str, query: str, task_type: str = "padrao",
+                            filters: dict = None, reference_date: str = None, on_chunk=None) -> dict:
     try:
         agent = registry.get_agent(agent_id)
         if not agent:
             return {"status": "error", "reply": f"Agente '{agent_id}' indisponível"}
         
         agent_tasks = load_agent_tasks(agent_id)
-        
-        task_map = {
-            "padrao": "consulta_padrao",
-            "simples": "consulta_simples",
-            "rapida": "resposta_rapida"
-        }
-        
-        task_name = task_map.get(task_type, "consulta_padrao")
+        task_name = TASK_MAP.get(task_type, "consulta_padrao")
         task_config = agent_tasks.get(task_name, {})
         
+        retrieval = RetrievalResult()
+        if retriever.is_enabled(agent_id):
+            retrieval = retriever.retrieve(agent_id, query, filters=filters, reference_date=reference_date)
+            print(f"📚 Contexto: {len(retrieval.record_ids)} registro(s) em {retrieval.latency_ms:.2f} ms")
+        
         if not task_config:
             task_description = f'''
 CONSULTA TRIBUTÁRIA
 
 Pergunta: {query}
 
+CONTEXTO DA BASE DE CONHECIMENTO:
+{retrieval.context or "N/A"}
+
 INSTRUÇÕES:
 - 3-5 parágrafos fluidos
 - Seção "Fundamentação:" ao final
@@ -79,7 +205,7 @@ INSTRUÇÕES:
         else:
             task_description = task_config.get('description', '').format(
                 query=query,
-                retrieved_context="",
+                retrieved_context=retrieval.context or "N/A",
                 additional_context=""
             )
         
@@ -91,7 +217,7 @@ INSTRUÇÕES:
         
         print(f"🔄 Executando crew: '{agent_id}'...")
         crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
-        result = crew.kickoff()
+        result = kickoff(crew, on_chunk)
         response_text = str(result).strip()
         print(f"✅ Resposta: {len(response_text)} chars")
         
@@ -100,7 +226,14 @@ INSTRUÇÕES:
             "reply": response_text,
             "agent_used": agent_id,
             "confidence": 0.90,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "retrieval": {
+                "retrieval_ms": retrieval.latency_ms,
+                "retrieved_records": retrieval.record_ids,
+                "retrieval_filters": retrieval.filters,
+                "retrieval_partitions": retrieval.partitions,
+                "reference_date": retrieval.reference_date
+            }
         }
     except Exception as e:
         print(f"❌ Erro: {e}")
@@ -135,43 +268,710 @@ def list_agents():
         "agents": agents_list
     })
 
-@app.route("/api/chat", methods=["POST"])
-def chat():
+@app.route("/api/route", methods=["POST"])
+def route_query():
     try:
-        data = request.get_json()
-        query = data.get("prompt", "").strip()
-        task_type = data.get("task_type", "padrao")
-        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Corpo da requisição deve ser um objeto JSON"}), 400
+        query = data.get("query", "")
+        if not isinstance(query, str):
+            return jsonify({"error": "Campo 'query' deve ser um texto"}), 400
+        query = query.strip()
         if not query:
-            return jsonify({"error": "Campo 'prompt' obrigatório"}), 400
+            return jsonify({"error": "Campo 'query' obrigatório"}), 400
         
-        print(f"\n{'='*70}")
-        print(f"📝 Consulta: {query[:50]}...")
-        print(f"{'='*70}")
+        result = router.route(query)
         
-        routing = router.route(query)
-        print(f"🎯 Agente: {routing.primary_agent}")
+        return jsonify({
+            "primary_agent": result.primary_agent,
+            "confidence": result.confidence,
+            "reasoning": result.reasoning,
+            "suggestions": [{"agent": agent, "score": score} for agent, score in result.ranking[:3]]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/route/batch", methods=["POST"])
+def route_batch():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Corpo da requisição deve ser um objeto JSON"}), 400
+        queries = data.get("queries")
+        max_batch_size = registry.routing_config.get('max_batch_size', 5000)
         
-        result = execute_crew_with_agent(routing.primary_agent, query, task_type)
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "Campo 'queries' obrigatório (lista)"}), 400
+        if len(queries) > max_batch_size:
+            return jsonify({"error": f"Máximo de {max_batch_size} consultas por lote"}), 400
+        if not all(isinstance(query, str) and query.strip() for query in queries):
+            return jsonify({"error": "Todas as consultas devem ser textos não vazios"}), 400
         
-        if result["status"] == "error":
-            return jsonify(result), 500
+        results = router.route_batch([query.strip() for query in queries])
         
         return jsonify({
-            "reply": result["reply"],
-            "sessionId": None,
-            "timestamp": result["timestamp"],
-            "model": f"crewai-{result['agent_used']}",
-            "metadata": {
-                "agent_used": result["agent_used"],
-                "confidence": result["confidence"]
-            }
+            "total": len(results),
+            "results": [
+                {
+                    "index": index,
+                    "primary_agent": result.primary_agent,
+                    "confidence": result.confidence,
+                    "reasoning": result.reasoning,
+                    "suggestions": [{"agent": agent, "score": score} for agent, score in result.ranking[:3]]
+                }
+                for index, result in enumerate(results)
+            ],
+            "cache": router.get_cache_stats()
         })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def parse_chat_request(data: dict) -> dict:
+    """Valida o corpo de uma consulta; ValueError com a mensagem para o cliente."""
+    if not isinstance(data, dict):
+        raise ValueError("Corpo da requisição deve ser um objeto JSON")
+    
+    query = data.get("prompt", "")
+    task_type = data.get("task_type", "padrao")
+    filters = data.get("filters")
+    reference_date = data.get("reference_date")
+    
+    if not isinstance(query, str):
+        raise ValueError("Campo 'prompt' deve ser um texto")
+    query = query.strip()
+    if not query:
+        raise ValueError("Campo 'prompt' obrigatório")
+    
+    if not isinstance(task_type, str):
+        raise ValueError("Campo 'task_type' deve ser um texto")
+    if task_type not in TASK_MAP:
+        raise ValueError(f"task_type desconhecido: '{task_type}' (válidos: {', '.join(TASK_MAP)})")
+    
+    agent_context = data.get("agent_context")
+    if agent_context is not None and not isinstance(agent_context, str):
+        raise ValueError("Campo 'agent_context' deve ser um texto")
+    
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("Campo 'filters' deve ser um objeto {campo: valor}")
+    
+    if reference_date is not None:
+        parse_date(str(reference_date))
+        reference_date = str(reference_date)
+    
+    return {
+        "query": query,
+        "task_type": task_type,
+        "filters": filters,
+        "reference_date": reference_date
+    }
+
+def dispatch_agent(query: str, agent_id: str = None, agent_context: str = None):
+    """(agent_id, metadados do despacho): agente pedido pelo cliente ou escolhido pelo router."""
+    if agent_id is None:
+        agent_id = registry.resolve_agent_id(agent_context)
+    
+    if agent_id:
+        print(f"🎯 Agente (direto): {agent_id}")
+        return agent_id, {"dispatch": "direct"}
+    
+    routing = router.route(query)
+    print(f"🎯 Agente: {routing.primary_agent}")
+    return routing.primary_agent, routed_dispatch(routing)
+
+def routed_dispatch(routing) -> dict:
+    return {
+        "dispatch": "routed",
+        "routing_confidence": routing.confidence,
+        "routing_reasoning": routing.reasoning
+    }
+
+def latency_budget(agent_id: str, task_type: str) -> LatencyBudget:
+    task_config = load_agent_tasks(agent_id).get(TASK_MAP.get(task_type, "consulta_padrao"), {}) or {}
+    return LatencyBudget.from_config(registry.global_config.get('latency_budgets', {}) or {}, task_type, task_config)
+
+def execute_with_budget(agent_id: str, query: str, task_type: str, filters: dict, reference_date: str,
+                        on_chunk, store):
+    """Crew sob o orçamento de latência do task_type. Retorna (resultado, timing, caminho, metadados).
+
+    Caminhos: ``crew`` (chamada principal), ``hedge`` (cópia disparada quando a
+    principal passou do percentil configurado), ``faq_fallback`` / ``task_fallback``
+    (prazo estourado) ou ``deadline`` (erro 504). Respostas que chegam depois do
+    prazo ainda vão para os caches via ``store``.
+    """
+    budget = latency_budget(agent_id, task_type)
+    stats_key = f"crew_call:{agent_id}:{task_type}"
+    deadline_ms = budget.deadline_seconds * 1000 if budget.deadline_seconds else None
+    stream = PrimaryStream(on_chunk) if on_chunk is not None else None
+    sample_once = threading.Lock()
+    
+    def record_primary(elapsed_ms: float):
+        # Uma amostra por pedido, da chamada principal; quem passa do prazo
+        # entra como o próprio prazo para o percentil do hedge não ficar otimista.
+        if sample_once.acquire(blocking=False):
+            latency.record(stats_key, elapsed_ms if deadline_ms is None else min(elapsed_ms, deadline_ms))
+    
+    def on_primary_done(future):
+        if future.exception() is None:
+            crew_result, timing = future.result()
+            if crew_result.get("status") == "success":
+                record_primary(timing.queue_wait_ms + timing.execution_ms)
+    
+    def submit(primary: bool):
+        future = crew_executor.submit(agent_id, lambda: execute_crew_with_agent(
+            agent_id, query, task_type, filters, reference_date, stream.forward if primary and stream else None))
+        if primary:
+            future.add_done_callback(on_primary_done)
+        return future
+    
+    def store_late(future):
+        if future.exception() is None:
+            store(future.result()[0])
+    
+    hedge_delay = budget.hedge_delay(latency.samples(stats_key), lambda q: latency.percentile(stats_key, q))
+    outcome = race(submit, budget, hedge_delay, stream, accept=lambda value: value[0]["status"] == "success")
+    if outcome.path == "deadline":
+        record_primary(deadline_ms)
+    for future in outcome.pending:
+        future.add_done_callback(store_late)
+    
+    info = {
+        "deadline_seconds": budget.deadline_seconds,
+        "hedged": outcome.hedged,
+        "deadline_exceeded": outcome.path == "deadline"
+    }
+    if outcome.path != "deadline":
+        crew_result, timing = outcome.value
+        # Grava antes de liberar quem está esperando: pedidos que chegam
+        # logo depois já encontram a resposta no cache.
+        store(crew_result)
+        if outcome.hedged:
+            print(f"🏁 Hedge disparado após {hedge_delay:.1f}s; venceu: {outcome.path}")
+        return crew_result, timing, "crew" if outcome.path == "primary" else "hedge", info
+    
+    print(f"⏱️  Prazo de {budget.deadline_seconds}s excedido ({task_type}): {agent_id}")
+    faq_result = answer_from_faq(agent_id, query, task_type, filters, reference_date, any_task_type=True)
+    if faq_result is not None:
+        return faq_result, ExecutionTiming(), "faq_fallback", info
+    
+    fallback = budget.fallback_task_type
+    if fallback and fallback != task_type:
+        try:
+            future = crew_executor.submit(agent_id, lambda: execute_crew_with_agent(
+                agent_id, query, fallback, filters, reference_date))
+            crew_result, timing = future.result(timeout=budget.fallback_seconds)
+            if crew_result["status"] == "success":
+                return crew_result, timing, "task_fallback", {**info, "fallback_task_type": fallback}
+        except (QueueFullError, FuturesTimeout):
+            pass
+    
+    return {
+        "status": "error",
+        "error": f"Tempo limite de {budget.deadline_seconds}s excedido",
+        "http_status": 504
+    }, ExecutionTiming(), "deadline", info
+
+def resolve_answer(agent_id: str, query: str, task_type: str = "padrao", filters: dict = None,
+                   reference_date: str = None, on_chunk=None):
+    """FAQ -> cache exato -> cache semântico -> crew. Retorna (resultado, metadados da resposta)."""
+    start = time.perf_counter()
+    coalesced = False
+    timing = ExecutionTiming()
+    budget_info = {}
+    result = answer_from_faq(agent_id, query, task_type, filters, reference_date)
+    answered_by = "faq" if result is not None else None
+    
+    cache_key = None
+    cache_type = None
+    cache_info = {}
+    if result is None and response_cache is not None:
+        cache_key = response_cache.key(agent_id, task_type, query, filters=filters, reference_date=reference_date)
+        result = response_cache.get(cache_key)
+        if result is not None:
+            cache_type = "exact"
+    
+    semantic_settings = semantic_cache_settings(agent_id) if answered_by is None else {}
+    namespace = None
+    if semantic_settings:
+        # Vigência e filtros resolvidos como na recuperação: "CSLL 2023" e "CSLL 2024" não se misturam.
+        namespace = SemanticCache.namespace(agent_id, task_type, template_versions.of(agent_id),
+                                            **retriever.cache_scope(agent_id, query, filters, reference_date))
+        semantic_query = canonical_query(query, semantic_settings.get('synonyms'))
+        if result is None:
+            match = semantic_cache.lookup(namespace, semantic_query, semantic_settings.get('similarity_threshold', 0.93))
+            if match is not None:
+                result, similarity = match
+                cache_type = "semantic"
+                cache_info = {"semantic_similarity": round(similarity, 4)}
+    
+    if cache_type:
+        answered_by = "cache" if cache_type == "exact" else "semantic_cache"
+        # A recuperação não rodou nesta requisição: os dados guardados vão só como referência.
+        result = {
+            **{key: value for key, value in result.items() if key != "retrieval"},
+            "cached_retrieval": result.get("retrieval", {})
+        }
+        print(f"⚡ Resposta em cache ({cache_type}): {agent_id}")
+    elif answered_by is None:
+        answered_by = "crew"
+        
+        def store(crew_result):
+            if crew_result["status"] == "success":
+                if cache_key is not None:
+                    response_cache.set(cache_key, crew_result)
+                if namespace is not None:
+                    semantic_cache.add(namespace, semantic_query, crew_result)
+        
+        def run_crew():
+            return execute_with_budget(agent_id, query, task_type, filters, reference_date, on_chunk, store)
+        
+        if single_flight is not None:
+            flight_key = (agent_id, task_type, normalize_query(query),
+                          json.dumps(filters, sort_keys=True), reference_date)
+            (result, timing, answered_by, budget_info), coalesced = single_flight.do(flight_key, run_crew)
+            if coalesced:
+                print(f"🔗 Aguardou execução idêntica em andamento: {agent_id}")
+        else:
+            result, timing, answered_by, budget_info = run_crew()
+        
+        if not coalesced and timing.execution_ms:
+            latency.record("queue_wait", timing.queue_wait_ms)
+            latency.record("crew_execution", timing.execution_ms)
+    
+    if result["status"] == "success":
+        latency.record(answered_by, (time.perf_counter() - start) * 1000)
+    
+    return result, {
+        "answered_by": answered_by,
+        **result.get("faq", {}),
+        "coalesced": coalesced,
+        "cache_hit": cache_type is not None,
+        "cache_type": cache_type,
+        **cache_info,
+        "queue_wait_ms": timing.queue_wait_ms,
+        "execution_ms": timing.execution_ms,
+        **budget_info
+    }
+
+def chat_payload(result: dict, answer_info: dict, dispatch: dict) -> dict:
+    """Corpo de resposta do /api/chat."""
+    answered_by = answer_info["answered_by"]
+    return {
+        "reply": result["reply"],
+        "sessionId": None,
+        "timestamp": result["timestamp"],
+        "model": f"faq-{result['agent_used']}" if answered_by.startswith("faq") else f"crewai-{result['agent_used']}",
+        "metadata": {
+            "agent_used": result["agent_used"],
+            "confidence": result["confidence"],
+            **answer_info,
+            **dispatch,
+            **result.get("retrieval", {}),
+            **({"cached_retrieval": result["cached_retrieval"]} if "cached_retrieval" in result else {})
+        }
+    }
+
+def log_query(query: str) -> None:
+    print(f"\n{'='*70}")
+    print(f"📝 Consulta: {query[:50]}...")
+    print(f"{'='*70}")
+
+def overloaded(error: QueueFullError):
+    print(f"⚠️  Sobrecarga: {error} (Retry-After {error.retry_after}s)")
+    return jsonify({"error": str(error), "retry_after": error.retry_after}), 429, {"Retry-After": str(error.retry_after)}
+
+def fan_out_plan(query: str):
+    """Sub-perguntas por agente quando mais de um agente pontua acima do limiar (senão None)."""
+    fan_config = registry.routing_config.get('fan_out', {}) or {}
+    if not fan_config.get('enabled', False):
+        return None
+    max_agents = fan_config.get('max_agents', 3)
+    agents = select_agents(
+        router.get_routing_suggestions(query, top_n=max_agents),
+        min_score=fan_config.get('min_score', router.min_score),
+        relative_score=fan_config.get('relative_score', 0.5),
+        max_agents=max_agents
+    )
+    if len(agents) < 2:
+        return None
+    return plan_sub_questions(query, agents, router.rank)
+
+def answer_fan_out(plan, chat_request: dict):
+    """Executa as sub-perguntas em paralelo sob um prazo comum e junta as respostas."""
+    fan_config = registry.routing_config.get('fan_out', {}) or {}
+    deadline = fan_config.get('deadline_seconds', 60)
+    start = time.perf_counter()
+    print(f"🔀 Fan-out: {', '.join(sub.agent_id for sub in plan)} (prazo {deadline}s)")
+    
+    pool = ThreadPoolExecutor(max_workers=len(plan), thread_name_prefix="fan-out")
+    futures = {
+        pool.submit(resolve_answer, sub.agent_id, sub.question, chat_request["task_type"],
+                    chat_request["filters"], chat_request["reference_date"]): sub
+        for sub in plan
+    }
+    done, _ = wait(futures, timeout=deadline)
+    # Quem estourou o prazo termina em background (e ainda alimenta os caches).
+    pool.shutdown(wait=False)
+    
+    parts, details = [], []
+    for future, sub in futures.items():
+        detail = {"agent": sub.agent_id, "score": round(sub.score, 4), "focus": sub.focus}
+        if future not in done:
+            detail["status"] = "timeout"
+        else:
+            try:
+                result, answer_info = future.result()
+            except Exception as e:
+                # Falha de uma parte (fila cheia, erro inesperado) não derruba as demais.
+                if not isinstance(e, QueueFullError):
+                    traceback.print_exc()
+                result, answer_info = {"status": "error", "error": str(e)}, {}
+            if result["status"] == "success":
+                parts.append({"agent_id": sub.agent_id, "focus": sub.focus, "reply": result["reply"],
+                              "confidence": result["confidence"], "timestamp": result["timestamp"]})
+                detail.update(status="success", answered_by=answer_info["answered_by"],
+                              retrieved_records=result.get("retrieval", {}).get("retrieved_records"))
+            else:
+                detail.update(status="error", error=result.get("error") or result.get("reply"))
+        details.append(detail)
+    
+    if not parts:
+        return jsonify({"error": "Nenhum agente respondeu dentro do prazo", "fan_out": details}), 504
+    
+    names = {sub.agent_id: (registry.get_agent_config(sub.agent_id) or {}).get('agent_name', sub.agent_id) for sub in plan}
+    reply = merge_replies(parts, names)
+    missing = [f"{names[detail['agent']]} ({'prazo esgotado' if detail['status'] == 'timeout' else 'erro'})"
+               for detail in details if detail["status"] != "success"]
+    if missing:
+        reply += f"\n\n_Sem resposta: {', '.join(missing)}._"
+    
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    latency.record("fan_out", elapsed_ms)
+    return jsonify({
+        "reply": reply,
+        "sessionId": None,
+        "timestamp": max(part["timestamp"] for part in parts),
+        "model": "crewai-fan-out",
+        "metadata": {
+            "agent_used": parts[0]["agent_id"],
+            "agents_used": [part["agent_id"] for part in parts],
+            "confidence": round(sum(part["confidence"] for part in parts) / len(parts), 4),
+            "answered_by": "fan_out",
+            "dispatch": "fan_out",
+            "fan_out": details,
+            "fan_out_ms": round(elapsed_ms, 3),
+            "deadline_seconds": deadline
+        }
+    })
+
+def answer_chat(data: dict, agent_id: str = None):
+    try:
+        chat_request = parse_chat_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    log_query(chat_request["query"])
+    if agent_id is None and not registry.resolve_agent_id(data.get("agent_context")) and data.get("fan_out", True):
+        plan = fan_out_plan(chat_request["query"])
+        if plan:
+            return answer_fan_out(plan, chat_request)
+    agent_id, dispatch = dispatch_agent(chat_request["query"], agent_id, data.get("agent_context"))
+    try:
+        result, answer_info = resolve_answer(agent_id, **chat_request)
+    except QueueFullError as e:
+        return overloaded(e)
+    
+    if result["status"] == "error":
+        return jsonify(result), result.get("http_status", 500)
+    
+    return jsonify(chat_payload(result, answer_info, dispatch))
+
+def stream_chat(data: dict, agent_id: str = None):
+    """SSE: ``routing`` logo de início, ``token`` a cada trecho e ``done`` com os metadados."""
+    try:
+        chat_request = parse_chat_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    log_query(chat_request["query"])
+    agent_id, dispatch = dispatch_agent(chat_request["query"], agent_id, data.get("agent_context"))
+    keepalive_seconds = (registry.global_config.get('streaming', {}) or {}).get('keepalive_seconds', 15)
+    
+    def events():
+        yield sse("routing", {"agent_used": agent_id, "task_type": chat_request["task_type"], **dispatch})
+        
+        chunks = queue.Queue()
+        outcome = {}
+        
+        def work():
+            try:
+                outcome["answer"] = resolve_answer(agent_id, on_chunk=chunks.put, **chat_request)
+            except QueueFullError as e:
+                outcome["answer"] = ({"status": "error", "error": str(e), "http_status": 429,
+                                      "retry_after": e.retry_after}, {})
+            except Exception as e:
+                traceback.print_exc()
+                outcome["answer"] = ({"status": "error", "error": str(e)}, {})
+            finally:
+                chunks.put(None)
+        
+        threading.Thread(target=work, daemon=True).start()
+        streamed = False
+        while True:
+            try:
+                chunk = chunks.get(timeout=keepalive_seconds)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if chunk is None:
+                break
+            streamed = True
+            yield sse("token", {"text": chunk})
+        
+        result, answer_info = outcome["answer"]
+        if result["status"] == "error":
+            yield sse("error", {
+                "error": result.get("error") or result.get("reply"),
+                **{key: result[key] for key in ("http_status", "retry_after") if key in result}
+            })
+            return
+        
+        if not streamed:
+            # FAQ, cache ou CrewAI sem streaming: a resposta chega pronta.
+            for token in split_tokens(result["reply"]):
+                yield sse("token", {"text": token})
+        
+        yield sse("done", chat_payload(result, answer_info, dispatch))
+    
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route("/api/chat", methods=["POST"])
+def chat():
+    try:
+        return answer_chat(request.get_json() or {})
     except Exception as e:
         print(f"❌ Erro: {e}")
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    try:
+        return stream_chat(request.get_json() or {})
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+def resolve_with_retry(agent_id: str, chat_request: dict, max_wait: float, cancel_event: threading.Event = None):
+    """``resolve_answer`` que, com a fila dos crews cheia, espera ``retry_after`` e tenta
+    de novo (até ``max_wait`` segundos). Retorna None se ``cancel_event`` disparar."""
+    waited = 0.0
+    cancel_event = cancel_event or threading.Event()
+    while True:
+        try:
+            return resolve_answer(agent_id, **chat_request)
+        except QueueFullError as e:
+            if waited >= max_wait:
+                raise
+            if cancel_event.wait(e.retry_after):
+                return None
+            waited += e.retry_after
+
+def run_chat_job(job, agent_id: str, chat_request: dict, dispatch: dict):
+    """Executa a consulta de um job; com a fila dos crews cheia, espera e tenta de novo."""
+    answer = resolve_with_retry(agent_id, chat_request, jobs_config.get('max_queue_wait_seconds', 600), job.cancel_event)
+    if answer is None:
+        return None
+    
+    result, answer_info = answer
+    if result["status"] == "error":
+        raise RuntimeError(result.get("error") or result.get("reply"))
+    return chat_payload(result, answer_info, dispatch)
+
+@app.route("/api/jobs", methods=["POST"])
+def create_job():
+    try:
+        data = request.get_json() or {}
+        try:
+            chat_request = parse_chat_request(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        agent_id = None
+        if data.get("agent_id"):
+            if not isinstance(data["agent_id"], str):
+                return jsonify({"error": "Campo 'agent_id' deve ser um texto"}), 400
+            agent_id = registry.resolve_agent_id(data["agent_id"])
+            if not agent_id:
+                return jsonify({"error": f"Agente '{data['agent_id']}' não encontrado"}), 404
+        
+        log_query(chat_request["query"])
+        agent_id, dispatch = dispatch_agent(chat_request["query"], agent_id, data.get("agent_context"))
+        try:
+            job = job_manager.submit(
+                lambda job: run_chat_job(job, agent_id, chat_request, dispatch),
+                {"agent_used": agent_id, "task_type": chat_request["task_type"]}
+            )
+        except JobLimitError as e:
+            return jsonify({"error": str(e)}), 429, {"Retry-After": "30"}
+        
+        print(f"🗂️  Job {job.job_id} criado ({chat_request['task_type']})")
+        status_url = f"/api/jobs/{job.job_id}"
+        return jsonify({**job.to_dict(), "status_url": status_url}), 202, {"Location": status_url}
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' não encontrado ou expirado"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' não encontrado ou expirado"}), 404
+    if job.status != CANCELLED:
+        return jsonify({"error": f"Job já concluído ({job.status})", **job.to_dict()}), 409
+    return jsonify(job.to_dict())
+
+def batch_item(index: int, item) -> dict:
+    """Normaliza um item do lote: texto ou {prompt, agent_id, task_type, filters, reference_date}."""
+    data = {"prompt": item} if isinstance(item, str) else item
+    if not isinstance(data, dict):
+        raise ValueError("Item deve ser um texto ou um objeto {prompt, agent_id, task_type}")
+    chat_request = parse_chat_request(data)
+    
+    agent_id = None
+    requested = data.get("agent_id") or data.get("agent_context")
+    if requested is not None and not isinstance(requested, str):
+        raise ValueError("Campo 'agent_id' deve ser um texto")
+    if requested:
+        agent_id = registry.resolve_agent_id(requested)
+        if not agent_id:
+            raise ValueError(f"Agente '{requested}' não encontrado")
+    return {"index": index, "agent_id": agent_id, "chat_request": chat_request}
+
+@app.route("/api/chat/batch", methods=["POST"])
+def chat_batch():
+    """Executa várias consultas em paralelo; NDJSON na ordem de conclusão, com o índice de entrada."""
+    batch_config = registry.global_config.get('chat_batch', {}) or {}
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Corpo da requisição deve ser um objeto JSON {items: [...]}"}), 400
+    items = data.get("items")
+    max_items = batch_config.get('max_items', 200)
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Campo 'items' obrigatório (lista)"}), 400
+    if len(items) > max_items:
+        return jsonify({"error": f"Máximo de {max_items} consultas por lote"}), 400
+    
+    parallelism = batch_config.get('parallelism', 8)
+    if data.get("parallelism") is not None:
+        try:
+            parallelism = min(int(data["parallelism"]), parallelism)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Campo 'parallelism' deve ser inteiro"}), 400
+    parallelism = max(parallelism, 1)
+    max_wait = batch_config.get('max_queue_wait_seconds', 600)
+    
+    prepared, invalid = [], []
+    for index, item in enumerate(items):
+        try:
+            prepared.append(batch_item(index, item))
+        except ValueError as e:
+            invalid.append({"index": index, "status": "error", "error": str(e)})
+    
+    # Os itens sem agente são roteados juntos.
+    to_route = [entry for entry in prepared if entry["agent_id"] is None]
+    routings = router.route_batch([entry["chat_request"]["query"] for entry in to_route]) if to_route else []
+    for entry, routing in zip(to_route, routings):
+        entry["agent_id"], entry["dispatch"] = routing.primary_agent, routed_dispatch(routing)
+    for entry in prepared:
+        entry.setdefault("dispatch", {"dispatch": "direct"})
+    
+    print(f"\n📦 Lote: {len(prepared)} consulta(s), paralelismo {parallelism}")
+    cancel = threading.Event()
+    
+    def answer(entry) -> dict:
+        try:
+            outcome = resolve_with_retry(entry["agent_id"], entry["chat_request"], max_wait, cancel)
+        except QueueFullError as e:
+            return {"index": entry["index"], "status": "error", "error": str(e), "retry_after": e.retry_after}
+        if outcome is None:
+            return {"index": entry["index"], "status": "error", "error": "Lote cancelado"}
+        result, answer_info = outcome
+        if result["status"] == "error":
+            return {"index": entry["index"], "status": "error",
+                    "agent_used": entry["agent_id"], "error": result.get("error") or result.get("reply")}
+        return {"index": entry["index"], "status": "success", **chat_payload(result, answer_info, entry["dispatch"])}
+    
+    def lines():
+        start = time.perf_counter()
+        failed = len(invalid)
+        for line in invalid:
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        
+        pool = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="batch")
+        try:
+            futures = [pool.submit(answer, entry) for entry in prepared]
+            for future in as_completed(futures):
+                try:
+                    line = future.result()
+                except Exception as e:
+                    traceback.print_exc()
+                    line = {"index": prepared[futures.index(future)]["index"], "status": "error", "error": str(e)}
+                failed += line["status"] == "error"
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        finally:
+            # Cliente desconectou ou lote terminou: nada mais começa.
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        yield json.dumps({"summary": {
+            "total": len(items),
+            "succeeded": len(items) - failed,
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+        }}) + "\n"
+    
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route("/api/agents/<agent_id>/chat", methods=["POST"])
+def agent_chat(agent_id):
+    try:
+        resolved = registry.resolve_agent_id(agent_id)
+        if not resolved:
+            return jsonify({"error": f"Agente '{agent_id}' não encontrado"}), 404
+        
+        return answer_chat(request.get_json() or {}, resolved)
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "latency": latency.snapshot(),
+        "single_flight": single_flight.stats() if single_flight is not None else None,
+        "crew_executor": crew_executor.stats(),
+        "jobs": job_manager.stats(),
+        "faq_indexes": faq_indexes.loaded_agents()
+    })
+
 @app.route("/api/health", methods=["GET"])
 def health():
     try:
@@ -179,7 +979,15 @@ def health():
         return jsonify({
             "status": "healthy",
             "agents_loaded": len(active_agents),
-            "active_agents": active_agents
+            "active_agents": active_agents,
+            "routing_cache": router.get_cache_stats(),
+            "response_cache": response_cache.stats() if response_cache is not None else None,
+            "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+            "indices": {
+                "loaded": retriever.loaded_agents(),
+                "top_traffic": retriever.traffic.top(prefetcher.top_n),
+                "embedding_cache": retriever.embedding_cache.stats() if retriever.embedding_cache is not None else None
+            }
         })
     except Exception as e:
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
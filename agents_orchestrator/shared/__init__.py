@@ -0,0 +1 @@
+﻿"""Componentes compartilhados do orchestrator."""
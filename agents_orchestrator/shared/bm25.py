@@ -0,0 +1,130 @@
+"""BM25 em processo com postings em arrays numpy (formato CSR)."""
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from shared.text_normalizer import normalize_text
+
+BM25_FILE = "bm25.npz"
+
+_DOTTED_NUMBER_RE = re.compile(r"(?<=\d)\.(?=\d{3}\b)")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados; '9.249' vira '9249' e 'art. 311' gera 'art' e '311'."""
+    return _TOKEN_RE.findall(_DOTTED_NUMBER_RE.sub("", normalize_text(text)))
+
+
+class BM25Index:
+    """Índice BM25 (Okapi) de documentos inteiros.
+
+    As postings de cada termo ficam contíguas em ``doc_ids``/``weights``
+    (offsets em ``offsets``). O peso guardado já inclui tf, k1, b e o
+    tamanho do documento; a consulta só soma ``idf * peso`` dos termos.
+    """
+
+    def __init__(self, terms: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, idf: np.ndarray, num_docs: int):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.idf = idf
+        self.num_docs = num_docs
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @classmethod
+    def build(cls, documents: Iterable[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        terms: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        lengths: List[int] = []
+
+        for doc, text in enumerate(documents):
+            counts: Dict[int, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                term = terms.setdefault(token, len(terms))
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                term_ids.append(term)
+                doc_ids.append(doc)
+                tfs.append(tf)
+            lengths.append(len(tokens))
+
+        num_docs = len(lengths)
+        term_array = np.array(term_ids, dtype=np.int32)
+        order = np.argsort(term_array, kind="stable")
+        doc_array = np.array(doc_ids, dtype=np.int32)[order]
+        tf_array = np.array(tfs, dtype=np.float32)[order]
+
+        df = np.bincount(term_array, minlength=len(terms))
+        offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+        idf = np.log1p((num_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        doc_lengths = np.array(lengths, dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if num_docs else 0.0
+        norm = k1 * (1 - b + b * doc_lengths[doc_array] / avg_length) if avg_length else k1
+        weights = (tf_array * (k1 + 1) / (tf_array + norm)).astype(np.float32)
+
+        return cls(terms, offsets, doc_array, weights, idf, num_docs)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            scores[self.doc_ids[start:end]] += self.idf[term] * self.weights[start:end]
+        return scores
+
+    def search(self, query: str, top_k: int = 10,
+               mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Retorna [(documento, score)] com score > 0, opcionalmente restrito a ``mask``."""
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched) or top_k <= 0:
+            return []
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(doc), float(scores[doc])) for doc in matched]
+
+    def save(self, path: Union[str, Path]) -> None:
+        vocabulary = sorted(self.terms, key=self.terms.get)
+        np.savez(
+            path,
+            vocabulary=np.array(vocabulary, dtype=str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            idf=self.idf,
+            num_docs=np.array(self.num_docs)
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "BM25Index":
+        with np.load(path) as data:
+            terms = {term: index for index, term in enumerate(data["vocabulary"].tolist())}
+            return cls(terms, data["offsets"], data["doc_ids"], data["weights"],
+                       data["idf"], int(data["num_docs"]))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Tuple[int, float]]],
+                           k: int = 60) -> List[Tuple[int, float]]:
+    """Combina listas [(id, score)] somando 1 / (k + posição) de cada lista."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for position, (item, _) in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + position)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,124 @@
+"""Pool limitado para execução dos crews, com fila, limite por agente e rejeição rápida."""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class QueueFullError(Exception):
+    """Fila de execução cheia; ``retry_after`` é a espera sugerida em segundos."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class ExecutionTiming:
+    queue_wait_ms: float = 0.0
+    execution_ms: float = 0.0
+
+
+@dataclass
+class _Job:
+    agent_id: str
+    fn: Callable[[], Any]
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class CrewExecutor:
+    """Executa até ``max_workers`` crews ao mesmo tempo (no máximo ``agent_limit``
+    do mesmo agente). Os demais esperam numa fila de até ``queue_depth``
+    posições; com a fila cheia, ``run`` falha na hora com ``QueueFullError``.
+    """
+
+    def __init__(self, max_workers: int = 8, queue_depth: int = 32,
+                 agent_limits: Optional[Dict[str, int]] = None, default_agent_limit: Optional[int] = None):
+        self.max_workers = max(int(max_workers), 1)
+        self.queue_depth = max(int(queue_depth), 0)
+        self.agent_limits = dict(agent_limits or {})
+        self.default_agent_limit = default_agent_limit
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crew")
+        self._pending: Deque[_Job] = deque()
+        self._running: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._avg_execution_s = 5.0
+        self.completed = 0
+        self.rejected = 0
+
+    def agent_limit(self, agent_id: str) -> int:
+        limit = self.agent_limits.get(agent_id, self.default_agent_limit)
+        return min(int(limit), self.max_workers) if limit else self.max_workers
+
+    def submit(self, agent_id: str, fn: Callable[[], Any]) -> Future:
+        """Enfileira ``fn``; o Future resolve para (resultado, ExecutionTiming)."""
+        job = _Job(agent_id, fn)
+        with self._lock:
+            if len(self._pending) >= self.queue_depth and not self._can_start(agent_id):
+                self.rejected += 1
+                raise QueueFullError("Fila de execução cheia, tente novamente em instantes", self._retry_after())
+            self._pending.append(job)
+            self._dispatch()
+        return job.future
+
+    def run(self, agent_id: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, ExecutionTiming]:
+        return self.submit(agent_id, fn).result(timeout)
+
+    def _can_start(self, agent_id: str) -> bool:
+        return (sum(self._running.values()) < self.max_workers
+                and self._running.get(agent_id, 0) < self.agent_limit(agent_id))
+
+    def _dispatch(self) -> None:
+        """Inicia, em ordem de chegada, os jobs cujo agente ainda tem vaga (com o lock)."""
+        for job in list(self._pending):
+            if sum(self._running.values()) >= self.max_workers:
+                break
+            if self._running.get(job.agent_id, 0) < self.agent_limit(job.agent_id):
+                self._pending.remove(job)
+                self._running[job.agent_id] = self._running.get(job.agent_id, 0) + 1
+                self._pool.submit(self._execute, job)
+
+    def _execute(self, job: _Job) -> None:
+        started = time.perf_counter()
+        timing = ExecutionTiming(queue_wait_ms=round((started - job.enqueued_at) * 1000, 3))
+        try:
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    result = job.fn()
+                except BaseException as e:
+                    job.future.set_exception(e)
+                else:
+                    timing.execution_ms = round((time.perf_counter() - started) * 1000, 3)
+                    job.future.set_result((result, timing))
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running[job.agent_id] -= 1
+                self._avg_execution_s = 0.8 * self._avg_execution_s + 0.2 * elapsed
+                self.completed += 1
+                self._dispatch()
+
+    def _retry_after(self) -> int:
+        """Tempo estimado para a fila andar: (fila / workers) execuções médias."""
+        waves = (len(self._pending) + 1) / self.max_workers
+        return max(1, math.ceil(waves * self._avg_execution_s))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queue_depth,
+                "running": sum(self._running.values()),
+                "queued": len(self._pending),
+                "running_by_agent": {agent_id: count for agent_id, count in self._running.items() if count},
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_execution_s": round(self._avg_execution_s, 3)
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,76 @@
+"""Perguntas compostas: divisão em sub-perguntas por agente e junção das respostas."""
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Separadores de cláusulas: pontuação e conectivos que juntam assuntos distintos.
+_CLAUSE_RE = re.compile(
+    r"\s*(?:[;,?!]|\s(?:e|ou|bem como|assim como|além d[eoa]s?|e também|e ainda)\s)\s*",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class SubQuestion:
+    agent_id: str
+    score: float
+    question: str
+    focus: List[str] = field(default_factory=list)
+
+
+def select_agents(suggestions: Sequence[Tuple[str, float]], min_score: float,
+                  relative_score: float = 0.5, max_agents: int = 3) -> List[Tuple[str, float]]:
+    """Agentes com score >= ``min_score`` e >= ``relative_score`` x o melhor score."""
+    if not suggestions:
+        return []
+    best = suggestions[0][1]
+    selected = [(agent_id, score) for agent_id, score in suggestions
+                if score >= min_score and score >= best * relative_score]
+    return selected[:max_agents]
+
+
+def split_clauses(query: str) -> List[str]:
+    return [clause.strip(" .") for clause in _CLAUSE_RE.split(query) if clause and clause.strip(" .")]
+
+
+def plan_sub_questions(query: str, agents: Sequence[Tuple[str, float]],
+                       rank: Callable[[str], Sequence[Tuple[str, float]]]) -> List[SubQuestion]:
+    """Cada cláusula vai para o agente selecionado que melhor a pontua.
+
+    A pergunta inteira continua como contexto; a sub-pergunta só pede que o
+    agente se concentre nas suas cláusulas. Cláusulas que nenhum agente
+    reconhece (o assunto comum, como "dedutibilidade de PLR") vão para todos.
+    """
+    selected = dict(agents)
+    owned: Dict[str, List[str]] = {agent_id: [] for agent_id in selected}
+    shared: List[str] = []
+
+    for clause in split_clauses(query):
+        scores = [(agent_id, score) for agent_id, score in rank(clause) if agent_id in selected and score > 0]
+        if scores:
+            owner = max(scores, key=lambda item: item[1])[0]
+            owned[owner].append(clause)
+        else:
+            shared.append(clause)
+
+    plan = []
+    for agent_id, score in agents:
+        focus = shared + owned[agent_id] if owned[agent_id] else []
+        question = query
+        if focus and len(focus) < len(split_clauses(query)):
+            question = f"{query}\n\nNesta parte, responda apenas sobre: {'; '.join(focus)}."
+        plan.append(SubQuestion(agent_id, score, question, focus))
+    return plan
+
+
+def merge_replies(parts: Sequence[dict], names: Optional[Dict[str, str]] = None) -> str:
+    """Uma seção por agente, com o nome e o foco da sub-pergunta."""
+    names = names or {}
+    sections = []
+    for part in parts:
+        title = names.get(part["agent_id"], part["agent_id"])
+        if part.get("focus"):
+            title = f"{title} ({'; '.join(part['focus'])})"
+        sections.append(f"### {title}\n\n{part['reply'].strip()}")
+    return "\n\n".join(sections)
+
@@ -0,0 +1,170 @@
+"""Respostas prontas a partir dos registros de FAQ (faq_*.txt), sem chamar o LLM."""
+import fnmatch
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from shared.knowledge_parser import is_empty, iter_knowledge
+from shared.metadata_index import MetadataIndex
+from shared.semantic_cache import canonical_query
+from shared.temporal_index import parse_date, parse_validity
+
+# Campos que descrevem a pergunta que o registro responde.
+QUESTION_FIELDS = ["IMPOSTO", "SECAO", "TOPICO", "TAGS"]
+
+# Tributos reconhecidos na pergunta mesmo sem registro de FAQ: "alíquota do PIS"
+# não pode cair na resposta da CSLL só porque as duas falam de alíquota.
+KNOWN_TAXES = ["IRPJ", "CSLL", "PIS", "COFINS", "IRRF", "ICMS", "ISS", "IPI", "IOF",
+               "INSS", "FGTS", "CBS", "IBS", "Contribuições Previdenciárias"]
+
+
+@dataclass
+class FaqMatch:
+    record_id: str
+    reply: str
+    confidence: float
+    margin: float
+
+
+def _filled(record: Dict[str, str], field: str) -> str:
+    value = record.get(field, "")
+    return "" if is_empty(value) else value.strip()
+
+
+def render_answer(record: Dict[str, str]) -> Optional[str]:
+    """Descrição + exemplo + "Fundamentação:"; ``None`` se o registro não tem base legal."""
+    description = _filled(record, "DESCRICAO DETALHADA")
+    grounds = [value for value in (_filled(record, "BASE LEGAL"), _filled(record, "JURISPRUDENCIA")) if value]
+    if not description or not grounds:
+        return None
+
+    parts = [description]
+    example = _filled(record, "EXEMPLO PRATICO")
+    if example:
+        parts.append(f"Exemplo: {example}")
+    parts.append("Fundamentação: " + "; ".join(grounds))
+    return "\n\n".join(parts)
+
+
+class FaqIndex:
+    """Embeddings das "perguntas" (imposto, seção, tópico, tags) dos registros de FAQ.
+
+    As respostas já ficam renderizadas; a consulta é um produto matriz-vetor.
+    Só responde quando o melhor registro passa de ``min_confidence`` e se
+    destaca do segundo por ``min_margin`` (pergunta ambígua vai para o LLM).
+    Registros de outro tributo que não o citado na pergunta nunca concorrem.
+    """
+
+    def __init__(self, embedder, records: List[Dict[str, str]]):
+        self.embedder = embedder
+        self.record_ids = [record["ID"] for record in records]
+        self.replies = [render_answer(record) for record in records]
+        self.validity = [parse_validity(record.get("VERSAO LEGAL", ""), record.get("DATA", "")) for record in records]
+        questions = [
+            " ".join(_filled(record, field).replace("_", " ") for field in QUESTION_FIELDS)
+            for record in records
+        ]
+        self.vectors = embedder.embed(questions) if questions else np.zeros((0, embedder.dim), dtype=np.float32)
+        self.metadata = MetadataIndex.from_records(records)
+        self.metadata.add_values("IMPOSTO", KNOWN_TAXES)
+
+    def __len__(self) -> int:
+        return len(self.record_ids)
+
+    @classmethod
+    def from_knowledge(cls, knowledge_path, embedder, patterns: Iterable[str] = ("faq_*.txt",)) -> "FaqIndex":
+        patterns = list(patterns)
+        records = [
+            record for record in iter_knowledge(knowledge_path)
+            if any(fnmatch.fnmatch(record["_SOURCE"], pattern) for pattern in patterns)
+            and render_answer(record) is not None
+        ]
+        return cls(embedder, records)
+
+    def taxes_mask(self, query: str) -> Optional[np.ndarray]:
+        """Registros cujo IMPOSTO cobre todos os tributos citados na pergunta; None se não cita nenhum."""
+        taxes = self.metadata.detect(query, ["IMPOSTO"]).get("IMPOSTO", [])
+        if not taxes:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for tax in taxes:
+            mask &= self.metadata.mask({"IMPOSTO": [tax]})
+        return mask
+
+    def match(self, query: str, min_confidence: float = 0.6, min_margin: float = 0.1,
+              reference_date: Optional[str] = None, require_tax: bool = True) -> Optional[FaqMatch]:
+        """Com ``require_tax``, pergunta que não cita tributo ("qual a alíquota?") vai para o LLM."""
+        if not len(self):
+            return None
+
+        agree = self.taxes_mask(query)
+        if agree is None and require_tax:
+            return None
+
+        scores = self.vectors @ self.embedder.embed_one(canonical_query(query))
+        if agree is not None:
+            scores = np.where(agree, scores, -1.0)
+        if reference_date is not None:
+            start, end = parse_date(reference_date)
+            valid = np.array([low < end and high > start for low, high in self.validity])
+            scores = np.where(valid, scores, -1.0)
+
+        order = np.argsort(-scores)[:2]
+        best = float(scores[order[0]])
+        second = float(scores[order[1]]) if len(order) > 1 else 0.0
+        if best < min_confidence or best - second < min_margin:
+            return None
+
+        row = int(order[0])
+        return FaqMatch(self.record_ids[row], self.replies[row], round(best, 4), round(best - second, 4))
+
+
+class FaqIndexes:
+    """Um ``FaqIndex`` por agente, construído na primeira consulta."""
+
+    def __init__(self, registry, embedder):
+        self.registry = registry
+        self.embedder = embedder
+        self._indexes: Dict[str, FaqIndex] = {}
+        self._lock = threading.Lock()
+
+    def settings(self, agent_id: str) -> dict:
+        """Bloco ``faq_fast_path`` do config.yaml do agente ({} se desabilitado)."""
+        config = (self.registry.get_agent_config(agent_id) or {}).get('faq_fast_path', {}) or {}
+        return config if config.get('enabled', False) else {}
+
+    def get(self, agent_id: str) -> Optional[FaqIndex]:
+        with self._lock:
+            if agent_id not in self._indexes:
+                knowledge_path = self.registry.get_agent_knowledge_path(agent_id)
+                patterns = self.settings(agent_id).get('files', ["faq_*.txt"])
+                index = FaqIndex.from_knowledge(knowledge_path, self.embedder, patterns) if knowledge_path else None
+                if index is not None:
+                    print(f"📚 FAQ: {len(index)} resposta(s) pronta(s) para '{agent_id}'")
+                self._indexes[agent_id] = index
+            return self._indexes[agent_id]
+
+    def match(self, agent_id: str, query: str, task_type: str,
+              reference_date: Optional[str] = None, any_task_type: bool = False) -> Optional[FaqMatch]:
+        """``any_task_type`` ignora ``task_types`` (fallback quando o crew estoura o prazo)."""
+        settings = self.settings(agent_id)
+        if not settings:
+            return None
+        if not any_task_type and task_type not in settings.get('task_types', ["rapida", "simples"]):
+            return None
+        index = self.get(agent_id)
+        if index is None:
+            return None
+        return index.match(
+            query,
+            min_confidence=settings.get('min_confidence', 0.6),
+            min_margin=settings.get('min_margin', 0.1),
+            reference_date=reference_date,
+            require_tax=settings.get('require_tax', True)
+        )
+
+    def loaded_agents(self) -> List[str]:
+        with self._lock:
+            return sorted(agent_id for agent_id, index in self._indexes.items() if index is not None)
@@ -0,0 +1,75 @@
+"""Embeddings locais por hashing de n-gramas (CPU, sem chamadas de rede)."""
+import math
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+from shared.text_normalizer import normalize_text
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashedNgramEmbedder:
+    """Projeta n-gramas de caracteres e palavras em ``dim`` buckets (TF sublinear).
+
+    O embedder não tem estado: o mesmo texto gera sempre o mesmo vetor, o que
+    permite cachear e comparar vetores gerados em processos diferentes.
+    """
+
+    def __init__(self, dim: int = 1024, char_ngrams=(3, 5), word_ngrams=(1, 2)):
+        self.dim = int(dim)
+        self.char_ngrams = tuple(char_ngrams)
+        self.word_ngrams = tuple(word_ngrams)
+
+    @property
+    def model_id(self) -> str:
+        c_min, c_max = self.char_ngrams
+        w_min, w_max = self.word_ngrams
+        return f"hashed-ngram-v1-d{self.dim}-c{c_min}{c_max}-w{w_min}{w_max}"
+
+    def config(self) -> dict:
+        return {
+            "dim": self.dim,
+            "char_ngrams": list(self.char_ngrams),
+            "word_ngrams": list(self.word_ngrams),
+        }
+
+    def _features(self, text: str) -> Iterable[str]:
+        words = _WORD_RE.findall(normalize_text(text))
+
+        w_min, w_max = self.word_ngrams
+        for n in range(w_min, w_max + 1):
+            for i in range(len(words) - n + 1):
+                yield "w:" + " ".join(words[i:i + n])
+
+        c_min, c_max = self.char_ngrams
+        for word in words:
+            padded = f" {word} "
+            for n in range(c_min, c_max + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def term_frequencies(self, text: str) -> dict:
+        counts = {}
+        for feature in self._features(text):
+            bucket = zlib.crc32(feature.encode("utf-8")) % self.dim
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for bucket, count in self.term_frequencies(text).items():
+            vector[bucket] = 1.0 + math.log(count)
+
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.embed_one(text)
+        return matrix
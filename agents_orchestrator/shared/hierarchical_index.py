@@ -0,0 +1,83 @@
+"""Roteamento em dois estágios: categoria -> UF -> agentes do ramo."""
+from typing import Dict, List, Optional, Tuple
+
+from shared.keyword_index import KeywordIndex
+from shared.text_normalizer import normalize_text
+from shared.uf_lookup import UF_NAMES, UFLookup
+
+STATE_CATEGORY = "tributos_estaduais"
+
+
+class HierarchicalIndex:
+    """Classifica a categoria, detecta a UF e só então pontua os agentes do ramo.
+
+    Cada ramo (categoria, UF) tem o seu próprio ``KeywordIndex``, montado no
+    carregamento, então o custo por consulta não cresce com o total de agentes.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = weights
+        self.uf_lookup = UFLookup()
+        self.category_index = KeywordIndex(weights, normalize=False)
+        self.branches: Dict[Tuple[str, Optional[str]], KeywordIndex] = {}
+        self._category_keywords: Dict[str, Dict[str, List[str]]] = {}
+        self._category_agents: Dict[str, List[str]] = {}
+
+    def add_agent(self, agent_id: str, category: str, uf: Optional[str],
+                  keyword_groups: Dict[str, List[str]]) -> None:
+        # Siglas de UF ("sp", "se", "to") ficam fora do estágio de categoria:
+        # a UF é resolvida pelo UFLookup, e como palavra solta elas são ambíguas.
+        groups = self._category_keywords.setdefault(category, {})
+        for group, keywords in keyword_groups.items():
+            groups.setdefault(group, []).extend(
+                keyword for keyword in keywords or []
+                if normalize_text(str(keyword)).upper() not in UF_NAMES
+            )
+
+        self._category_agents.setdefault(category, []).append(agent_id)
+
+        branch = self.branches.get((category, uf))
+        if branch is None:
+            branch = self.branches[(category, uf)] = KeywordIndex(self.weights)
+        branch.add_agent(agent_id, keyword_groups)
+
+    def add_category_keywords(self, category: str, keywords: List[str]) -> None:
+        groups = self._category_keywords.setdefault(category, {})
+        groups.setdefault("primary", []).extend(keywords or [])
+
+    def build(self) -> "HierarchicalIndex":
+        for category, groups in self._category_keywords.items():
+            self.category_index.add_agent(category, groups)
+        self.category_index.build()
+
+        for branch in self.branches.values():
+            branch.build()
+        return self
+
+    def classify(self, query: str) -> Tuple[Optional[str], Optional[str]]:
+        """Retorna (categoria, UF) da consulta; qualquer um pode ser None."""
+        uf = self.uf_lookup.detect(query)
+        ranking = self.category_index.rank(query)
+
+        if ranking and ranking[0][1] > 0:
+            return ranking[0][0], uf
+        if uf and STATE_CATEGORY in self._category_agents:
+            return STATE_CATEGORY, uf
+        return None, uf
+
+    def rank(self, query: str) -> Tuple[Optional[str], Optional[str], List[Tuple[str, float]]]:
+        """Retorna (categoria, UF, ranking dos agentes do ramo escolhido)."""
+        category, uf = self.classify(query)
+        if category is None:
+            return None, uf, []
+
+        branch = self.branches.get((category, uf))
+        if branch is None:
+            uf = None
+            branch = self.branches.get((category, None))
+
+        if branch is None:
+            ranking = [(agent_id, 0.0) for agent_id in self._category_agents.get(category, [])]
+            return category, uf, ranking
+
+        return category, uf, branch.rank(query)
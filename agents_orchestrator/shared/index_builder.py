@@ -0,0 +1,249 @@
+"""Construção incremental dos índices vetoriais a partir dos arquivos de conhecimento."""
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from shared.bm25 import BM25_FILE, BM25Index
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.knowledge_parser import chunk_record, iter_knowledge_files, iter_records, record_text
+from shared.metadata_index import METADATA_FILE, MetadataIndex
+from shared.quantized_index import INDEX_TYPES, quantized_file
+from shared.temporal_index import TEMPORAL_FILE, TemporalIndex
+from shared.vector_store import (
+    CHUNK_RECORDS_FILE, CHUNKS_FILE, GENERATION_PREFIX, MANIFEST_FILE, PARTITIONS_FILE, RECORDS_FILE,
+    UNIFIED_INDEX, VECTORS_FILE, chunk_hash, generation_dir, read_jsonl,
+)
+
+# Arquivos do layout antigo (tudo na raiz do índice, sem gerações).
+LEGACY_FILES = (VECTORS_FILE, CHUNK_RECORDS_FILE, METADATA_FILE, TEMPORAL_FILE, BM25_FILE,
+                PARTITIONS_FILE, CHUNKS_FILE, RECORDS_FILE) + tuple(quantized_file(t) for t in INDEX_TYPES)
+
+
+@dataclass
+class BuildStats:
+    agent_id: str
+    status: str = "built"
+    files: int = 0
+    records: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    reused: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class IndexBuilder:
+    """Gera ``vectorstore_indices/<agente>/`` e só reembute chunks que mudaram.
+
+    Os arquivos são lidos registro a registro e os vetores gravados em lotes,
+    então a memória usada não depende do tamanho do corpus. Chunks cujo hash
+    já existe no índice anterior reaproveitam o vetor gravado.
+
+    Cada build vai para uma geração nova (``gen-<timestamp>/``) e só fica
+    visível quando o ``manifest.json`` da raiz passa a apontar para ela. A
+    geração anterior é mantida para leitores que já leram o manifest antigo.
+    """
+
+    def __init__(self, embedder: Optional[HashedNgramEmbedder] = None, batch_size: int = 256):
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.batch_size = batch_size
+
+    def build(self, agent_id: str, knowledge_path: Union[str, Path],
+              output_dir: Union[str, Path], force: bool = False) -> BuildStats:
+        return self.build_partitioned({agent_id: knowledge_path}, output_dir, force, name=agent_id)
+
+    def build_partitioned(self, sources: Dict[str, Union[str, Path]], output_dir: Union[str, Path],
+                          force: bool = False, name: str = UNIFIED_INDEX) -> BuildStats:
+        """Gera um único índice com o conhecimento de vários agentes.
+
+        Cada registro recebe o id da partição (posição do agente em
+        ``sources``), gravado em ``partitions.npy``; a lista de partições
+        fica no manifest.
+        """
+        start = time.perf_counter()
+        output_dir = Path(output_dir)
+        stats = BuildStats(agent_id=name)
+
+        partitions = list(sources)
+        files = [
+            (partition, path)
+            for partition, agent_id in enumerate(partitions)
+            for path in iter_knowledge_files(sources[agent_id])
+        ]
+        signatures = {f"{partitions[partition]}/{path.name}": self._signature(path) for partition, path in files}
+        stats.files = len(files)
+
+        manifest = self._load_manifest(output_dir)
+        compatible = (
+            not force
+            and manifest is not None
+            and manifest.get("model_id") == self.embedder.model_id
+        )
+
+        if compatible and manifest.get("files") == signatures and manifest.get("partitions") == partitions:
+            stats.status = "up_to_date"
+            stats.records = manifest.get("records", 0)
+            stats.chunks = manifest.get("chunks", 0)
+            stats.seconds = round(time.perf_counter() - start, 3)
+            return stats
+
+        self._write(files, partitions, output_dir, compatible, signatures, stats,
+                    manifest.get("generation") if manifest else None)
+
+        stats.seconds = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _write(self, files: List[Tuple[int, Path]], partitions: List[str], output_dir: Path,
+               reuse: bool, signatures: Dict, stats: BuildStats, previous_generation: Optional[str]):
+        previous_rows, previous_vectors = self._load_previous(output_dir) if reuse else ({}, None)
+        generation = f"{GENERATION_PREFIX}{datetime.now():%Y%m%d-%H%M%S-%f}"
+        build_dir = output_dir / generation
+        build_dir.mkdir(parents=True)
+
+        raw_path = build_dir / "vectors.f32"
+        batch = []
+        metadata = MetadataIndex()
+        temporal = TemporalIndex()
+        record_partitions = []
+
+        with open(raw_path, "wb") as raw, \
+                open(build_dir / CHUNKS_FILE, "w", encoding="utf-8") as chunks_out, \
+                open(build_dir / RECORDS_FILE, "w", encoding="utf-8") as records_out:
+
+            for partition, path in files:
+                for record in iter_records(path):
+                    record["_SOURCE"] = path.name
+                    record["_AGENT"] = partitions[partition]
+                    record_partitions.append(partition)
+                    records_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    metadata.add(stats.records, record)
+                    temporal.add(stats.records, record)
+
+                    for field, text in chunk_record(record):
+                        digest = chunk_hash(text)
+                        chunks_out.write(json.dumps({
+                            "record": stats.records, "field": field, "hash": digest
+                        }) + "\n")
+
+                        row = previous_rows.get(digest)
+                        batch.append((text, None if row is None else previous_vectors[row]))
+                        stats.chunks += 1
+
+                        if len(batch) >= self.batch_size:
+                            self._flush(batch, raw, stats)
+                            batch = []
+
+                    stats.records += 1
+
+            self._flush(batch, raw, stats)
+
+        # Libera o mmap do índice anterior antes de apagar gerações antigas (Windows).
+        batch = previous_vectors = None
+
+        raw_vectors = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(stats.chunks, self.embedder.dim)) \
+            if stats.chunks else np.zeros((0, self.embedder.dim), dtype=np.float32)
+        vectors = np.lib.format.open_memmap(
+            build_dir / VECTORS_FILE, mode="w+", dtype=np.float32, shape=(stats.chunks, self.embedder.dim)
+        )
+        vectors[:] = raw_vectors
+        vectors.flush()
+        del vectors, raw_vectors
+        raw_path.unlink()
+
+        with open(build_dir / CHUNKS_FILE, "r", encoding="utf-8") as f:
+            chunk_records = np.fromiter((json.loads(line)["record"] for line in f), dtype=np.int32)
+        np.save(build_dir / CHUNK_RECORDS_FILE, chunk_records)
+        metadata.save(build_dir / METADATA_FILE)
+        temporal.save(build_dir / TEMPORAL_FILE)
+        np.save(build_dir / PARTITIONS_FILE, np.array(record_partitions, dtype=np.int32))
+
+        with open(build_dir / RECORDS_FILE, "r", encoding="utf-8") as f:
+            BM25Index.build(record_text(json.loads(line)) for line in f).save(build_dir / BM25_FILE)
+
+        manifest = {
+            "model_id": self.embedder.model_id,
+            "embedder": self.embedder.config(),
+            "files": signatures,
+            "partitions": partitions,
+            "records": stats.records,
+            "chunks": stats.chunks,
+            "built_at": datetime.now().isoformat(),
+            "generation": generation
+        }
+        with open(build_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # Um único rename publica a geração inteira: quem abre o índice lê o
+        # manifest antigo (e a geração antiga, intacta) ou o novo.
+        pointer = output_dir / f".{MANIFEST_FILE}.tmp"
+        shutil.copyfile(build_dir / MANIFEST_FILE, pointer)
+        os.replace(pointer, output_dir / MANIFEST_FILE)
+        self._prune(output_dir, {generation, previous_generation}, legacy=previous_generation is not None)
+
+    @staticmethod
+    def _prune(output_dir: Path, keep, legacy: bool) -> None:
+        """Apaga gerações fora de ``keep`` (builds antigos ou interrompidos) e, com
+        ``legacy``, os arquivos do layout sem gerações, que ninguém mais lê."""
+        for path in output_dir.glob(f"{GENERATION_PREFIX}*"):
+            if path.is_dir() and path.name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+        if legacy:
+            for name in LEGACY_FILES:
+                try:
+                    (output_dir / name).unlink()
+                except OSError:
+                    pass
+
+    def _flush(self, batch, raw, stats: BuildStats):
+        if not batch:
+            return
+
+        pending = [index for index, (_, vector) in enumerate(batch) if vector is None]
+        embedded = self.embedder.embed([batch[index][0] for index in pending]) if pending else None
+
+        vectors = np.empty((len(batch), self.embedder.dim), dtype=np.float32)
+        for index, (_, vector) in enumerate(batch):
+            if vector is not None:
+                vectors[index] = vector
+        if pending:
+            vectors[pending] = embedded
+
+        raw.write(vectors.tobytes())
+        stats.embedded += len(pending)
+        stats.reused += len(batch) - len(pending)
+
+    @staticmethod
+    def _signature(path: Path) -> List[int]:
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def _load_manifest(output_dir: Path) -> Optional[dict]:
+        manifest_path = output_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _load_previous(output_dir: Path):
+        try:
+            with open(output_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                index_dir = generation_dir(output_dir, json.load(f))
+            chunks = read_jsonl(index_dir / CHUNKS_FILE)
+            vectors = np.load(index_dir / VECTORS_FILE, mmap_mode="r")
+        except (OSError, ValueError):
+            return {}, None
+        return {chunk["hash"]: row for row, chunk in enumerate(chunks)}, vectors
@@ -0,0 +1,72 @@
+"""Contagem de tráfego por agente e pré-carga dos índices mais consultados."""
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+
+class TrafficCounter:
+    """Conta consultas por agente numa janela deslizante de ``window_seconds``."""
+
+    def __init__(self, window_seconds: float = 900):
+        self.window_seconds = window_seconds
+        self._events: Deque[Tuple[float, str]] = deque()
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent_id: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._events.append((now, agent_id))
+            self._counts[agent_id] = self._counts.get(agent_id, 0) + 1
+            self._expire(now)
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        with self._lock:
+            self._expire(time.monotonic())
+            ranking = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        return ranking[:n]
+
+    def _expire(self, now: float) -> None:
+        limit = now - self.window_seconds
+        while self._events and self._events[0][0] < limit:
+            _, agent_id = self._events.popleft()
+            self._counts[agent_id] -= 1
+            if not self._counts[agent_id]:
+                del self._counts[agent_id]
+
+
+class IndexPrefetcher:
+    """Thread em background que aquece os índices dos agentes mais requisitados."""
+
+    def __init__(self, retriever, interval_seconds: float = 60, top_n: int = 5):
+        self.retriever = retriever
+        self.interval_seconds = interval_seconds
+        self.top_n = top_n
+        self.warmed: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "IndexPrefetcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="index-prefetcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> List[str]:
+        warmed = []
+        for agent_id, _ in self.retriever.traffic.top(self.top_n):
+            try:
+                if self.retriever.warm(agent_id):
+                    self.warmed[agent_id] = time.time()
+                    warmed.append(agent_id)
+            except Exception as e:
+                print(f"⚠️  Prefetch de '{agent_id}' falhou: {e}")
+        return warmed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
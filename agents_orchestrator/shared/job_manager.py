@@ -0,0 +1,127 @@
+"""Jobs assíncronos: execução em background, consulta por ID, TTL e cancelamento."""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobLimitError(Exception):
+    """Muitos jobs ainda não concluídos."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    metadata: dict
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def to_dict(self) -> dict:
+        def iso(timestamp):
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            **self.metadata
+        }
+        if self.status == SUCCEEDED:
+            data["result"] = self.result
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """Pool de ``max_workers`` threads para jobs; resultados ficam ``ttl_seconds``
+    após a conclusão. Cancelar um job na fila impede a execução; um job já em
+    execução termina a chamada corrente e o resultado é descartado."""
+
+    def __init__(self, max_workers: int = 4, ttl_seconds: float = 3600, max_pending: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max(int(max_workers), 1), thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[Job], Any], metadata: Optional[dict] = None) -> Job:
+        """Agenda ``fn(job)``; ``fn`` pode consultar ``job.cancelled`` entre etapas."""
+        self._purge()
+        job = Job(uuid.uuid4().hex, dict(metadata or {}))
+        with self._lock:
+            pending = sum(1 for other in self._jobs.values() if other.status not in FINISHED)
+            if pending >= self.max_pending:
+                raise JobLimitError(f"Limite de {self.max_pending} jobs pendentes atingido")
+            self._jobs[job.job_id] = job
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        with self._lock:
+            if job.cancelled:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            result = fn(job)
+        except Exception as e:
+            outcome = (FAILED, None, str(e))
+        else:
+            outcome = (SUCCEEDED, result, None)
+        with self._lock:
+            if not job.cancelled:
+                job.status, job.result, job.error = outcome
+                job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela o job (se ainda não concluído) e o retorna; ``None`` se não existe."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in FINISHED:
+                job.cancel_event.set()
+                job.status = CANCELLED
+                job.finished_at = time.time()
+            return job
+
+    def _purge(self) -> None:
+        limit = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINISHED and job.finished_at < limit]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        self._purge()
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"ttl_seconds": self.ttl_seconds, "max_pending": self.max_pending, "jobs": counts}
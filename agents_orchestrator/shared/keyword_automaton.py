@@ -0,0 +1,90 @@
+"""Automato Aho-Corasick para busca de várias palavras-chave em uma passada."""
+from collections import deque
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class KeywordAutomaton:
+    """Encontra todas as ocorrências de um conjunto de padrões em O(n + matches).
+
+    Os padrões devem ser adicionados já normalizados (ver ``normalize_text``).
+    Cada padrão carrega uma lista de payloads, devolvidos a cada ocorrência.
+    """
+
+    def __init__(self, whole_words: bool = True):
+        self.whole_words = whole_words
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def __len__(self) -> int:
+        return sum(len(out) for out in self._output)
+
+    def add(self, pattern: str, payload: Any) -> None:
+        if not pattern:
+            return
+
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        self._output[state].append((len(pattern), payload))
+        self._built = False
+
+    def build(self) -> "KeywordAutomaton":
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Gera (início, fim, payload) para cada padrão encontrado em ``text``."""
+        if not self._built:
+            self.build()
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            if not output[state]:
+                continue
+
+            end = index + 1
+            for length, payload in output[state]:
+                start = end - length
+                if self.whole_words and not self._is_whole_word(text, start, end):
+                    continue
+                yield start, end, payload
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if end < len(text) and text[end].isalnum():
+            return False
+        return True
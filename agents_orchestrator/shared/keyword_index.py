@@ -0,0 +1,112 @@
+"""Índice de palavras-chave de todos os agentes (uma passada por consulta)."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from shared.keyword_automaton import KeywordAutomaton
+from shared.text_normalizer import normalize_text, normalize_texts
+
+DEFAULT_WEIGHTS = {"primary": 1.0, "secondary": 0.5}
+
+
+class KeywordIndex:
+    """Pontua todos os agentes com um único automato sobre a consulta normalizada.
+
+    O score de um agente é o peso das palavras-chave distintas encontradas
+    dividido pelo peso total das suas palavras-chave (ou só o peso encontrado,
+    com ``normalize=False``).
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, normalize: bool = True):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.normalize = normalize
+        self.agent_ids: List[str] = []
+        self._automaton = KeywordAutomaton(whole_words=True)
+        self._keyword_weights: List[float] = []
+        self._keyword_agents: List[int] = []
+        self._totals: Dict[str, float] = {}
+
+    def add_agent(self, agent_id: str, keyword_groups: Dict[str, Iterable[str]]) -> None:
+        if agent_id not in self._totals:
+            self.agent_ids.append(agent_id)
+            self._totals[agent_id] = 0.0
+
+        seen = set()
+        for group, keywords in keyword_groups.items():
+            weight = self.weights.get(group, 0.0)
+            for keyword in keywords or []:
+                pattern = normalize_text(str(keyword))
+                if not pattern or pattern in seen:
+                    continue
+                seen.add(pattern)
+
+                keyword_id = len(self._keyword_weights)
+                self._keyword_weights.append(weight)
+                self._keyword_agents.append(self.agent_ids.index(agent_id))
+                self._automaton.add(pattern, (agent_id, keyword_id))
+                self._totals[agent_id] += weight
+
+    def build(self) -> "KeywordIndex":
+        self._automaton.build()
+        return self
+
+    def rank(self, query: str, candidates: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Retorna [(agent_id, score)] ordenado por score, para todos os agentes."""
+        allowed = set(candidates) if candidates is not None else None
+        matched: Dict[str, set] = {}
+
+        for _, _, (agent_id, keyword_id) in self._automaton.iter_matches(normalize_text(query)):
+            if allowed is not None and agent_id not in allowed:
+                continue
+            matched.setdefault(agent_id, set()).add(keyword_id)
+
+        scores = []
+        for agent_id in self.agent_ids:
+            if allowed is not None and agent_id not in allowed:
+                continue
+            total = self._totals[agent_id]
+            hits = matched.get(agent_id)
+            if not hits or not total:
+                scores.append((agent_id, 0.0))
+                continue
+            weight = sum(self._keyword_weights[keyword_id] for keyword_id in hits)
+            scores.append((agent_id, weight / total if self.normalize else weight))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores
+
+    def rank_batch(self, queries: List[str]) -> List[List[Tuple[str, float]]]:
+        """``rank`` de várias consultas com uma passada do automato sobre todas.
+
+        As consultas normalizadas são unidas por quebra de linha (que não
+        aparece em texto normalizado, então nenhum padrão atravessa duas
+        consultas); as ocorrências viram pares (consulta, palavra-chave) e os
+        scores saem de uma soma vetorizada por agente.
+        """
+        if not queries:
+            return []
+
+        texts = normalize_texts(queries)
+        starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+        matches = [(start, keyword_id) for start, _, (_, keyword_id) in self._automaton.iter_matches("\n".join(texts))]
+
+        scores = np.zeros((len(queries), len(self.agent_ids)), dtype=np.float64)
+        if matches:
+            positions, keyword_ids = np.array(matches, dtype=np.int64).T
+            rows = np.searchsorted(starts, positions, side="right") - 1
+            num_keywords = len(self._keyword_weights)
+            pair_rows, pair_keywords = np.divmod(np.unique(rows * num_keywords + keyword_ids), num_keywords)
+            np.add.at(scores, (pair_rows, np.array(self._keyword_agents)[pair_keywords]),
+                      np.array(self._keyword_weights)[pair_keywords])
+            if self.normalize:
+                totals = np.array([self._totals[agent_id] for agent_id in self.agent_ids])
+                scores = np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+
+        order = np.argsort(-scores, axis=1, kind="stable")
+        ranked_scores = np.take_along_axis(scores, order, axis=1).tolist()
+        agent_ids = self.agent_ids
+        return [
+            [(agent_ids[col], score) for col, score in zip(cols, row_scores)]
+            for cols, row_scores in zip(order.tolist(), ranked_scores)
+        ]
@@ -0,0 +1,112 @@
+"""Parser em streaming dos arquivos de conhecimento ([CAMPO]: valor ... ---)."""
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+
+from shared.text_normalizer import repair_mojibake, strip_accents
+
+RECORD_SEPARATOR = "---"
+_FIELD_RE = re.compile(r"^\[([^\]]+)\]:\s?(.*)$")
+
+EMPTY_VALUES = {"", "n/a", "na", "-"}
+
+# Campos de controle que não entram no texto embutido.
+NON_CONTENT_FIELDS = {
+    "ID", "DATA", "ORIGEM", "VERSAO LEGAL", "TIPO DE CONTEUDO",
+    "NIVEL DE COMPLEXIDADE", "_SOURCE", "_AGENT",
+}
+
+# Campos curtos repetidos no início de cada chunk para dar contexto ao trecho.
+HEADER_FIELDS = ["TEMA", "SECAO", "TOPICO", "TAGS"]
+
+# Campos de classificação: usados como filtro, não viram chunks próprios.
+CLASSIFICATION_FIELDS = {"IMPOSTO", "REGIME"}
+
+
+def field_key(name: str) -> str:
+    """'DESCRIÃ‡ÃƒO DETALHADA' -> 'DESCRICAO DETALHADA'."""
+    return strip_accents(repair_mojibake(name)).upper().strip()
+
+
+def is_empty(value: str) -> bool:
+    return value.strip().lower() in EMPTY_VALUES
+
+
+def iter_records(path: Union[str, Path]) -> Iterator[Dict[str, str]]:
+    """Lê um arquivo registro a registro, sem carregá-lo inteiro em memória.
+
+    Cada registro é um dict com as chaves normalizadas por ``field_key`` e os
+    valores com o mojibake corrigido. Linhas sem ``[CAMPO]:`` continuam o
+    campo anterior.
+    """
+    record: Dict[str, str] = {}
+    current = None
+
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        for raw_line in f:
+            line = raw_line.rstrip("\r\n")
+
+            if line.strip() == RECORD_SEPARATOR:
+                if record.get("ID"):
+                    yield record
+                record, current = {}, None
+                continue
+
+            match = _FIELD_RE.match(line)
+            if match:
+                current = field_key(match.group(1))
+                record[current] = repair_mojibake(match.group(2).strip())
+            elif current and line.strip():
+                record[current] = f"{record[current]}\n{repair_mojibake(line.strip())}".strip()
+
+    if record.get("ID"):
+        yield record
+
+
+def iter_knowledge_files(knowledge_path: Union[str, Path]) -> List[Path]:
+    path = Path(knowledge_path)
+    if path.is_file():
+        return [path]
+    if not path.is_dir():
+        return []
+    return sorted(path.glob("*.txt"))
+
+
+def iter_knowledge(knowledge_path: Union[str, Path]) -> Iterator[Dict[str, str]]:
+    for file_path in iter_knowledge_files(knowledge_path):
+        for record in iter_records(file_path):
+            record.setdefault("_SOURCE", file_path.name)
+            yield record
+
+
+def record_text(record: Dict[str, str], fields: List[str] = None) -> str:
+    """Concatena os campos preenchidos de um registro (todos, se ``fields`` for None)."""
+    keys = fields or [key for key in record if not key.startswith("_") and key != "ID"]
+    return "\n".join(
+        record[key] for key in keys
+        if key in record and not is_empty(record[key])
+    )
+
+
+def chunk_record(record: Dict[str, str]) -> List[Tuple[str, str]]:
+    """Divide um registro em chunks por campo: [(campo, texto)].
+
+    Cada chunk leva o cabeçalho (tema, seção, tópico, tags) do registro;
+    registros sem campos de conteúdo geram um único chunk só com o cabeçalho.
+    """
+    header = " | ".join(
+        record[key] for key in HEADER_FIELDS
+        if key in record and not is_empty(record[key])
+    )
+
+    chunks = []
+    for key, value in record.items():
+        if key in NON_CONTENT_FIELDS or key in HEADER_FIELDS or key in CLASSIFICATION_FIELDS:
+            continue
+        if is_empty(value):
+            continue
+        chunks.append((key, f"{header}\n{key}: {value}" if header else f"{key}: {value}"))
+
+    if not chunks and header:
+        chunks.append(("HEADER", header))
+    return chunks
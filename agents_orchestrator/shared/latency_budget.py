@@ -0,0 +1,130 @@
+"""Orçamento de latência por task_type: prazo, requisição duplicada (hedge) e fallback."""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from shared.crew_executor import QueueFullError
+
+
+@dataclass
+class LatencyBudget:
+    deadline_seconds: Optional[float] = None
+    hedge: bool = True
+    hedge_percentile: float = 95
+    hedge_after_seconds: Optional[float] = None
+    min_samples: int = 20
+    fallback_task_type: Optional[str] = None
+    fallback_seconds: float = 15
+
+    @classmethod
+    def from_config(cls, defaults: dict, task_type: str, task_config: Optional[dict] = None) -> "LatencyBudget":
+        """``latency_budgets`` do agents_control.yaml, sobrescrito por ``latency_budget`` da task."""
+        config = {key: value for key, value in defaults.items() if not isinstance(value, dict)}
+        config.update(defaults.get(task_type, {}) or {})
+        config.update((task_config or {}).get('latency_budget', {}) or {})
+        return cls(**{name: config[name] for name in cls.__dataclass_fields__ if name in config})
+
+    def hedge_delay(self, samples: int, percentile: Callable[[float], Optional[float]]) -> Optional[float]:
+        """Quando duplicar a chamada: percentil das latências observadas ou, com poucas
+        amostras, ``hedge_after_seconds``. ``None`` desliga o hedge."""
+        if not self.hedge:
+            return None
+        delay = self.hedge_after_seconds
+        if samples >= self.min_samples:
+            observed_ms = percentile(self.hedge_percentile)
+            if observed_ms is not None:
+                delay = observed_ms / 1000
+        if delay is None or (self.deadline_seconds is not None and delay >= self.deadline_seconds):
+            return None
+        return delay
+
+
+@dataclass
+class RaceOutcome:
+    value: Any = None
+    path: str = "primary"  # primary | hedge | deadline
+    hedged: bool = False
+    pending: List[Future] = field(default_factory=list)
+
+
+class PrimaryStream:
+    """Repassa ao cliente os trechos da chamada principal enquanto o hedge não vence.
+
+    Depois que um trecho foi entregue o cliente já está lendo a resposta da
+    principal, então o hedge não pode mais ser escolhido; e, escolhido o
+    hedge, os trechos da principal deixam de ser repassados.
+    """
+
+    def __init__(self, on_chunk: Callable[[str], None]):
+        self.on_chunk = on_chunk
+        self.started = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def forward(self, text: str) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.started = True
+            self.on_chunk(text)
+
+    def claim_for_hedge(self) -> bool:
+        """True (e corta a principal) se nada foi entregue; False se o cliente já recebeu trechos."""
+        with self._lock:
+            if self.started:
+                return False
+            self._closed = True
+            return True
+
+
+def race(submit: Callable[[bool], Future], budget: LatencyBudget,
+         hedge_delay: Optional[float] = None, stream: Optional[PrimaryStream] = None,
+         accept: Callable[[Any], bool] = lambda value: True) -> RaceOutcome:
+    """Roda ``submit(True)``; passado ``hedge_delay`` sem resposta, dispara ``submit(False)``
+    e fica com a primeira que terminar com sucesso (sem exceção e ``accept(valor)``)
+    dentro do prazo. Se todas falharem, devolve a falha da principal. Se a fila
+    estiver cheia para o hedge, segue só com a principal. Com ``stream``, a
+    principal que já começou a ser transmitida não é trocada pelo hedge."""
+    start = time.monotonic()
+    deadline = start + budget.deadline_seconds if budget.deadline_seconds else None
+    futures = [submit(True)]
+    hedged = False
+
+    if hedge_delay is not None:
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done and (stream is None or not stream.started):
+            try:
+                futures.append(submit(False))
+                hedged = True
+            except QueueFullError:
+                pass
+
+    def remaining():
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+    def outcome(winner: Future) -> RaceOutcome:
+        return RaceOutcome(
+            value=winner.result(),
+            path="primary" if winner is futures[0] else "hedge",
+            hedged=hedged,
+            pending=[future for future in futures if future is not winner and not future.done()]
+        )
+
+    waiting = list(futures)
+    while waiting:
+        done, _ = wait(waiting, timeout=remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            return RaceOutcome(path="deadline", hedged=hedged,
+                               pending=[future for future in futures if not future.done()])
+        for future in [future for future in futures if future in done]:
+            waiting.remove(future)
+            if future.exception() is not None or not accept(future.result()):
+                continue
+            if future is not futures[0] and stream is not None and not stream.claim_for_hedge():
+                # O cliente já recebeu trechos da principal: só ela pode terminar a resposta.
+                continue
+            return outcome(future)
+
+    return outcome(futures[0])
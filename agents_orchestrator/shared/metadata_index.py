@@ -0,0 +1,156 @@
+"""Índice invertido dos campos estruturados dos registros (valor -> bitset de registros)."""
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from shared.keyword_automaton import KeywordAutomaton
+from shared.knowledge_parser import field_key, is_empty
+from shared.text_normalizer import normalize_text
+
+METADATA_FILE = "metadata.json"
+
+# Campo -> separador dos valores múltiplos ("IRPJ / CSLL", "tag_a, tag_b").
+METADATA_FIELDS = {
+    "IMPOSTO": "/",
+    "REGIME": "/",
+    "TEMA": None,
+    "BASE LEGAL": ";",
+    "NIVEL DE COMPLEXIDADE": None,
+    "TAGS": ",",
+}
+
+# Campos procurados no texto da pergunta quando o cliente não envia filtros.
+DEFAULT_DETECT_FIELDS = ["IMPOSTO", "REGIME"]
+
+
+def bits_to_mask(bits: int, size: int) -> np.ndarray:
+    """Converte um bitset (bit ``i`` = registro ``i``) em máscara booleana."""
+    packed = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder="little")[:size].astype(bool)
+
+
+def split_values(field: str, value: str) -> List[str]:
+    if not value or is_empty(value):
+        return []
+    separator = METADATA_FIELDS.get(field)
+    parts = value.split(separator) if separator else [value]
+    return [normalize_text(part) for part in parts if part.strip() and not is_empty(part)]
+
+
+class MetadataIndex:
+    """Bitsets (``int`` do Python, bit ``i`` = registro ``i``) por campo e valor.
+
+    Filtros combinam valores do mesmo campo com OU e campos diferentes com E:
+    ``{"REGIME": ["Lucro Presumido"], "IMPOSTO": ["CSLL"]}``.
+    """
+
+    def __init__(self, num_records: int = 0,
+                 postings: Optional[Dict[str, Dict[str, int]]] = None):
+        self.num_records = num_records
+        self.postings: Dict[str, Dict[str, int]] = postings or {field: {} for field in METADATA_FIELDS}
+        self._automata: Dict[tuple, KeywordAutomaton] = {}
+
+    def add(self, row: int, record: Dict[str, str]) -> None:
+        bit = 1 << row
+        for field in METADATA_FIELDS:
+            values = self.postings.setdefault(field, {})
+            for value in split_values(field, record.get(field, "")):
+                values[value] = values.get(value, 0) | bit
+        self.num_records = max(self.num_records, row + 1)
+        self._automata.clear()
+
+    def add_values(self, field: str, values: Iterable[str]) -> None:
+        """Valores conhecidos sem registro: só ampliam o vocabulário do ``detect``."""
+        postings = self.postings.setdefault(field_key(field), {})
+        for value in values:
+            postings.setdefault(normalize_text(value), 0)
+        self._automata.clear()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, str]]) -> "MetadataIndex":
+        index = cls()
+        for row, record in enumerate(records):
+            index.add(row, record)
+        return index
+
+    def values(self, field: str) -> List[str]:
+        return sorted(self.postings.get(field_key(field), {}))
+
+    def normalize_filters(self, filters: Optional[Dict]) -> Dict[str, List[str]]:
+        """Aceita nomes de campo/valores em qualquer caixa e valor único ou lista."""
+        normalized = {}
+        for field, values in (filters or {}).items():
+            key = field_key(field)
+            if key not in METADATA_FIELDS:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            cleaned = [normalize_text(value) for value in values or [] if str(value).strip()]
+            if cleaned:
+                normalized[key] = cleaned
+        return normalized
+
+    def bitset(self, filters: Dict[str, List[str]]) -> Optional[int]:
+        """Bitset dos registros que atendem ``filters`` (já normalizados); None sem filtro."""
+        if not filters:
+            return None
+
+        result = (1 << self.num_records) - 1
+        for field, values in filters.items():
+            postings = self.postings.get(field, {})
+            matched = 0
+            for value in values:
+                matched |= postings.get(value, 0)
+            result &= matched
+        return result
+
+    def mask(self, filters: Dict[str, List[str]]) -> Optional[np.ndarray]:
+        bits = self.bitset(filters)
+        if bits is None:
+            return None
+        return bits_to_mask(bits, self.num_records)
+
+    def count(self, filters: Dict[str, List[str]]) -> int:
+        bits = self.bitset(filters)
+        return self.num_records if bits is None else bin(bits).count("1")
+
+    def detect(self, query: str, fields: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Filtros implícitos: valores conhecidos dos ``fields`` citados na pergunta."""
+        fields = tuple(field_key(field) for field in fields or DEFAULT_DETECT_FIELDS)
+        automaton = self._automata.get(fields)
+        if automaton is None:
+            automaton = self._automata[fields] = self._build_automaton(fields)
+
+        detected: Dict[str, List[str]] = {}
+        for _, _, (field, value) in automaton.iter_matches(normalize_text(query)):
+            if value not in detected.setdefault(field, []):
+                detected[field].append(value)
+        return detected
+
+    def _build_automaton(self, fields: Iterable[str]) -> KeywordAutomaton:
+        automaton = KeywordAutomaton()
+        for field in fields:
+            for value in self.postings.get(field, {}):
+                automaton.add(value, (field, value))
+        return automaton.build()
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "records": self.num_records,
+                "postings": {
+                    field: {value: format(bits, "x") for value, bits in values.items()}
+                    for field, values in self.postings.items()
+                }
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "MetadataIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["records"], {
+            field: {value: int(bits, 16) for value, bits in values.items()}
+            for field, values in data["postings"].items()
+        })
@@ -0,0 +1,47 @@
+"""Métricas de latência por caminho de resposta (faq, cache, crew...)."""
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import numpy as np
+
+
+class LatencyStats:
+    """Últimas ``window`` latências (ms) de cada caminho, com percentis."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, latency_ms: float) -> None:
+        with self._lock:
+            if path not in self._samples:
+                self._samples[path] = deque(maxlen=self.window)
+                self._counts[path] = 0
+            self._samples[path].append(latency_ms)
+            self._counts[path] += 1
+
+    def samples(self, path: str) -> int:
+        with self._lock:
+            return len(self._samples.get(path, ()))
+
+    def percentile(self, path: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._samples.get(path, ()))
+        return float(np.percentile(samples, q)) if samples else None
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            items = [(path, list(samples), self._counts[path]) for path, samples in self._samples.items()]
+        return {
+            path: {
+                "count": count,
+                "mean_ms": round(float(np.mean(samples)), 3),
+                "p50_ms": round(float(np.percentile(samples, 50)), 3),
+                "p95_ms": round(float(np.percentile(samples, 95)), 3),
+                "p99_ms": round(float(np.percentile(samples, 99)), 3),
+            }
+            for path, samples, count in sorted(items)
+        }
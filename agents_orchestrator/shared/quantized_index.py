@@ -0,0 +1,297 @@
+"""Índice vetorial comprimido: IVF (k-means) + códigos int8 ou PQ, com re-ranking exato."""
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+INDEX_TYPES = ("ivf_int8", "ivf_pq")
+
+# Pontos de treino por centróide abaixo dos quais o k-means fica instável
+# (mesma regra prática do FAISS); limita nlist e o tamanho dos codebooks do PQ.
+MIN_POINTS_PER_CENTROID = 39
+# Dimensões por subespaço do PQ: 1 byte a cada 8 floats (32x nos códigos).
+PQ_SUB_DIM = 8
+# Abaixo disso a varredura float32 cabe no cache e custa o mesmo que o IVF.
+QUANTIZE_FASTER_FROM = 10_000
+
+
+def quantized_file(index_type: str) -> str:
+    return f"{index_type}.npz"
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, spherical: bool = False,
+           seed: int = 0) -> np.ndarray:
+    """Centróides de ``data`` (n, d). Com ``spherical`` usa similaridade de cosseno."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        assign = _nearest(data, centroids, spherical)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k).astype(np.float32)
+
+        empty = counts == 0
+        if empty.any():
+            # Centróide sem pontos recomeça num ponto aleatório.
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+            counts[empty] = 1.0
+        centroids = sums / counts[:, None]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    return centroids.astype(np.float32)
+
+
+def default_params(num_vectors: int, dim: int, index_type: str) -> Dict[str, int]:
+    """nlist, pq_m e ksub proporcionais ao corpus.
+
+    Os centróides (nlist x dim) e os codebooks do PQ (ksub x dim, qualquer
+    que seja pq_m) são float32 e não encolhem com o corpus: com ksub=256 fixo
+    os codebooks de um corpus de mil vetores já pesam um quarto da matriz
+    original. Por isso nlist e ksub crescem com o número de vetores.
+    """
+    per_centroid = max(num_vectors // MIN_POINTS_PER_CENTROID, 1)
+    params = {"nlist": max(1, min(int(np.sqrt(num_vectors)), per_centroid))}
+    if index_type == "ivf_pq":
+        params["pq_m"] = next(m for m in range(max(dim // PQ_SUB_DIM, 1), 0, -1) if dim % m == 0)
+        params["ksub"] = int(min(256, max(16, 2 ** int(np.log2(per_centroid)))))
+    return params
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    if spherical:
+        return np.argmax(data @ centroids.T, axis=1)
+    distances = (centroids ** 2).sum(axis=1)[None, :] - 2.0 * (data @ centroids.T)
+    return np.argmin(distances, axis=1)
+
+
+class QuantizedIndex:
+    """Lista invertida (IVF) sobre códigos compactos dos vetores dos chunks.
+
+    A busca visita as ``nprobe`` listas mais próximas da consulta, pontua os
+    candidatos pelos códigos (int8 ou PQ) e recalcula o score exato só dos
+    ``rerank`` melhores, lendo essas linhas da matriz float32 mapeada em disco.
+    """
+
+    def __init__(self, index_type: str, centroids: np.ndarray, offsets: np.ndarray,
+                 list_rows: np.ndarray, codes: np.ndarray, scales: Optional[np.ndarray] = None,
+                 codebooks: Optional[np.ndarray] = None, source: str = ""):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"index_type inválido: {index_type} (use {', '.join(INDEX_TYPES)})")
+        self.index_type = index_type
+        self.centroids = centroids
+        self.offsets = offsets
+        self.list_rows = list_rows
+        self.codes = codes
+        self.scales = scales
+        self.codebooks = codebooks
+        self.source = source
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.centroids, self.offsets, self.list_rows, self.codes, self.scales, self.codebooks]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, index_type: str = "ivf_int8", nlist: Optional[int] = None,
+              pq_m: Optional[int] = None, ksub: Optional[int] = None, max_train: int = 50_000,
+              batch_size: int = 65_536, source: str = "", seed: int = 0) -> "QuantizedIndex":
+        """Parâmetros omitidos vêm de ``default_params``."""
+        num_vectors, dim = vectors.shape
+        defaults = default_params(num_vectors, dim, index_type)
+        nlist = nlist or defaults["nlist"]
+        pq_m = pq_m or defaults.get("pq_m")
+        ksub = ksub or defaults.get("ksub")
+
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(num_vectors, min(max_train, num_vectors), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+
+        centroids = kmeans(sample, nlist, spherical=True, seed=seed)
+
+        codebooks = None
+        if index_type == "ivf_pq":
+            if dim % pq_m:
+                raise ValueError(f"pq_m={pq_m} precisa dividir a dimensão {dim}")
+            sub = sample.reshape(len(sample), pq_m, dim // pq_m)
+            codebooks = np.stack([
+                kmeans(sub[:, j, :], min(ksub, 256), iterations=10, seed=seed + j) for j in range(pq_m)
+            ])
+
+        assign = np.empty(num_vectors, dtype=np.int32)
+        if index_type == "ivf_pq":
+            codes = np.empty((num_vectors, pq_m), dtype=np.uint8)
+            scales = None
+        else:
+            codes = np.empty((num_vectors, dim), dtype=np.int8)
+            scales = np.empty(num_vectors, dtype=np.float32)
+
+        for start in range(0, num_vectors, batch_size):
+            batch = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+            end = start + len(batch)
+            assign[start:end] = _nearest(batch, centroids, spherical=True)
+            if index_type == "ivf_pq":
+                codes[start:end] = cls._encode_pq(batch, codebooks)
+            else:
+                codes[start:end], scales[start:end] = cls._encode_int8(batch)
+
+        list_rows = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=len(centroids))))).astype(np.int64)
+
+        return cls(index_type, centroids, offsets, list_rows, codes, scales, codebooks, source)
+
+    @staticmethod
+    def _encode_int8(batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scales = np.abs(batch).max(axis=1) / 127.0
+        safe = np.where(scales > 0, scales, 1.0)
+        codes = np.clip(np.rint(batch / safe[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @staticmethod
+    def _encode_pq(batch: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+        pq_m, _, sub_dim = codebooks.shape
+        sub = batch.reshape(len(batch), pq_m, sub_dim)
+        codes = np.empty((len(batch), pq_m), dtype=np.uint8)
+        for j in range(pq_m):
+            codes[:, j] = _nearest(sub[:, j, :], codebooks[j], spherical=False)
+        return codes
+
+    @staticmethod
+    def _source(source: str, params: dict) -> str:
+        return f"{source}|" + ",".join(f"{key}={params[key]}" for key in sorted(params))
+
+    @classmethod
+    def load_current(cls, index_dir: Union[str, Path], index_type: str,
+                     source: str, **params) -> Optional["QuantizedIndex"]:
+        """``<index_dir>/<index_type>.npz`` se foi treinado sobre os mesmos vetores (e,
+        se passados, os mesmos parâmetros); ``None`` se não existe ou está desatualizado."""
+        path = Path(index_dir) / quantized_file(index_type)
+        if not path.exists():
+            return None
+        try:
+            index = cls.load(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        if params:
+            return index if index.source == cls._source(source, params) else None
+        return index if index.source.split("|", 1)[0] == source else None
+
+    @classmethod
+    def load_or_train(cls, index_dir: Union[str, Path], vectors: np.ndarray, index_type: str,
+                      source: str, **params) -> "QuantizedIndex":
+        """Reaproveita o índice gravado (ver ``load_current``); senão treina e grava o arquivo."""
+        index = cls.load_current(index_dir, index_type, source, **params)
+        if index is not None:
+            return index
+
+        path = Path(index_dir) / quantized_file(index_type)
+        index = cls.train(vectors, index_type, source=cls._source(source, params), **params)
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"⚠️  Não foi possível gravar {path.name}: {e}")
+        return index
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = min(nprobe, self.nlist)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.list_rows[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+    def approximate_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        if self.index_type == "ivf_pq":
+            pq_m, ksub, sub_dim = self.codebooks.shape
+            # Tabela (pq_m, ksub): produto da consulta com cada centróide de cada subespaço,
+            # lida achatada (subespaço m começa em m * ksub) com um único ``take``.
+            table = np.matmul(self.codebooks, query.reshape(pq_m, sub_dim, 1)).ravel()
+            offsets = np.arange(0, pq_m * ksub, ksub, dtype=np.intp)
+            return np.take(table, self.codes[rows].astype(np.intp) + offsets).sum(axis=1)
+        return (self.codes[rows].astype(np.float32) @ query) * self.scales[rows]
+
+    def search(self, query: np.ndarray, vectors: np.ndarray, top_k: int, nprobe: int = 8,
+               rerank: int = 100, row_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (linhas, scores exatos) dos chunks mais próximos, em ordem decrescente."""
+        rows = self.candidates(query, nprobe)
+        if row_mask is not None:
+            rows = rows[row_mask[rows]]
+        if not len(rows):
+            return rows, np.zeros(0, dtype=np.float32)
+
+        keep = min(max(rerank, top_k), len(rows))
+        approx = self.approximate_scores(query, rows)
+        rows = np.sort(rows[np.argpartition(-approx, keep - 1)[:keep]])
+
+        exact = np.asarray(vectors[rows]) @ query
+        order = np.argsort(-exact, kind="stable")[:top_k]
+        return rows[order], exact[order]
+
+    def save(self, path: Union[str, Path]) -> None:
+        arrays = {
+            "index_type": np.array(self.index_type),
+            "source": np.array(self.source),
+            "centroids": self.centroids,
+            "offsets": self.offsets,
+            "list_rows": self.list_rows,
+            "codes": self.codes,
+        }
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        if self.codebooks is not None:
+            arrays["codebooks"] = self.codebooks
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "QuantizedIndex":
+        with np.load(path) as data:
+            return cls(
+                str(data["index_type"]),
+                data["centroids"],
+                data["offsets"],
+                data["list_rows"],
+                data["codes"],
+                data["scales"] if "scales" in data.files else None,
+                data["codebooks"] if "codebooks" in data.files else None,
+                str(data["source"])
+            )
+
+
+def recall_at_k(exact: Sequence[Sequence[int]], approximate: Sequence[Sequence[int]]) -> float:
+    """Fração dos ids do resultado exato que também aparecem no aproximado."""
+    found = total = 0
+    for expected, got in zip(exact, approximate):
+        expected = set(expected)
+        found += len(expected & set(got))
+        total += len(expected)
+    return found / total if total else 1.0
+
+
+def evaluate(store, queries: List[str], top_k: int = 10) -> Dict[str, float]:
+    """Compara a busca de ``store`` com e sem o índice comprimido: recall@k e latência."""
+    quantized = store.quantized
+    exact, approximate, flat_ms, quantized_ms = [], [], [], []
+
+    for query in queries:
+        store.quantized = None
+        start = time.perf_counter()
+        exact.append([row for row, _ in store.search_records(query, top_k)])
+        flat_ms.append((time.perf_counter() - start) * 1000)
+
+        store.quantized = quantized
+        start = time.perf_counter()
+        approximate.append([row for row, _ in store.search_records(query, top_k)])
+        quantized_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "queries": len(queries),
+        f"recall@{top_k}": round(recall_at_k(exact, approximate), 4),
+        "flat_p99_ms": round(float(np.percentile(flat_ms, 99)), 3) if flat_ms else 0.0,
+        "quantized_p99_ms": round(float(np.percentile(quantized_ms, 99)), 3) if quantized_ms else 0.0,
+        "flat_mb": round(store.vectors.nbytes / 2 ** 20, 2),
+        "quantized_mb": round(quantized.nbytes / 2 ** 20, 2) if quantized is not None else 0.0,
+    }
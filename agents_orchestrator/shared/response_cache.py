@@ -0,0 +1,320 @@
+"""Cache de respostas do /api/chat com backends em memória, SQLite e Redis (RESP)."""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from shared.lru_cache import LRUCache
+from shared.text_normalizer import normalize_text
+
+
+def normalize_query(query: str) -> str:
+    """'O que é IRPJ?' e 'o que e irpj' viram a mesma chave."""
+    return normalize_text(query).rstrip("?!. ")
+
+
+class TemplateVersion:
+    """Hash do conteúdo de config.yaml/tasks.yaml de um agente.
+
+    Entra na chave do cache: quando um dos arquivos muda, as respostas
+    antigas deixam de ser encontradas (e expiram pelo TTL/LRU). O hash só é
+    recalculado quando o (mtime, tamanho) do arquivo muda.
+    """
+
+    def __init__(self, agents_dir: Union[str, Path], files: Iterable[str] = ("config.yaml", "tasks.yaml")):
+        self.agents_dir = Path(agents_dir)
+        self.files = tuple(files)
+        self._digests: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def of(self, agent_id: str) -> str:
+        digest = hashlib.sha1()
+        for name in self.files:
+            digest.update(name.encode("utf-8"))
+            digest.update(self._file_digest(self.agents_dir / agent_id / name).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _file_digest(self, path: Path) -> str:
+        try:
+            stat = path.stat()
+        except OSError:
+            return "-"
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._digests.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+        with open(path, "rb") as f:
+            value = hashlib.sha1(f.read()).hexdigest()
+        with self._lock:
+            self._digests[path] = (signature, value)
+        return value
+
+
+class MemoryBackend:
+    """LRU em processo; cada valor guarda seu instante de expiração."""
+
+    def __init__(self, max_entries: int = 10000):
+        self._cache = LRUCache(max_entries)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._cache.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        return value if expires_at > time.time() else None
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        self._cache.put(key, (time.time() + ttl_seconds, value))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "max_entries": self._cache.max_size}
+
+
+class SQLiteBackend:
+    """Arquivo SQLite compartilhado entre processos; LRU por ``last_used``."""
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl_seconds, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"size": size, "max_entries": self.max_entries, "path": str(self.path)}
+
+
+class RedisBackend:
+    """Cliente mínimo do protocolo Redis (RESP2) via socket, sem dependências.
+
+    TTL usa ``SET ... PX``; o limite de tamanho fica com o servidor
+    (``maxmemory`` + ``maxmemory-policy allkeys-lru``).
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, prefix: str = "taxhub:chat:", timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._command("GET", self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        self._command("SET", self.prefix + key, value, "PX", str(max(int(ttl_seconds * 1000), 1)))
+
+    def clear(self) -> None:
+        cursor = "0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", "500")
+            if keys:
+                self._command("DEL", *[key.decode("utf-8") for key in keys])
+            cursor = cursor.decode("utf-8")
+            if cursor == "0":
+                break
+
+    def stats(self) -> dict:
+        return {"backend": f"redis://{self.host}:{self.port}/{self.db}"}
+
+    def _command(self, *args):
+        with self._lock:
+            try:
+                return self._send(args)
+            except (OSError, ConnectionError):
+                # Reconecta uma vez (conexão derrubada pelo servidor ou timeout).
+                self._close()
+                return self._send(args)
+
+    def _send(self, args):
+        if self._sock is None:
+            self._connect()
+        self._sock.sendall(self._encode(args))
+        return self._read()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._sock.sendall(self._encode(("AUTH", self.password)))
+            self._read()
+        if self.db:
+            self._sock.sendall(self._encode(("SELECT", str(self.db))))
+            self._read()
+
+    def _close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Conexão com o Redis encerrada")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RuntimeError(f"Redis: {payload.decode('utf-8')}")
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise ConnectionError(f"Resposta RESP inválida: {line!r}")
+
+
+def create_backend(config: dict, base_dir: Union[str, Path]):
+    backend = config.get('backend', 'memory')
+    max_entries = config.get('max_entries', 10000)
+    if backend == 'sqlite':
+        return SQLiteBackend(Path(base_dir) / config.get('sqlite_path', 'cache/responses.sqlite'), max_entries)
+    if backend == 'redis':
+        redis_config = config.get('redis', {}) or {}
+        return RedisBackend(
+            host=redis_config.get('host', 'localhost'),
+            port=redis_config.get('port', 6379),
+            db=redis_config.get('db', 0),
+            password=redis_config.get('password') or os.getenv('REDIS_PASSWORD'),
+            prefix=redis_config.get('prefix', 'taxhub:chat:')
+        )
+    if backend == 'memory':
+        return MemoryBackend(max_entries)
+    raise ValueError(f"Backend de cache desconhecido: {backend}")
+
+
+class ResponseCache:
+    """Respostas indexadas por (agente, task_type, pergunta normalizada, versão do template)."""
+
+    def __init__(self, backend, versions: TemplateVersion, ttl_seconds: float = 86400):
+        self.backend = backend
+        self.versions = versions
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def key(self, agent_id: str, task_type: str, query: str, **params) -> str:
+        payload = json.dumps({
+            "agent": agent_id,
+            "task_type": task_type,
+            "query": normalize_query(query),
+            "version": self.versions.of(agent_id),
+            "params": {name: value for name, value in params.items() if value is not None},
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # Cache indisponível não pode derrubar o atendimento.
+            self.errors += 1
+            print(f"⚠️  Cache de respostas indisponível: {e}")
+            return None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, result: dict) -> None:
+        try:
+            self.backend.set(key, json.dumps(result, ensure_ascii=False), self.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  Falha ao gravar no cache de respostas: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        try:
+            backend_stats = self.backend.stats()
+        except Exception as e:
+            backend_stats = {"error": str(e)}
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            **backend_stats
+        }
@@ -0,0 +1,410 @@
+"""Etapa de recuperação (RAG) executada antes do Crew.kickoff."""
+import threading
+import time
+from datetime import date
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from shared.embedding_cache import CachedEmbedder, EmbeddingCache
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.index_prefetcher import TrafficCounter
+from shared.metadata_index import MetadataIndex, split_values
+from shared.quantized_index import QuantizedIndex
+from shared.segment_index import SegmentedIndex
+from shared.temporal_index import detect_reference, parse_date, parse_validity
+from shared.knowledge_parser import is_empty
+from shared.vector_store import UNIFIED_INDEX, VectorStore
+
+CONTEXT_FIELDS = [
+    ("TEMA", "Tema"),
+    ("TOPICO", "Tópico"),
+    ("DESCRICAO DETALHADA", "Descrição"),
+    ("EXEMPLO PRATICO", "Exemplo"),
+    ("BASE LEGAL", "Base legal"),
+]
+
+
+def _record_id(record: Dict[str, str], row: int) -> str:
+    """Registros em segmentos podem vir sem [ID]; usa o id global do documento."""
+    return record.get("ID") or str(row)
+
+
+@dataclass
+class RetrievalResult:
+    context: str = ""
+    record_ids: List[str] = field(default_factory=list)
+    scores: List[float] = field(default_factory=list)
+    latency_ms: float = 0.0
+    filters: Dict[str, List[str]] = field(default_factory=dict)
+    partitions: List[str] = field(default_factory=list)
+    reference_date: Optional[str] = None
+
+
+class KnowledgeRetriever:
+    """Abre o índice de cada agente na primeira consulta e monta o contexto recuperado.
+
+    Índices gerados pelo ``build_indices.py`` são mapeados em memória (mmap),
+    então abrir um agente não copia vetores para o heap do processo.
+    """
+
+    def __init__(self, registry, traffic_window_seconds: float = 900):
+        self.registry = registry
+        self.traffic = TrafficCounter(traffic_window_seconds)
+        self._stores: Dict[str, VectorStore] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.embedding_cache = self._open_embedding_cache()
+
+    def is_enabled(self, agent_id: str) -> bool:
+        if not self.registry.global_config.get('enable_rag', False):
+            return False
+        return bool(self._rag_config(agent_id).get('enabled', False))
+
+    def retrieve(self, agent_id: str, query: str, top_k: Optional[int] = None,
+                 filters: Optional[Dict] = None, partitions: Optional[List[str]] = None,
+                 reference_date: Optional[str] = None) -> RetrievalResult:
+        """Busca os registros mais próximos de ``query``.
+
+        ``filters`` explícitos ({campo: valor(es)}) restringem os candidatos
+        antes da busca. Sem eles, valores de IMPOSTO/REGIME citados na
+        pergunta viram filtro, descartado se sobrarem menos de ``top_k``
+        registros.
+
+        Com o índice único habilitado, a busca fica restrita à partição do
+        agente, ou às ``partitions`` (agentes ou categorias, "*" = todas)
+        pedidas aqui ou em ``rag_config.search_partitions``.
+
+        Registros fora da vigência em ``reference_date`` (AAAA, AAAA-MM ou
+        data; padrão: ano citado na pergunta ou hoje) são descartados antes
+        da busca.
+        """
+        self.traffic.record(agent_id)
+        store = self._store_for(agent_id)
+        if store is None:
+            return RetrievalResult()
+
+        rag_config = self._rag_config(agent_id)
+        top_k = top_k or rag_config.get('top_k', 3)
+
+        if isinstance(store, SegmentedIndex):
+            return self._retrieve_segments(store, query, top_k, filters, reference_date, rag_config)
+
+        start = time.perf_counter()
+        searched, reference, base_mask, applied = self._plan(
+            store, agent_id, query, top_k, filters, partitions, reference_date, rag_config
+        )
+        hits = self._search(store, query, top_k, self._combine(base_mask, store.metadata.mask(applied)), rag_config)
+        context = self._format_context(store, hits, rag_config.get('max_context_chars', 4000))
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        return RetrievalResult(
+            context=context,
+            record_ids=[store.records[row]["ID"] for row, _ in hits],
+            scores=[round(score, 4) for _, score in hits],
+            latency_ms=round(latency_ms, 3),
+            filters=applied,
+            partitions=searched,
+            reference_date=reference
+        )
+
+    def cache_scope(self, agent_id: str, query: str, filters: Optional[Dict] = None,
+                    reference_date: Optional[str] = None) -> Dict:
+        """Vigência e filtros que ``retrieve`` aplicaria a ``query`` (explícitos ou
+        detectados na pergunta). Uma resposta guardada só vale para o mesmo escopo."""
+        scope = {"reference_date": reference_date or detect_reference(query), "filters": filters or None}
+        if not self.is_enabled(agent_id):
+            return scope
+        store = self._store_for(agent_id)
+        if store is None or isinstance(store, SegmentedIndex):
+            return scope
+
+        rag_config = self._rag_config(agent_id)
+        _, reference, _, applied = self._plan(
+            store, agent_id, query, rag_config.get('top_k', 3), filters, None, reference_date, rag_config
+        )
+        return {"reference_date": reference, "filters": applied or None}
+
+    def _plan(self, store: VectorStore, agent_id: str, query: str, top_k: int, filters: Optional[Dict],
+              partitions: Optional[List[str]], reference_date: Optional[str], rag_config: dict):
+        """(partições, vigência, máscara base, filtros aplicados) de uma busca."""
+        searched = self._resolve_partitions(store, agent_id, partitions or rag_config.get('search_partitions'))
+        reference = self._resolve_reference(query, reference_date, rag_config.get('temporal', {}) or {})
+        base_mask = self._combine(
+            store.partition_mask(searched) if searched != store.partitions else None,
+            store.temporal.mask(reference)
+        )
+        applied = self._resolve_filters(store, query, filters, top_k, base_mask,
+                                        rag_config.get('metadata_filters', {}) or {})
+        return searched, reference, base_mask, applied
+
+    def _retrieve_segments(self, index: SegmentedIndex, query: str, top_k: int, filters: Optional[Dict],
+                           reference_date: Optional[str], rag_config: dict) -> RetrievalResult:
+        """Busca BM25 no índice em disco (corpora de jurisprudência).
+
+        O índice em segmentos não tem bitsets de metadados nem de vigência:
+        ``filters`` e a vigência são conferidos registro a registro nos
+        ``segment_filter_depth`` × ``top_k`` melhores candidatos do BM25 (com
+        filtro muito seletivo podem sobrar menos de ``top_k``).
+        """
+        start = time.perf_counter()
+        applied = MetadataIndex().normalize_filters(filters)
+        reference = self._resolve_reference(query, reference_date, rag_config.get('temporal', {}) or {})
+        if applied or reference:
+            period = parse_date(reference) if reference else None
+            depth = top_k * rag_config.get('segment_filter_depth', 10)
+            hits = [
+                (row, score) for row, score in index.search(query, depth)
+                if self._record_matches(index.records[row], applied, period)
+            ][:top_k]
+        else:
+            hits = index.search(query, top_k)
+        context = self._format_context(index, hits, rag_config.get('max_context_chars', 4000))
+        latency_ms = (time.perf_counter() - start) * 1000
+        return RetrievalResult(
+            context=context,
+            record_ids=[_record_id(index.records[row], row) for row, _ in hits],
+            scores=[round(score, 4) for _, score in hits],
+            latency_ms=round(latency_ms, 3),
+            filters=applied,
+            reference_date=reference
+        )
+
+    @staticmethod
+    def _record_matches(record: Dict[str, str], filters: Dict[str, List[str]], period) -> bool:
+        """Mesmo critério das máscaras do VectorStore, para um registro só."""
+        for field_name, values in filters.items():
+            if not set(split_values(field_name, record.get(field_name, ""))) & set(values):
+                return False
+        if period is None:
+            return True
+        valid_from, valid_until = parse_validity(record.get("VERSAO LEGAL", ""), record.get("DATA", ""))
+        return valid_from < period[1] and valid_until > period[0]
+
+    def append_documents(self, agent_id: str, records) -> int:
+        """Acrescenta documentos (ex.: decisões recém-publicadas) ao índice em segmentos do agente.
+
+        Só para agentes com ``rag_config.backend: segments``; os demais usam o
+        ``build_indices.py``.
+        """
+        if self._rag_config(agent_id).get('backend') != 'segments':
+            raise ValueError(f"'{agent_id}' não usa índice em segmentos (rag_config.backend: segments)")
+
+        index = self.get_store(agent_id)
+        if index is None:
+            with self._lock_for(agent_id):
+                index = self._stores.get(agent_id)
+                if index is None:
+                    index = self._stores[agent_id] = self._open_segments(agent_id, create=True)
+        return index.append(records)
+
+    def get_store(self, agent_id: str) -> Optional[VectorStore]:
+        store = self._stores.get(agent_id)
+        if store is not None:
+            return store
+
+        with self._lock_for(agent_id):
+            if agent_id not in self._stores:
+                store = self._open_store(agent_id)
+                if store is None:
+                    return None
+                self._stores[agent_id] = store
+                print(f"📚 Índice carregado: {agent_id} ({len(store)} registros)")
+            return self._stores[agent_id]
+
+    def warm(self, agent_id: str) -> bool:
+        """Abre (se preciso) o índice do agente e traz suas páginas para o page cache."""
+        store = self._store_for(agent_id)
+        if store is None:
+            return False
+        store.warm()
+        return True
+
+    def loaded_agents(self) -> List[str]:
+        return list(self._stores)
+
+    def _store_for(self, agent_id: str) -> Optional[VectorStore]:
+        """Índice único, se habilitado e com a partição do agente; senão o índice do agente."""
+        if self._unified_config().get('enabled', False):
+            unified = self.get_store(UNIFIED_INDEX)
+            if unified is not None and agent_id in unified.partitions:
+                return unified
+        return self.get_store(agent_id)
+
+    def _resolve_partitions(self, store: VectorStore, agent_id: str, requested) -> List[str]:
+        available = store.partitions
+        if not available:
+            return []
+
+        if requested is None:
+            category = self.registry.get_agent_category(agent_id)
+            if category in (self._unified_config().get('cross_partition_categories') or []):
+                requested = "*"
+            else:
+                requested = [agent_id]
+        if requested == "*" or "*" in requested:
+            return list(available)
+
+        if isinstance(requested, str):
+            requested = [requested]
+        wanted = set(requested)
+        return [
+            partition for partition in available
+            if partition in wanted or self.registry.get_agent_category(partition) in wanted
+        ]
+
+    @staticmethod
+    def _resolve_reference(query: str, reference_date: Optional[str], config: dict) -> Optional[str]:
+        if reference_date:
+            return reference_date
+        if not config.get('enabled', False):
+            return None
+        if config.get('auto_detect', True):
+            detected = detect_reference(query)
+            if detected:
+                return detected
+        return date.today().isoformat() if config.get('default_to_today', True) else None
+
+    @staticmethod
+    def _combine(*masks):
+        result = None
+        for mask in masks:
+            if mask is not None:
+                result = mask if result is None else result & mask
+        return result
+
+    def _lock_for(self, agent_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(agent_id, threading.Lock())
+
+    def _open_store(self, agent_id: str) -> Optional[VectorStore]:
+        if self._rag_config(agent_id).get('backend') == 'segments':
+            return self._open_segments(agent_id)
+
+        if agent_id == UNIFIED_INDEX:
+            config = self._unified_config()
+            vectorstore_path = self.registry.base_dir / config.get('path', f'vectorstore_indices/{UNIFIED_INDEX}')
+            rag_config = config
+        else:
+            vectorstore_path = self.registry.get_agent_vectorstore_path(agent_id)
+            rag_config = self._rag_config(agent_id)
+
+        if vectorstore_path and VectorStore.exists(vectorstore_path):
+            store = VectorStore.load(vectorstore_path)
+            if self.embedding_cache is not None:
+                store.embedder = CachedEmbedder(store.embedder, self.embedding_cache)
+            self._attach_quantized(agent_id, store, rag_config)
+            return store
+
+        if agent_id == UNIFIED_INDEX:
+            return None
+
+        # Sem índice gerado pelo build_indices.py: monta em memória a partir do conhecimento.
+        knowledge_path = self.registry.get_agent_knowledge_path(agent_id)
+        if knowledge_path is None:
+            return None
+        embedder = HashedNgramEmbedder()
+        if self.embedding_cache is not None:
+            embedder = CachedEmbedder(embedder, self.embedding_cache)
+        return VectorStore.from_knowledge(knowledge_path, embedder)
+
+    @staticmethod
+    def _attach_quantized(agent_id: str, store: VectorStore, rag_config: dict) -> None:
+        index_type = rag_config.get('index_type', 'flat')
+        if index_type == 'flat' or not store.num_chunks:
+            return
+
+        # Treinar o IVF/PQ leva segundos: só o build_indices.py --quantize treina
+        # (com --nlist/--pq-m); aqui basta ter sido treinado sobre estes vetores.
+        index = QuantizedIndex.load_current(store.path, index_type, store.manifest.get('built_at', ''))
+        if index is None:
+            print(f"⚠️  Índice {index_type} de '{agent_id}' ausente ou desatualizado, usando busca completa "
+                  f"(gere com build_indices.py --agent {agent_id} --quantize {index_type})")
+            return
+        store.attach_quantized(index, rag_config.get('nprobe', 8), rag_config.get('rerank', 100))
+
+    def _open_segments(self, agent_id: str, create: bool = False) -> Optional[SegmentedIndex]:
+        rag_config = self._rag_config(agent_id)
+        path = rag_config.get('segments_path')
+        path = self.registry.base_dir / path if path else self.registry.base_dir / 'vectorstore_indices' / agent_id / 'segments'
+        if not create and not (path / 'segments.json').exists():
+            print(f"⚠️  '{agent_id}' sem índice em segmentos em {path} (use build_indices.py --segments)")
+            return None
+
+        index = SegmentedIndex(
+            path,
+            max_segments=rag_config.get('max_segments', 8),
+            merge_factor=rag_config.get('merge_factor', 4),
+            merge_block_postings=rag_config.get('merge_block_postings', 1_000_000)
+        )
+        return index.start_merger(rag_config.get('merge_interval_seconds', 30))
+
+    def _open_embedding_cache(self) -> Optional[EmbeddingCache]:
+        config = self.registry.global_config.get('embedding_cache', {}) or {}
+        if not config.get('enabled', False):
+            return None
+        try:
+            return EmbeddingCache(
+                self.registry.base_dir / config.get('path', 'vectorstore_indices/embeddings.sqlite'),
+                max_entries=config.get('max_entries', 200_000)
+            )
+        except Exception as e:
+            print(f"⚠️  Cache de embeddings indisponível: {e}")
+            return None
+
+    @staticmethod
+    def _search(store: VectorStore, query: str, top_k: int, mask, rag_config: dict):
+        mode = rag_config.get('retrieval_mode', 'vector')
+        if mode == 'bm25':
+            return store.search_lexical(query, top_k, mask)
+        if mode == 'hybrid':
+            return store.search_hybrid(
+                query, top_k, mask,
+                rrf_k=rag_config.get('rrf_k', 60),
+                depth=rag_config.get('fusion_depth', 20)
+            )
+        return store.search_records(query, top_k, mask)
+
+    @staticmethod
+    def _resolve_filters(store: VectorStore, query: str, filters: Optional[Dict],
+                         top_k: int, base_mask, config: dict) -> Dict[str, List[str]]:
+        if filters:
+            return store.metadata.normalize_filters(filters)
+        if not config.get('auto_detect', False):
+            return {}
+
+        detected = store.metadata.detect(query, config.get('detect_fields'))
+        if not detected:
+            return {}
+        if base_mask is None:
+            remaining = store.metadata.count(detected)
+        else:
+            remaining = int((store.metadata.mask(detected) & base_mask).sum())
+        return detected if remaining >= top_k else {}
+
+    def _unified_config(self) -> dict:
+        return self.registry.global_config.get('unified_index', {}) or {}
+
+    def _rag_config(self, agent_id: str) -> dict:
+        config = self.registry.get_agent_config(agent_id) or {}
+        return config.get('rag_config', {}) or {}
+
+    @staticmethod
+    def _format_context(store: VectorStore, hits, max_chars: int) -> str:
+        blocks = []
+        used = 0
+
+        for row, _ in hits:
+            record = store.records[row]
+            lines = [f"[{_record_id(record, row)}]"]
+            for key, label in CONTEXT_FIELDS:
+                value = record.get(key, "")
+                if value and not is_empty(value):
+                    lines.append(f"{label}: {value}")
+
+            block = "\n".join(lines)
+            if used + len(block) > max_chars and blocks:
+                break
+            blocks.append(block[:max_chars])
+            used += len(block)
+
+        return "\n\n".join(blocks)
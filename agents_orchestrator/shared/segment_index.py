@@ -0,0 +1,460 @@
+"""Índice invertido em disco por segmentos imutáveis (BM25), para corpora grandes.
+
+Layout de ``<diretório>/``::
+
+    segments.json              # segmentos vivos (trocado atomicamente)
+    seg_000001/
+        terms.npy              # hashes (uint64) dos termos, ordenados
+        offsets.npy            # postings do termo i: [offsets[i], offsets[i+1])
+        doc_ids.npy, tfs.npy   # postings (id local do documento, frequência)
+        doc_lengths.npy        # nº de tokens por documento
+        ids.npy                # hashes ordenados dos [ID] (evita duplicatas no append)
+        docs.jsonl             # documentos originais
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from shared.bm25 import tokenize
+from shared.knowledge_parser import record_text
+from shared.vector_store import JsonlReader
+
+SEGMENTS_FILE = "segments.json"
+_SEGMENT_ARRAYS = ("terms", "offsets", "doc_ids", "tfs", "doc_lengths", "ids")
+
+
+def term_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _raw_to_npy(raw_path: Path, npy_path: Path, dtype, count: int) -> None:
+    """Converte um arquivo binário gravado em streaming em .npy sem carregá-lo."""
+    with open(npy_path, "wb") as out, open(raw_path, "rb") as raw:
+        np.lib.format.write_array_header_1_0(out, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            "fortran_order": False,
+            "shape": (count,),
+        })
+        shutil.copyfileobj(raw, out)
+    raw_path.unlink()
+
+
+def _merge_sorted(arrays: List[np.ndarray], block_size: int):
+    """Blocos ordenados da união de ``arrays`` já ordenados (k-way merge por blocos)."""
+    cursors = [0] * len(arrays)
+    while True:
+        live = [i for i, array in enumerate(arrays) if cursors[i] < len(array)]
+        if not live:
+            return
+        bound = min(arrays[i][min(cursors[i] + block_size, len(arrays[i])) - 1] for i in live)
+        parts = []
+        for i in live:
+            end = int(np.searchsorted(arrays[i], bound, side="right"))
+            parts.append(np.asarray(arrays[i][cursors[i]:end]))
+            cursors[i] = end
+        yield np.sort(np.concatenate(parts), kind="stable")
+
+
+class Segment:
+    """Um segmento imutável; todos os arrays são mapeados em memória (mmap)."""
+
+    def __init__(self, directory: Path, base: int, total_length: Optional[int] = None):
+        self.directory = directory
+        self.name = directory.name
+        self.base = base
+        for array in _SEGMENT_ARRAYS:
+            setattr(self, array, np.load(directory / f"{array}.npy", mmap_mode="r"))
+        self.docs = JsonlReader(directory / "docs.jsonl")
+        self.total_length = int(np.asarray(self.doc_lengths).sum()) if total_length is None else total_length
+        self.disk_bytes = sum(f.stat().st_size for f in directory.iterdir())
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    def postings(self, term: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        position = int(np.searchsorted(self.terms, term))
+        if position >= len(self.terms) or int(self.terms[position]) != term:
+            return None
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def contains_id(self, id_hash: int) -> bool:
+        position = int(np.searchsorted(self.ids, id_hash))
+        return position < len(self.ids) and int(self.ids[position]) == id_hash
+
+
+class _Documents(Sequence):
+    """``records[id_global]`` sobre os segmentos vivos (mesma interface do VectorStore)."""
+
+    def __init__(self, index: "SegmentedIndex"):
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.num_docs
+
+    def __getitem__(self, doc_id: int) -> dict:
+        for segment in self._index.segments:
+            if segment.base <= doc_id < segment.base + segment.num_docs:
+                return segment.docs[doc_id - segment.base]
+        raise IndexError(doc_id)
+
+
+class SegmentedIndex:
+    """BM25 sobre segmentos imutáveis em disco, com append e merge em background.
+
+    Cada ``append`` grava novos segmentos; o merge junta segmentos vizinhos
+    (os ids globais não mudam) em streaming, ``merge_block_postings``
+    postings por vez. A busca lê só as postings dos termos da consulta, então
+    o heap não cresce com o corpus.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_segments: int = 8, merge_factor: int = 4,
+                 k1: float = 1.2, b: float = 0.75, merge_block_postings: int = 1_000_000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segments = max_segments
+        self.merge_factor = merge_factor
+        self.merge_block_postings = merge_block_postings
+        self.k1 = k1
+        self.b = b
+        self.records = _Documents(self)
+        self.segments: List[Segment] = []
+        self._next_segment = 1
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._merger: Optional[threading.Thread] = None
+        self._load()
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @property
+    def num_docs(self) -> int:
+        segments = self.segments
+        return segments[-1].base + segments[-1].num_docs if segments else 0
+
+    # ------------------------------------------------------------ escrita
+
+    def append(self, records: Iterable[Dict[str, str]], batch_size: int = 50_000) -> int:
+        """Indexa ``records`` em novos segmentos, ignorando [ID]s já indexados."""
+        added = 0
+        batch, batch_ids = [], set()
+        with self._write_lock:
+            for record in records:
+                record_id = record.get("ID")
+                if record_id and (record_id in batch_ids or self._contains(record_id)):
+                    continue
+                batch.append(record)
+                batch_ids.add(record_id)
+                if len(batch) >= batch_size:
+                    added += self._flush(batch)
+                    batch, batch_ids = [], set()
+            added += self._flush(batch)
+        return added
+
+    def _contains(self, record_id: str) -> bool:
+        id_hash = term_hash(record_id)
+        return any(segment.contains_id(id_hash) for segment in self.segments)
+
+    def _flush(self, records: List[Dict[str, str]]) -> int:
+        if not records:
+            return 0
+
+        terms, doc_ids, tfs, lengths = [], [], [], []
+        hashes: Dict[str, int] = {}
+        for doc, record in enumerate(records):
+            tokens = tokenize(record_text(record))
+            counts = Counter(tokens)
+            for token in counts:
+                if token not in hashes:
+                    hashes[token] = term_hash(token)
+            terms.extend(hashes[token] for token in counts)
+            doc_ids.extend([doc] * len(counts))
+            tfs.extend(min(count, 65535) for count in counts.values())
+            lengths.append(len(tokens))
+
+        ids = sorted({term_hash(record["ID"]) for record in records if record.get("ID")})
+        docs_lines = (json.dumps(record, ensure_ascii=False) for record in records)
+        segment = self._write_segment(
+            np.array(terms, dtype=np.uint64), np.array(doc_ids, dtype=np.int32),
+            np.array(tfs, dtype=np.uint16), np.array(lengths, dtype=np.int32),
+            np.array(ids, dtype=np.uint64), docs_lines, self.num_docs
+        )
+        self._publish(self.segments + [segment])
+        return len(records)
+
+    def _write_segment(self, terms: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                       lengths: np.ndarray, ids: np.ndarray, docs_lines, base: int) -> Segment:
+        order = np.lexsort((doc_ids, terms))
+        terms, doc_ids, tfs = terms[order], doc_ids[order], tfs[order]
+        unique_terms, starts = np.unique(terms, return_index=True)
+        offsets = np.append(starts, len(terms)).astype(np.int64)
+
+        name, building = self._new_segment_dir()
+        arrays = {
+            "terms": unique_terms, "offsets": offsets, "doc_ids": doc_ids,
+            "tfs": tfs, "doc_lengths": lengths, "ids": ids,
+        }
+        for array, values in arrays.items():
+            np.save(building / f"{array}.npy", values)
+        self._write_docs(building, docs_lines)
+        return self._finish_segment(name, building, base)
+
+    def _new_segment_dir(self) -> Tuple[str, Path]:
+        name = f"seg_{self._next_segment:06d}"
+        self._next_segment += 1
+        building = self.directory / f".{name}"
+        shutil.rmtree(building, ignore_errors=True)
+        building.mkdir()
+        return name, building
+
+    @staticmethod
+    def _write_docs(building: Path, docs_lines) -> None:
+        with open(building / "docs.jsonl", "w", encoding="utf-8") as f:
+            for line in docs_lines:
+                f.write(line + "\n")
+
+    def _finish_segment(self, name: str, building: Path, base: int) -> Segment:
+        os.replace(building, self.directory / name)
+        return Segment(self.directory / name, base)
+
+    def _publish(self, segments: List[Segment]) -> None:
+        manifest = {
+            "next_segment": self._next_segment,
+            "segments": [
+                {"name": segment.name, "base": segment.base, "total_length": segment.total_length}
+                for segment in segments
+            ],
+        }
+        tmp_path = self.directory / f"{SEGMENTS_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.directory / SEGMENTS_FILE)
+        self.segments = segments
+
+    def _load(self) -> None:
+        manifest_path = self.directory / SEGMENTS_FILE
+        if not manifest_path.exists():
+            return
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self._next_segment = manifest.get("next_segment", 1)
+        self.segments = [
+            Segment(self.directory / item["name"], item["base"], item.get("total_length"))
+            for item in manifest["segments"]
+        ]
+        self._remove_orphans()
+
+    def _remove_orphans(self) -> None:
+        live = {segment.name for segment in self.segments}
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.name.lstrip(".").startswith("seg_") and path.name not in live:
+                shutil.rmtree(path, ignore_errors=True)
+
+    # ------------------------------------------------------------- merge
+
+    def merge_once(self) -> bool:
+        """Junta os ``merge_factor`` segmentos vizinhos menores se houver mais que ``max_segments``."""
+        with self._write_lock:
+            segments = self.segments
+            if len(segments) <= self.max_segments:
+                return False
+
+            width = min(self.merge_factor, len(segments))
+            sizes = [sum(s.num_docs for s in segments[i:i + width]) for i in range(len(segments) - width + 1)]
+            first = int(np.argmin(sizes))
+            group = segments[first:first + width]
+            merged = self._merge(group)
+            self._publish(segments[:first] + [merged] + segments[first + width:])
+
+        for segment in group:
+            # No Windows um segmento ainda mapeado por uma busca não pode ser
+            # removido; o que sobrar é limpo no próximo _load.
+            shutil.rmtree(segment.directory, ignore_errors=True)
+        return True
+
+    def _merge(self, group: List[Segment]) -> Segment:
+        """Intercala as postings já ordenadas dos segmentos direto nos arquivos do
+        segmento novo, um bloco de termos por vez (memória limitada pelo bloco)."""
+        base = group[0].base
+        name, building = self._new_segment_dir()
+        total_postings = sum(len(segment.doc_ids) for segment in group)
+        doc_ids = np.lib.format.open_memmap(building / "doc_ids.npy", mode="w+", dtype=np.int32,
+                                            shape=(total_postings,))
+        tfs = np.lib.format.open_memmap(building / "tfs.npy", mode="w+", dtype=np.uint16,
+                                        shape=(total_postings,))
+
+        written = num_terms = 0
+        with open(building / "terms.raw", "wb") as terms_out, open(building / "offsets.raw", "wb") as offsets_out:
+            offsets_out.write(np.zeros(1, dtype=np.int64).tobytes())
+            for block_terms, block_docs, block_tfs in self._merge_blocks(group, base):
+                size = len(block_terms)
+                unique_terms, starts = np.unique(block_terms, return_index=True)
+                doc_ids[written:written + size] = block_docs
+                tfs[written:written + size] = block_tfs
+                terms_out.write(unique_terms.tobytes())
+                offsets_out.write((np.append(starts[1:], size) + written).astype(np.int64).tobytes())
+                written += size
+                num_terms += len(unique_terms)
+        doc_ids.flush()
+        tfs.flush()
+        del doc_ids, tfs
+        _raw_to_npy(building / "terms.raw", building / "terms.npy", np.uint64, num_terms)
+        _raw_to_npy(building / "offsets.raw", building / "offsets.npy", np.int64, num_terms + 1)
+
+        lengths = np.lib.format.open_memmap(building / "doc_lengths.npy", mode="w+", dtype=np.int32,
+                                            shape=(sum(segment.num_docs for segment in group),))
+        position = 0
+        for segment in group:
+            for start in range(0, segment.num_docs, self.merge_block_postings):
+                chunk = np.asarray(segment.doc_lengths[start:start + self.merge_block_postings])
+                lengths[position:position + len(chunk)] = chunk
+                position += len(chunk)
+        lengths.flush()
+        del lengths
+
+        num_ids = 0
+        with open(building / "ids.raw", "wb") as ids_out:
+            for block in _merge_sorted([segment.ids for segment in group], self.merge_block_postings):
+                block = np.unique(block)
+                ids_out.write(block.tobytes())
+                num_ids += len(block)
+        _raw_to_npy(building / "ids.raw", building / "ids.npy", np.uint64, num_ids)
+
+        def docs_lines():
+            for segment in group:
+                with open(segment.directory / "docs.jsonl", "r", encoding="utf-8") as f:
+                    for line in f:
+                        yield line.rstrip("\n")
+
+        self._write_docs(building, docs_lines())
+        return self._finish_segment(name, building, base)
+
+    def _merge_blocks(self, group: List[Segment], base: int):
+        """(termos, docs, tfs) do grupo em ordem de termo e, no mesmo termo, de id.
+
+        Cada bloco cobre todos os termos até um limite comum, escolhido para
+        que cada segmento contribua com cerca de ``merge_block_postings``
+        postings; assim um termo nunca fica dividido entre dois blocos.
+        """
+        cursors = [0] * len(group)
+        while True:
+            live = [i for i, segment in enumerate(group) if cursors[i] < len(segment.terms)]
+            if not live:
+                return
+
+            bound = None
+            for i in live:
+                segment, position = group[i], cursors[i]
+                limit = int(segment.offsets[position]) + self.merge_block_postings
+                end = int(np.searchsorted(segment.offsets, limit, side="right")) - 1
+                end = min(max(end, position + 1), len(segment.terms))
+                last = segment.terms[end - 1]
+                bound = last if bound is None else min(bound, last)
+
+            terms, docs, tfs = [], [], []
+            for i in live:
+                segment, position = group[i], cursors[i]
+                end = int(np.searchsorted(segment.terms, bound, side="right"))
+                if end == position:
+                    continue
+                start, stop = int(segment.offsets[position]), int(segment.offsets[end])
+                counts = np.diff(np.asarray(segment.offsets[position:end + 1]))
+                terms.append(np.repeat(np.asarray(segment.terms[position:end]), counts))
+                docs.append(np.asarray(segment.doc_ids[start:stop]) + (segment.base - base))
+                tfs.append(np.asarray(segment.tfs[start:stop]))
+                cursors[i] = end
+
+            # Ordenação estável: no mesmo termo, os segmentos (e seus ids) seguem em ordem.
+            terms = np.concatenate(terms)
+            order = np.argsort(terms, kind="stable")
+            yield terms[order], np.concatenate(docs)[order].astype(np.int32), np.concatenate(tfs)[order]
+
+    def start_merger(self, interval_seconds: float = 30) -> "SegmentedIndex":
+        if self._merger is None:
+            self._merger = threading.Thread(
+                target=self._merge_loop, args=(interval_seconds,), name="segment-merger", daemon=True
+            )
+            self._merger.start()
+        return self
+
+    def stop_merger(self) -> None:
+        self._stop.set()
+
+    def _merge_loop(self, interval_seconds: float) -> None:
+        while not self._stop.wait(interval_seconds):
+            try:
+                while self.merge_once():
+                    pass
+            except Exception as e:
+                print(f"⚠️  Merge de segmentos falhou em {self.directory}: {e}")
+
+    # ------------------------------------------------------------- busca
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        """Retorna [(id global, score BM25)] com estatísticas globais (N, df, tamanho médio)."""
+        segments = self.segments
+        if not segments or top_k <= 0:
+            return []
+
+        num_docs = sum(segment.num_docs for segment in segments)
+        avg_length = sum(segment.total_length for segment in segments) / num_docs
+
+        query_terms = {term_hash(token) for token in tokenize(query)}
+        per_segment = [{term: segment.postings(term) for term in query_terms} for segment in segments]
+        idf = {}
+        for term in query_terms:
+            df = sum(len(found[term][0]) for found in per_segment if found[term] is not None)
+            if df:
+                idf[term] = float(np.log1p((num_docs - df + 0.5) / (df + 0.5)))
+
+        candidates, scores = [], []
+        for segment, found in zip(segments, per_segment):
+            docs_parts, weight_parts = [], []
+            for term, postings in found.items():
+                if postings is None:
+                    continue
+                docs, tfs = np.asarray(postings[0]), np.asarray(postings[1], dtype=np.float32)
+                norm = self.k1 * (1 - self.b + self.b * segment.doc_lengths[docs] / avg_length)
+                docs_parts.append(docs)
+                weight_parts.append(idf[term] * tfs * (self.k1 + 1) / (tfs + norm))
+            if not docs_parts:
+                continue
+
+            # Acumula só os documentos tocados pelas postings (não um array do tamanho do segmento).
+            unique_docs, inverse = np.unique(np.concatenate(docs_parts), return_inverse=True)
+            segment_scores = np.bincount(inverse, weights=np.concatenate(weight_parts))
+            keep = min(top_k, len(unique_docs))
+            best = np.argpartition(-segment_scores, keep - 1)[:keep]
+            candidates.append(unique_docs[best] + segment.base)
+            scores.append(segment_scores[best])
+
+        if not candidates:
+            return []
+        candidates, scores = np.concatenate(candidates), np.concatenate(scores)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def warm(self) -> None:
+        """Traz para o page cache os dicionários de termos (as postings vêm sob demanda)."""
+        for segment in self.segments:
+            int(np.asarray(segment.terms).sum())
+            int(np.asarray(segment.offsets).sum())
+
+    def stats(self) -> dict:
+        # Lista imutável: um merge concorrente publica outra lista e só então apaga os diretórios.
+        segments = self.segments
+        return {
+            "segments": len(segments),
+            "documents": segments[-1].base + segments[-1].num_docs if segments else 0,
+            "disk_mb": round(sum(segment.disk_bytes for segment in segments) / 2 ** 20, 2),
+        }
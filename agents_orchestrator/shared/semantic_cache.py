@@ -0,0 +1,162 @@
+"""Cache semântico: reaproveita respostas de perguntas parecidas (mesmo agente e task_type)."""
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Hashable, Optional, Tuple
+
+import numpy as np
+
+from shared.text_normalizer import normalize_text
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+")
+
+# Palavras que não mudam o que se pergunta ("qual a alíquota" = "alíquota").
+QUESTION_STOPWORDS = frozenset(normalize_text(word) for word in (
+    "qual quais o a os as um uma de da do das dos e é em no na nos nas para pra por ao aos à às "
+    "que como se sobre me meu minha pode posso são ser está estão existe há favor gostaria saber"
+).split())
+
+# Palavras que invertem a resposta: perguntas só casam se tiverem as mesmas.
+NEGATIONS = frozenset(normalize_text(word) for word in (
+    "não nem nunca jamais nenhum nenhuma sem exceto salvo vedado vedada vedados vedadas "
+    "indedutível indedutíveis"
+).split())
+
+
+def canonical_query(query: str, synonyms: Optional[Dict[str, str]] = None) -> str:
+    """Pergunta normalizada para o cache: sem acentos/caixa, sem palavras
+    interrogativas e com os ``synonyms`` do agente trocados pelo termo canônico
+    ({"percentual": "alíquota"}). Números e negações são preservados."""
+    text = normalize_text(query)
+    for phrase, canonical in sorted((synonyms or {}).items(), key=lambda item: -len(item[0])):
+        text = re.sub(rf"\b{re.escape(normalize_text(phrase))}\b", normalize_text(canonical), text)
+    return " ".join(word for word in _WORD_RE.findall(text) if word not in QUESTION_STOPWORDS)
+
+
+def query_signature(query: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """(números, negações) da pergunta; respostas só são reaproveitadas com a mesma assinatura."""
+    text = normalize_text(query)
+    return (
+        frozenset(_NUMBER_RE.findall(text)),
+        frozenset(word for word in _WORD_RE.findall(text) if word in NEGATIONS)
+    )
+
+
+class SemanticCache:
+    """Matriz em memória com os embeddings das perguntas já respondidas.
+
+    Cada entrada pertence a um *namespace* (agente, task_type, versão do
+    template, parâmetros); a consulta compara o embedding da pergunta só com
+    as entradas do mesmo namespace com a mesma assinatura (números, anos e
+    negações citados; ver ``query_signature``) e devolve a resposta mais
+    parecida acima do limiar. Entradas vencidas (``max_age_seconds``) são descartadas; com o
+    cache cheio sai a entrada com menos acertos (a mais antiga, no empate).
+    """
+
+    def __init__(self, embedder, max_entries: int = 5000, max_age_seconds: float = 86400):
+        self.embedder = embedder
+        self.max_entries = max(int(max_entries), 1)
+        self.max_age_seconds = max_age_seconds
+        self.vectors = np.zeros((self.max_entries, embedder.dim), dtype=np.float32)
+        self.namespaces = np.full(self.max_entries, -1, dtype=np.int64)
+        self.created = np.zeros(self.max_entries, dtype=np.float64)
+        self.hit_counts = np.zeros(self.max_entries, dtype=np.int64)
+        self.values: list = [None] * self.max_entries
+        self.signatures: list = [None] * self.max_entries
+        self._namespace_ids: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return int((self.namespaces >= 0).sum())
+
+    @staticmethod
+    def namespace(agent_id: str, task_type: str, version: str = "", **params) -> Tuple[str, str, str, str]:
+        """Namespace das entradas; parâmetros ``None`` são ignorados."""
+        params = {name: value for name, value in params.items() if value is not None}
+        return agent_id, task_type, version, json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+    def _namespace_id(self, namespace: Hashable, create: bool) -> int:
+        namespace_id = self._namespace_ids.get(namespace)
+        if namespace_id is None and create:
+            namespace_id = self._namespace_ids[namespace] = len(self._namespace_ids)
+        return -1 if namespace_id is None else namespace_id
+
+    def lookup(self, namespace: Hashable, query: str, threshold: float) -> Optional[Tuple[Any, float]]:
+        """(resposta, similaridade) da pergunta mais parecida, ou ``None``."""
+        vector = self.embedder.embed_one(query)
+        signature = query_signature(query)
+        with self._lock:
+            namespace_id = self._namespace_id(namespace, create=False)
+            rows = np.flatnonzero(
+                (self.namespaces == namespace_id)
+                & (self.created > time.time() - self.max_age_seconds)
+            ) if namespace_id >= 0 else np.zeros(0, dtype=np.int64)
+            rows = rows[[self.signatures[row] == signature for row in rows]] if len(rows) else rows
+
+            if len(rows):
+                scores = self.vectors[rows] @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    row = rows[best]
+                    self.hit_counts[row] += 1
+                    self.hits += 1
+                    return self.values[row], float(scores[best])
+
+            self.misses += 1
+            return None
+
+    def add(self, namespace: Hashable, query: str, value: Any) -> None:
+        vector = self.embedder.embed_one(query)
+        signature = query_signature(query)
+        with self._lock:
+            row = self._free_row()
+            self.vectors[row] = vector
+            self.signatures[row] = signature
+            self.namespaces[row] = self._namespace_id(namespace, create=True)
+            self.created[row] = time.time()
+            self.hit_counts[row] = 0
+            self.values[row] = value
+
+    def _free_row(self) -> int:
+        empty = np.flatnonzero(self.namespaces < 0)
+        if len(empty):
+            return int(empty[0])
+
+        expired = np.flatnonzero(self.created <= time.time() - self.max_age_seconds)
+        if len(expired):
+            # Libera todas as vencidas de uma vez; a primeira é reaproveitada.
+            self.namespaces[expired] = -1
+            for row in expired:
+                self.values[row] = None
+                self.signatures[row] = None
+            self.evictions += len(expired)
+            return int(expired[0])
+
+        # Menos acertos primeiro; no empate, a mais antiga.
+        row = int(np.lexsort((self.created, self.hit_counts))[0])
+        self.evictions += 1
+        return row
+
+    def clear(self) -> None:
+        with self._lock:
+            self.namespaces[:] = -1
+            self.values = [None] * self.max_entries
+            self.signatures = [None] * self.max_entries
+            self._namespace_ids.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "max_age_seconds": self.max_age_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
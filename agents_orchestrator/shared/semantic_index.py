@@ -0,0 +1,78 @@
+"""Índice semântico de agentes: um centróide por agente, score por produto matricial."""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared.hashed_embedder import HashedNgramEmbedder
+
+DEFAULT_SOURCE_WEIGHTS = {"description": 1.0, "keywords": 1.0, "knowledge": 1.0}
+
+
+class SemanticIndex:
+    """Centróides TF-IDF (n-gramas com hashing) de cada agente.
+
+    Os centróides são calculados uma vez no carregamento; cada consulta é
+    embutida uma vez e comparada com todos os agentes em ``Q @ C.T``.
+    """
+
+    def __init__(self, embedder: Optional[HashedNgramEmbedder] = None,
+                 source_weights: Optional[Dict[str, float]] = None):
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.source_weights = dict(DEFAULT_SOURCE_WEIGHTS)
+        self.source_weights.update(source_weights or {})
+        self.agent_ids: List[str] = []
+        self._profiles: List[np.ndarray] = []
+        self.idf: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+
+    def add_agent(self, agent_id: str, sources: Dict[str, List[str]]) -> None:
+        profile = np.zeros(self.embedder.dim, dtype=np.float32)
+
+        for source, texts in sources.items():
+            texts = [text for text in texts if text]
+            weight = self.source_weights.get(source, 0.0)
+            if not texts or not weight:
+                continue
+            profile += weight * self.embedder.embed(texts).mean(axis=0)
+
+        self.agent_ids.append(agent_id)
+        self._profiles.append(profile)
+
+    def build(self) -> "SemanticIndex":
+        if not self._profiles:
+            self.idf = np.ones(self.embedder.dim, dtype=np.float32)
+            self.centroids = np.zeros((0, self.embedder.dim), dtype=np.float32)
+            return self
+
+        profiles = np.vstack(self._profiles)
+        doc_freq = (profiles > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(profiles)) / (1 + doc_freq)) + 1.0).astype(np.float32)
+        self.centroids = self._normalize(profiles * self.idf)
+        self._profiles = []
+        return self
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        return self._normalize(self.embedder.embed(queries) * self.idf)
+
+    def score_matrix(self, queries: List[str]) -> np.ndarray:
+        """Scores (n_queries x n_agents) em uma única multiplicação de matrizes."""
+        return np.clip(self.embed_queries(queries) @ self.centroids.T, 0.0, 1.0)
+
+    def rank(self, query: str) -> List[Tuple[str, float]]:
+        return self.rank_batch([query])[0]
+
+    def rank_batch(self, queries: List[str]) -> List[List[Tuple[str, float]]]:
+        if not queries:
+            return []
+        scores = self.score_matrix(queries)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        return [
+            [(self.agent_ids[col], float(scores[row, col])) for col in order[row]]
+            for row in range(len(queries))
+        ]
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
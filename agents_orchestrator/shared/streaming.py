@@ -0,0 +1,80 @@
+"""Streaming de respostas: eventos SSE e repasse dos tokens do LLM durante o ``kickoff``."""
+import json
+import re
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+# Versões recentes do CrewAI publicam cada trecho gerado (LLM com stream=True)
+# num barramento de eventos; nas antigas a resposta só chega no fim.
+try:
+    from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+except ImportError:
+    try:
+        from crewai.utilities.events import crewai_event_bus
+        from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+    except ImportError:
+        crewai_event_bus = LLMStreamChunkEvent = None
+
+_TOKEN_RE = re.compile(r"\s*\S+\s*")
+
+# Task do crew (id) ou thread que executa o kickoff -> callback que recebe os trechos.
+_sinks: Dict[Union[str, int], Callable[[str], None]] = {}
+_registered = False
+_lock = threading.Lock()
+
+
+def sse(event: str, data) -> str:
+    """Formata um evento Server-Sent Events com ``data`` em JSON."""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in payload.split("\n")) + "\n"
+
+
+def split_tokens(text: str) -> Iterator[str]:
+    """Quebra uma resposta pronta em palavras (com o espaço que as segue)."""
+    return (match.group(0) for match in _TOKEN_RE.finditer(text))
+
+
+def streaming_supported() -> bool:
+    return crewai_event_bus is not None
+
+
+def _task_keys(crew) -> List[str]:
+    return [str(task.id) for task in getattr(crew, "tasks", None) or [] if getattr(task, "id", None)]
+
+
+def _forward(source, event) -> None:
+    # O barramento pode rodar handlers síncronos nas próprias threads: a task
+    # que originou o trecho (criada por requisição) identifica o destino; a
+    # thread só serve para versões cujos eventos não trazem ``task_id``.
+    task_id = getattr(event, "task_id", None)
+    sink = _sinks.get(str(task_id)) if task_id else None
+    if sink is None:
+        sink = _sinks.get(threading.get_ident())
+    if sink is not None and getattr(event, "chunk", None):
+        sink(event.chunk)
+
+
+def kickoff(crew, on_chunk: Optional[Callable[[str], None]] = None):
+    """``crew.kickoff()`` repassando a ``on_chunk`` os trechos gerados pelas tasks deste crew.
+
+    O agente (e seu LLM) é compartilhado entre requisições, então os trechos
+    são associados pela task do evento (ou, sem ela, pela thread que executa
+    o kickoff), não pela origem.
+    """
+    global _registered
+    if on_chunk is None or not streaming_supported():
+        return crew.kickoff()
+
+    with _lock:
+        if not _registered:
+            crewai_event_bus.on(LLMStreamChunkEvent)(_forward)
+            _registered = True
+
+    keys = [threading.get_ident(), *_task_keys(crew)]
+    for key in keys:
+        _sinks[key] = on_chunk
+    try:
+        return crew.kickoff()
+    finally:
+        for key in keys:
+            _sinks.pop(key, None)
@@ -0,0 +1,173 @@
+"""Intervalos de vigência dos registros ([VERSÃO LEGAL] / [DATA]) e consulta por data."""
+import bisect
+import json
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from shared.knowledge_parser import is_empty
+from shared.metadata_index import bits_to_mask
+from shared.text_normalizer import normalize_text
+
+TEMPORAL_FILE = "temporal.json"
+
+# Extremos "sem limite" dos intervalos, em ordinais de data (date.toordinal()).
+OPEN_START = 0
+OPEN_END = date.max.toordinal() + 1
+
+_DATE = r"(\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}|\d{4}-\d{2}|\d{4})"
+_RANGE_RE = re.compile(rf"\bde {_DATE} (?:a|ate) {_DATE}")
+_END_RE = re.compile(rf"\b(?:revogad[oa] (?:em|a partir de|desde)|pre|antes de|ate)[\s-]*{_DATE}")
+_START_RE = re.compile(rf"\b(?:desde|a partir de|pos|apos|depois de)[\s-]*{_DATE}")
+_UNDATED_START_RE = re.compile(r"\b(?:desde|a partir d[aoe])\b")
+_QUERY_YEAR_RE = re.compile(r"\b(?:ano[- ]calendario|ano fiscal|ano-base|ano base|exercicio)(?: de)? (\d{4})\b")
+
+
+def parse_date(value: str) -> Tuple[int, int]:
+    """'2024' | '2024-06' | '2024-06-30' | '30/06/2024' -> [início, fim) em ordinais."""
+    try:
+        return _parse_date(value.strip())
+    except ValueError:
+        raise ValueError(f"Data inválida: '{value}' (use AAAA, AAAA-MM, AAAA-MM-DD ou DD/MM/AAAA)")
+
+
+def _parse_date(value: str) -> Tuple[int, int]:
+    if re.fullmatch(r"\d{4}", value):
+        year = int(value)
+        return date(year, 1, 1).toordinal(), date(year + 1, 1, 1).toordinal()
+    if re.fullmatch(r"\d{4}-\d{2}", value):
+        year, month = map(int, value.split("-"))
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return date(year, month, 1).toordinal(), end.toordinal()
+    if re.fullmatch(r"\d{2}/\d{2}/\d{4}", value):
+        day, month, year = map(int, value.split("/"))
+    elif re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
+        year, month, day = map(int, value.split("-"))
+    else:
+        raise ValueError(value)
+    start = date(year, month, day).toordinal()
+    return start, start + 1
+
+
+def parse_validity(legal_version: str, record_date: str = "") -> Tuple[int, int]:
+    """Intervalo [início, fim) de vigência descrito em [VERSÃO LEGAL].
+
+    'Vigente em 2025-10-23' só diz que o registro valia naquela data, então
+    não limita o intervalo; 'Regime antigo (pré-2024)' termina em 2024-01-01;
+    'a partir de', 'desde' e 'revogado em' fixam os extremos. 'Vigente desde
+    a publicação', sem data, começa em [DATA].
+    """
+    text = normalize_text(legal_version or "")
+    if not text or is_empty(text):
+        return OPEN_START, OPEN_END
+
+    start, end = OPEN_START, OPEN_END
+    match = _RANGE_RE.search(text)
+    if match:
+        return parse_date(match.group(1))[0], parse_date(match.group(2))[1]
+
+    match = _END_RE.search(text)
+    if match:
+        first, last = parse_date(match.group(1))
+        # "até 2023" inclui 2023; "pré-2024", "antes de" e "revogado em" excluem a data.
+        end = last if match.group(0).startswith("ate") else first
+        text = text[:match.start()] + text[match.end():]
+
+    match = _START_RE.search(text)
+    if match:
+        start = parse_date(match.group(1))[0]
+    elif _UNDATED_START_RE.search(text) and record_date and not is_empty(record_date):
+        try:
+            start = parse_date(record_date)[0]
+        except ValueError:
+            pass
+
+    return start, end
+
+
+def detect_reference(query: str) -> Optional[str]:
+    """Ano citado como 'ano-calendário 2024', 'exercício 2023' etc. na pergunta."""
+    match = _QUERY_YEAR_RE.search(normalize_text(query))
+    return match.group(1) if match else None
+
+
+class TemporalIndex:
+    """Índice de intervalos por segmentos elementares.
+
+    Os extremos de todos os intervalos dividem a linha do tempo em
+    segmentos; cada segmento guarda o bitset dos registros vigentes nele.
+    Uma consulta por data (ou período) é um ``bisect`` + OU dos bitsets.
+    """
+
+    def __init__(self, starts: Optional[List[int]] = None, ends: Optional[List[int]] = None):
+        self.starts: List[int] = starts or []
+        self.ends: List[int] = ends or []
+        self.breakpoints: List[int] = []
+        self.segments: List[int] = []
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, row: int, record: Dict[str, str]) -> None:
+        start, end = parse_validity(record.get("VERSAO LEGAL", ""), record.get("DATA", ""))
+        while len(self.starts) <= row:
+            self.starts.append(OPEN_START)
+            self.ends.append(OPEN_END)
+        self.starts[row], self.ends[row] = start, end
+        self._built = False
+
+    @classmethod
+    def from_records(cls, records) -> "TemporalIndex":
+        index = cls()
+        for row, record in enumerate(records):
+            index.add(row, record)
+        return index.build()
+
+    def build(self) -> "TemporalIndex":
+        starts = np.array(self.starts, dtype=np.int64)
+        ends = np.array(self.ends, dtype=np.int64)
+        self.breakpoints = sorted(set(self.starts) | set(self.ends) | {OPEN_START})
+        self.segments = [
+            int.from_bytes(np.packbits((starts <= point) & (ends > point), bitorder="little").tobytes(), "little")
+            for point in self.breakpoints
+        ]
+        self._built = True
+        return self
+
+    @property
+    def is_bounded(self) -> bool:
+        """True se algum registro tem vigência limitada (senão o filtro é inútil)."""
+        return len(self.breakpoints) > 2 if self._built else any(
+            start != OPEN_START or end != OPEN_END for start, end in zip(self.starts, self.ends)
+        )
+
+    def bitset(self, start: int, end: int) -> int:
+        """Registros vigentes em algum momento de [start, end)."""
+        if not self._built:
+            self.build()
+        first = max(bisect.bisect_right(self.breakpoints, start) - 1, 0)
+        last = max(bisect.bisect_right(self.breakpoints, end - 1) - 1, first)
+        bits = 0
+        for segment in self.segments[first:last + 1]:
+            bits |= segment
+        return bits
+
+    def mask(self, reference: Optional[str]) -> Optional[np.ndarray]:
+        """Máscara dos registros vigentes em ``reference`` (ver ``parse_date``)."""
+        if reference is None or not self.is_bounded:
+            return None
+        return bits_to_mask(self.bitset(*parse_date(reference)), len(self))
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"starts": self.starts, "ends": self.ends}, f)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TemporalIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["starts"], data["ends"]).build()
@@ -0,0 +1,50 @@
+"""Normalização de texto (acentos, caixa e mojibake)."""
+import re
+import unicodedata
+from typing import List
+
+_MOJIBAKE_MARKERS = ("Ã", "Â", "â€")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def repair_mojibake(text: str) -> str:
+    """Corrige texto UTF-8 que foi decodificado como cp1252 (ex.: 'Ã§' -> 'ç')."""
+    if not text or not any(marker in text for marker in _MOJIBAKE_MARKERS):
+        return text
+
+    raw = bytearray()
+    for char in text:
+        try:
+            raw.extend(char.encode("cp1252"))
+        except UnicodeEncodeError:
+            code = ord(char)
+            if code > 0xFF:
+                return text
+            raw.append(code)
+
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return text
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados."""
+    if not text:
+        return ""
+    text = strip_accents(repair_mojibake(text)).casefold()
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def normalize_texts(texts: List[str]) -> List[str]:
+    """``normalize_text`` de cada texto, com acentos/caixa/espaços tratados numa passada só."""
+    if not texts:
+        return []
+    joined = "\x00".join(repair_mojibake(text or "").replace("\x00", " ") for text in texts)
+    joined = _WHITESPACE_RE.sub(" ", strip_accents(joined).casefold())
+    return [text.strip() for text in joined.split("\x00")]
@@ -0,0 +1,68 @@
+"""Detecção de UF (nome do estado ou sigla) em tempo constante por token."""
+import re
+from typing import Dict, Optional
+
+from shared.text_normalizer import normalize_text, repair_mojibake, strip_accents
+
+UF_NAMES = {
+    "AC": "Acre", "AL": "Alagoas", "AP": "Amapá", "AM": "Amazonas",
+    "BA": "Bahia", "CE": "Ceará", "DF": "Distrito Federal", "ES": "Espírito Santo",
+    "GO": "Goiás", "MA": "Maranhão", "MT": "Mato Grosso", "MS": "Mato Grosso do Sul",
+    "MG": "Minas Gerais", "PA": "Pará", "PB": "Paraíba", "PR": "Paraná",
+    "PE": "Pernambuco", "PI": "Piauí", "RJ": "Rio de Janeiro", "RN": "Rio Grande do Norte",
+    "RS": "Rio Grande do Sul", "RO": "Rondônia", "RR": "Roraima", "SC": "Santa Catarina",
+    "SP": "São Paulo", "SE": "Sergipe", "TO": "Tocantins",
+}
+
+# Nomes que, sem acento, são palavras comuns ("para"): exigem a grafia acentuada.
+_ACCENT_REQUIRED = {"para": "pará"}
+
+# Siglas em minúsculas só contam depois destes termos ("icms sp", "sefaz-rj").
+_ABBREVIATION_PREFIXES = {"icms", "sefaz", "uf", "estado", "fazenda", "ricms"}
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+class UFLookup:
+    """Mapeia nomes de estados e siglas para a UF com consultas em dict."""
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        self._max_words = 1
+        for uf, name in UF_NAMES.items():
+            key = normalize_text(name)
+            self._names[key] = uf
+            self._max_words = max(self._max_words, len(key.split()))
+
+    def detect(self, query: str) -> Optional[str]:
+        raw_tokens = _TOKEN_RE.findall(repair_mojibake(query or ""))
+        tokens = [normalize_text(token) for token in raw_tokens]
+
+        i = 0
+        while i < len(tokens):
+            for size in range(min(self._max_words, len(tokens) - i), 0, -1):
+                key = " ".join(tokens[i:i + size])
+                uf = self._names.get(key)
+                if uf is None:
+                    continue
+                if size == 1 and key in _ACCENT_REQUIRED and raw_tokens[i].lower() != _ACCENT_REQUIRED[key]:
+                    continue
+                return uf
+
+            uf = self._match_abbreviation(raw_tokens, tokens, i)
+            if uf:
+                return uf
+            i += 1
+
+        return None
+
+    @staticmethod
+    def _match_abbreviation(raw_tokens, tokens, i) -> Optional[str]:
+        raw = strip_accents(raw_tokens[i])
+        if len(raw) != 2 or raw.upper() not in UF_NAMES:
+            return None
+        if raw.isupper():
+            return raw
+        if i > 0 and tokens[i - 1] in _ABBREVIATION_PREFIXES:
+            return raw.upper()
+        return None
@@ -0,0 +1,276 @@
+"""Vector store em numpy para os registros de conhecimento de um agente."""
+import hashlib
+import json
+import mmap
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from shared.bm25 import BM25_FILE, BM25Index, reciprocal_rank_fusion
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.knowledge_parser import chunk_record, iter_knowledge, record_text
+from shared.metadata_index import METADATA_FILE, MetadataIndex
+from shared.quantized_index import QuantizedIndex
+from shared.temporal_index import TEMPORAL_FILE, TemporalIndex
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.jsonl"
+RECORDS_FILE = "records.jsonl"
+MANIFEST_FILE = "manifest.json"
+CHUNK_RECORDS_FILE = "chunk_records.npy"
+PARTITIONS_FILE = "partitions.npy"
+
+# Cada build grava seus arquivos em <índice>/gen-<timestamp>/; o manifest.json
+# da raiz aponta para a geração ativa e é trocado com um único os.replace.
+GENERATION_PREFIX = "gen-"
+
+# Diretório (em vectorstore_indices/) do índice único com todos os agentes.
+UNIFIED_INDEX = "_unified"
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def generation_dir(index_dir: Union[str, Path], manifest: dict) -> Path:
+    """Diretório com os arquivos da geração apontada pelo manifest (índices antigos: a raiz)."""
+    generation = manifest.get("generation")
+    return Path(index_dir) / generation if generation else Path(index_dir)
+
+
+def read_jsonl(path: Union[str, Path]) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class JsonlReader(Sequence):
+    """Acesso aleatório às linhas de um .jsonl via mmap, sem carregá-lo no heap.
+
+    Só o vetor de offsets fica em memória; o conteúdo é lido do page cache do
+    SO, compartilhado entre os processos que abrem o mesmo arquivo.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.path.stat().st_size else None
+
+        if self._mmap is None:
+            self._offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        newlines = np.flatnonzero(np.frombuffer(self._mmap, dtype=np.uint8) == ord("\n"))
+        ends = newlines + 1
+        if not len(ends) or ends[-1] != len(self._mmap):
+            ends = np.append(ends, len(self._mmap))
+        self._offsets = np.concatenate(([0], ends)).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return json.loads(self._mmap[start:end].decode("utf-8"))
+
+
+class VectorStore:
+    """Matriz de vetores normalizados (um por chunk) + registros de origem.
+
+    ``chunk_records[i]`` é a posição, em ``records``, do registro de onde
+    saiu a linha ``i`` de ``vectors``.
+    """
+
+    def __init__(self, embedder: HashedNgramEmbedder, records: Sequence[dict],
+                 chunk_records: np.ndarray, vectors: np.ndarray,
+                 metadata: Optional[MetadataIndex] = None, bm25_path: Optional[Path] = None,
+                 temporal: Optional[TemporalIndex] = None):
+        self.embedder = embedder
+        self.records = records
+        self.chunk_records = chunk_records
+        self.vectors = vectors
+        self.metadata = metadata if metadata is not None else MetadataIndex.from_records(records)
+        self.temporal = temporal if temporal is not None else TemporalIndex.from_records(records)
+        self._bm25_path = bm25_path
+        self._lexical: Optional[BM25Index] = None
+        self.manifest: dict = {}
+        self.path: Optional[Path] = None
+        self.record_partitions: Optional[np.ndarray] = None
+        self.quantized: Optional[QuantizedIndex] = None
+        self.nprobe = 8
+        self.rerank = 100
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def num_chunks(self) -> int:
+        return len(self.chunk_records)
+
+    @property
+    def lexical(self) -> BM25Index:
+        """Índice BM25 dos registros, aberto/montado só na primeira busca lexical."""
+        if self._lexical is None:
+            if self._bm25_path is not None and self._bm25_path.exists():
+                self._lexical = BM25Index.load(self._bm25_path)
+            else:
+                self._lexical = BM25Index.build(record_text(record) for record in self.records)
+        return self._lexical
+
+    @property
+    def partitions(self) -> List[str]:
+        """Agentes presentes no índice, na ordem dos ids de ``record_partitions``."""
+        return self.manifest.get("partitions", [])
+
+    def partition_mask(self, agent_ids: Sequence[str]) -> Optional[np.ndarray]:
+        """Máscara dos registros cujos agentes estão em ``agent_ids`` (None = sem partições)."""
+        if self.record_partitions is None:
+            return None
+        ids = [index for index, agent_id in enumerate(self.partitions) if agent_id in set(agent_ids)]
+        return np.isin(self.record_partitions, ids)
+
+    def attach_quantized(self, index: QuantizedIndex, nprobe: int = 8, rerank: int = 100) -> None:
+        """Passa a buscar pelo índice comprimido (IVF) em vez da varredura completa."""
+        self.quantized = index
+        self.nprobe = nprobe
+        self.rerank = rerank
+
+    def warm(self, rows_per_step: int = 4096) -> None:
+        """Lê todas as páginas dos arquivos mapeados para trazê-las ao page cache."""
+        for start in range(0, len(self.vectors), rows_per_step):
+            float(np.asarray(self.vectors[start:start + rows_per_step]).sum())
+        for start in range(0, len(self.chunk_records), rows_per_step * 16):
+            int(np.asarray(self.chunk_records[start:start + rows_per_step * 16]).sum())
+
+    @classmethod
+    def from_knowledge(cls, knowledge_path: Union[str, Path],
+                       embedder: Optional[HashedNgramEmbedder] = None) -> "VectorStore":
+        """Monta o índice em memória direto dos arquivos de conhecimento."""
+        embedder = embedder or HashedNgramEmbedder()
+        records, chunk_records, texts = [], [], []
+        metadata = MetadataIndex()
+        temporal = TemporalIndex()
+
+        for record in iter_knowledge(knowledge_path):
+            for _, text in chunk_record(record):
+                chunk_records.append(len(records))
+                texts.append(text)
+            metadata.add(len(records), record)
+            temporal.add(len(records), record)
+            records.append(record)
+
+        vectors = embedder.embed(texts) if texts else np.zeros((0, embedder.dim), dtype=np.float32)
+        return cls(embedder, records, np.array(chunk_records, dtype=np.int32), vectors, metadata,
+                   temporal=temporal.build())
+
+    @classmethod
+    def load(cls, index_dir: Union[str, Path], mmap_mode: Optional[str] = "r") -> "VectorStore":
+        """Abre um índice gerado pelo ``build_indices.py``.
+
+        Com ``mmap_mode="r"`` (padrão) vetores e registros ficam mapeados em
+        disco: nada é lido até a primeira busca, e processos diferentes
+        compartilham as mesmas páginas pelo page cache do SO.
+
+        Todos os arquivos são lidos da geração nomeada no manifest, então um
+        rebuild concorrente nunca mistura arquivos de duas versões.
+        """
+        with open(Path(index_dir) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        index_dir = generation_dir(index_dir, manifest)
+
+        if (index_dir / CHUNK_RECORDS_FILE).exists():
+            chunk_records = np.load(index_dir / CHUNK_RECORDS_FILE, mmap_mode=mmap_mode)
+        else:
+            chunk_records = np.array([c["record"] for c in read_jsonl(index_dir / CHUNKS_FILE)], dtype=np.int32)
+
+        records = JsonlReader(index_dir / RECORDS_FILE) if mmap_mode else read_jsonl(index_dir / RECORDS_FILE)
+        metadata = MetadataIndex.load(index_dir / METADATA_FILE) if (index_dir / METADATA_FILE).exists() else None
+        temporal = TemporalIndex.load(index_dir / TEMPORAL_FILE) if (index_dir / TEMPORAL_FILE).exists() else None
+
+        store = cls(
+            HashedNgramEmbedder(**manifest["embedder"]),
+            records,
+            chunk_records,
+            np.load(index_dir / VECTORS_FILE, mmap_mode=mmap_mode),
+            metadata,
+            index_dir / BM25_FILE,
+            temporal
+        )
+        store.manifest = manifest
+        store.path = index_dir
+        if (index_dir / PARTITIONS_FILE).exists():
+            store.record_partitions = np.load(index_dir / PARTITIONS_FILE, mmap_mode=mmap_mode)
+        return store
+
+    @staticmethod
+    def exists(index_dir: Union[str, Path]) -> bool:
+        return (Path(index_dir) / MANIFEST_FILE).exists()
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[int, float]]:
+        """Retorna [(chunk, score)] dos ``top_k`` chunks mais similares."""
+        if not self.num_chunks or top_k <= 0:
+            return []
+
+        scores = self.vectors @ self.embedder.embed_one(query)
+        return self._top(scores, top_k)
+
+    def search_records(self, query: str, top_k: int = 3,
+                       record_mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Retorna [(registro, score)]: o score do registro é o do seu melhor chunk.
+
+        Com ``record_mask`` (ver ``MetadataIndex.mask``) só os chunks dos
+        registros selecionados são lidos e pontuados.
+        """
+        if not self.num_chunks or top_k <= 0:
+            return []
+
+        query_vector = self.embedder.embed_one(query)
+        record_scores = np.full(len(self.records), -1.0, dtype=np.float32)
+
+        if self.quantized is not None:
+            row_mask = None if record_mask is None else record_mask[self.chunk_records]
+            rows, scores = self.quantized.search(
+                query_vector, self.vectors, max(self.rerank, top_k), self.nprobe, self.rerank, row_mask
+            )
+            if not len(rows):
+                return []
+            np.maximum.at(record_scores, self.chunk_records[rows], scores)
+            return self._top(record_scores, min(top_k, len(np.unique(self.chunk_records[rows]))))
+
+        if record_mask is None:
+            np.maximum.at(record_scores, self.chunk_records, self.vectors @ query_vector)
+            return self._top(record_scores, top_k)
+
+        rows = np.flatnonzero(record_mask[self.chunk_records])
+        if not len(rows):
+            return []
+        np.maximum.at(record_scores, self.chunk_records[rows], self.vectors[rows] @ query_vector)
+        return self._top(record_scores, min(top_k, int(record_mask.sum())))
+
+    def search_lexical(self, query: str, top_k: int = 3,
+                       record_mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Retorna [(registro, score BM25)]; bom para termos exatos ('art. 311', 'PLR')."""
+        return self.lexical.search(query, top_k, record_mask)
+
+    def search_hybrid(self, query: str, top_k: int = 3, record_mask: Optional[np.ndarray] = None,
+                      rrf_k: int = 60, depth: int = 20) -> List[Tuple[int, float]]:
+        """Funde as buscas vetorial e BM25 (``depth`` candidatos de cada) por RRF."""
+        depth = max(depth, top_k)
+        fused = reciprocal_rank_fusion([
+            self.search_records(query, depth, record_mask),
+            self.search_lexical(query, depth, record_mask),
+        ], k=rrf_k)
+        return fused[:top_k]
+
+    @staticmethod
+    def _top(scores: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        top_k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(row), float(scores[row])) for row in candidates]
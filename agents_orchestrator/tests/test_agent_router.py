@@ -0,0 +1,93 @@
+"""Roteamento em lote e cache LRU de decisões."""
+import pytest
+
+from agent_router import AgentRouter
+from shared.keyword_index import KeywordIndex
+
+KEYWORDS = {
+    "irpj_csll": {"primary": ["irpj", "csll", "lucro real"], "secondary": ["lucro", "dedutibilidade"]},
+    "pis_cofins": {"primary": ["pis", "cofins"], "secondary": ["crédito", "não cumulativo"]},
+    "icms": {"primary": ["icms", "substituição tributária"], "secondary": ["st", "difal"]},
+}
+QUERIES = ["Alíquota da CSLL", "alíquota da csll?", "crédito de PIS e COFINS", "ICMS ST", "lucro real e IRPJ",
+           "dedutibilidade no lucro real", "crédito não cumulativo de PIS", "DIFAL", "pergunta sem palavra-chave",
+           "substituição tributária do ICMS", "lucro"]
+
+
+class CountingIndex(KeywordIndex):
+    def __init__(self, normalize=True):
+        super().__init__(normalize=normalize)
+        self.scored = []
+
+    def rank(self, query, candidates=None):
+        self.scored.append(query)
+        return super().rank(query, candidates)
+
+    def rank_batch(self, queries):
+        self.scored.extend(queries)
+        return super().rank_batch(queries)
+
+
+class Registry:
+    def __init__(self, max_size=100, normalize=True):
+        self.routing_config = {"mode": "keyword", "cache": {"max_size": max_size}}
+        self.keyword_index = CountingIndex(normalize)
+        for agent_id, groups in KEYWORDS.items():
+            self.keyword_index.add_agent(agent_id, groups)
+        self.keyword_index.build()
+
+    def get_all_agent_ids(self):
+        return list(KEYWORDS)
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_rank_batch_matches_rank(normalize):
+    index = Registry(normalize=normalize).keyword_index
+    for query, ranking in zip(QUERIES, index.rank_batch(QUERIES)):
+        expected = index.rank(query)
+        assert [agent for agent, _ in ranking] == [agent for agent, _ in expected]
+        assert [score for _, score in ranking] == pytest.approx([score for _, score in expected])
+
+
+def test_keywords_do_not_match_across_queries():
+    index = Registry().keyword_index
+    # "lucro" + "real" em consultas vizinhas não formam "lucro real".
+    rankings = index.rank_batch(["lucro", "real"])
+    assert rankings == [index.rank("lucro"), index.rank("real")]
+
+
+def test_batch_matches_single_routing_and_scores_duplicates_once():
+    single = AgentRouter(Registry())
+    expected = [single.route(query).primary_agent for query in QUERIES]
+
+    registry = Registry()
+    router = AgentRouter(registry)
+    results = router.route_batch(QUERIES)
+
+    assert [result.primary_agent for result in results] == expected
+    assert expected[:5] == ["irpj_csll", "irpj_csll", "pis_cofins", "icms", "irpj_csll"]
+    # "Alíquota da CSLL" e "alíquota da csll?" têm a mesma chave: pontuadas uma vez, numa chamada.
+    assert len(registry.keyword_index.scored) == len(QUERIES) - 1
+
+    router.route("ALÍQUOTA DA CSLL")
+    assert len(registry.keyword_index.scored) == len(QUERIES) - 1
+    assert router.get_cache_stats()["hits"] == 1
+
+
+def test_cache_is_bounded():
+    registry = Registry(max_size=2)
+    router = AgentRouter(registry)
+    for query in ["irpj", "pis", "icms", "irpj"]:
+        router.route(query)
+
+    stats = router.get_cache_stats()
+    assert stats["size"] == 2
+    assert (stats["hits"], stats["misses"]) == (0, 4)
+    assert len(registry.keyword_index.scored) == 4
+
+
+def test_normalize_texts_matches_normalize_text():
+    from shared.text_normalizer import normalize_text, normalize_texts
+
+    texts = ["  Alíquota  da CSLL?? ", "ALÃ\x8dQUOTA", "compensaÃ§Ã£o", "", "tab\there\nnl", "Straße"]
+    assert normalize_texts(texts) == [normalize_text(text) for text in texts]
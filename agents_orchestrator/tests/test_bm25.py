@@ -0,0 +1,94 @@
+"""BM25 em CSR e fusão com a busca vetorial por RRF."""
+import math
+
+import numpy as np
+import pytest
+
+from shared.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from shared.retriever import KnowledgeRetriever
+
+from tests.test_retriever import Registry, write_records
+
+DOCS = [
+    "Multa do art. 311 do RIR/2018 sobre o lucro real",
+    "PLR paga aos empregados é dedutível",
+    "Lucro presumido: receita bruta até 78.000.000",
+    "lucro real lucro real lucro real e apuração trimestral",
+    "Brindes são indedutíveis",
+]
+
+
+def reference_scores(docs, query, k1=1.2, b=0.75):
+    tokenized = [tokenize(doc) for doc in docs]
+    avg = sum(map(len, tokenized)) / len(tokenized)
+    scores = []
+    for tokens in tokenized:
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in doc for doc in tokenized)
+            tf = tokens.count(term)
+            if tf:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avg))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_keeps_legal_references():
+    assert tokenize("Art. 311 do RIR/2018, limite de R$ 78.000.000") == [
+        "art", "311", "do", "rir", "2018", "limite", "de", "r", "78000000"
+    ]
+
+
+def test_csr_layout_and_scores_match_okapi_formula():
+    index = BM25Index.build(DOCS)
+    assert index.offsets[0] == 0 and index.offsets[-1] == len(index.doc_ids)
+    for term, position in index.terms.items():
+        docs = index.doc_ids[index.offsets[position]:index.offsets[position + 1]]
+        assert np.all(np.diff(docs) > 0)
+        assert docs.tolist() == [doc for doc, text in enumerate(DOCS) if term in tokenize(text)]
+
+    for query in ("lucro real", "art. 311", "78.000.000", "PLR dedutível", "inexistente"):
+        assert index.scores(query) == pytest.approx(reference_scores(DOCS, query), rel=1e-5)
+
+
+def test_search_ranks_masks_and_roundtrips(tmp_path):
+    index = BM25Index.build(DOCS)
+    hits = index.search("lucro real", 10)
+    assert [doc for doc, _ in hits] == [3, 0, 2]
+    assert index.search("lucro real", 10, mask=np.array([1, 1, 1, 0, 1], dtype=bool))[0][0] == 0
+    assert index.search("inexistente") == [] and index.search("lucro", 0) == []
+
+    index.save(tmp_path / "bm25.npz")
+    assert BM25Index.load(tmp_path / "bm25.npz").search("lucro real", 10) == hits
+
+
+def test_rrf_orders_by_summed_reciprocal_ranks():
+    vector = [(1, 0.9), (2, 0.8), (3, 0.7)]
+    lexical = [(3, 12.0), (4, 9.0), (1, 1.0)]
+    fused = reciprocal_rank_fusion([vector, lexical], k=60)
+
+    # 1: 1/61 + 1/63; 3: 1/63 + 1/61 (empate, ordem da primeira aparição); 2: 1/62; 4: 1/62.
+    assert [item for item, _ in fused] == [1, 3, 2, 4]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 63)
+    assert fused[2][1] == pytest.approx(1 / 62)
+    # Só a posição conta, não a escala dos scores de cada lista.
+    assert reciprocal_rank_fusion([[(7, 1e9), (8, 1e-9)]]) == reciprocal_rank_fusion([[(7, 0.1), (8, 0.0)]])
+
+
+def test_hybrid_retrieval_returns_fused_order(tmp_path):
+    knowledge = tmp_path / "irpj_csll" / "knowledge"
+    knowledge.mkdir(parents=True)
+    write_records(knowledge / "base.txt", [
+        {"ID": f"REG-{i}", "TEMA": text[:20], "DESCRICAO DETALHADA": text} for i, text in enumerate(DOCS)
+    ])
+    retriever = KnowledgeRetriever(Registry(tmp_path, {"irpj_csll": {
+        "enabled": True, "top_k": 3, "retrieval_mode": "hybrid", "fusion_depth": 5
+    }}))
+    store = retriever.get_store("irpj_csll")
+    query = "art. 311"
+
+    expected = reciprocal_rank_fusion([store.search_records(query, 5), store.search_lexical(query, 5)])[:3]
+    result = retriever.retrieve("irpj_csll", query)
+    assert result.record_ids == [f"REG-{row}" for row, _ in expected]
+    assert result.record_ids[0] == "REG-0"
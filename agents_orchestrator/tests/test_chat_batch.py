@@ -0,0 +1,51 @@
+"""/api/chat/batch: itens inválidos viram linhas de erro, não derrubam o lote."""
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("crewai")
+
+
+@pytest.fixture(scope="module")
+def client():
+    import os
+    os.environ.setdefault("GOOGLE_API_KEY", "test")
+    import orchestrator
+    return orchestrator.app.test_client()
+
+
+def test_invalid_items_become_error_lines(client):
+    items = [{"prompt": 5}, None, {"prompt": "x", "agent_id": 7}, {"prompt": "y", "task_type": [1]}, ""]
+    response = client.post("/api/chat/batch", json={"items": items})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    errors = {line["index"]: line for line in lines if "index" in line}
+    assert sorted(errors) == list(range(len(items)))
+    assert all(line["status"] == "error" and line["error"] for line in errors.values())
+    assert lines[-1]["summary"]["failed"] == len(items)
+
+
+@pytest.mark.parametrize("body", [[{"prompt": "a"}], "texto", None])
+def test_non_object_body_is_400(client, body):
+    response = client.post("/api/chat/batch", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("url", ["/api/chat", "/api/chat/stream", "/api/jobs"])
+def test_non_text_prompt_is_400(client, url):
+    assert client.post(url, json={"prompt": 5}).status_code == 400
+    assert client.post(url, json=[1, 2]).status_code == 400
+
+
+@pytest.mark.parametrize("url", ["/api/chat", "/api/chat/stream", "/api/jobs"])
+def test_unknown_task_type_is_400(client, url):
+    response = client.post(url, json={"prompt": "alíquota da CSLL", "task_type": "inexistente"})
+    assert response.status_code == 400
+    assert "inexistente" in response.get_json()["error"]
+    metrics = client.get("/api/metrics")
+    assert metrics.status_code == 200
+    assert "inexistente" not in metrics.get_data(as_text=True)
@@ -0,0 +1,101 @@
+"""Pool de crews: limites por agente, fila limitada e 429 com Retry-After."""
+import os
+import threading
+import time
+
+import pytest
+
+from shared.crew_executor import CrewExecutor, QueueFullError
+
+
+@pytest.fixture
+def executor():
+    executor = CrewExecutor(max_workers=2, queue_depth=1, agent_limits={"irpj_csll": 1})
+    yield executor
+    executor.shutdown()
+
+
+def stats_when(executor, condition):
+    """O Future resolve antes de o worker liberar a vaga: espera os contadores assentarem."""
+    deadline = time.monotonic() + 2
+    while not condition(executor.stats()) and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return executor.stats()
+
+
+def blocked(release, started=None):
+    def fn():
+        if started is not None:
+            started.set()
+        release.wait(2)
+        return "ok"
+    return fn
+
+
+def test_agent_limit_and_queue_order(executor):
+    release = threading.Event()
+    first = executor.submit("irpj_csll", blocked(release))
+    queued = executor.submit("irpj_csll", lambda: "segundo")
+    other = executor.submit("pis_cofins", lambda: "outro agente")
+
+    # O segundo irpj_csll espera a vaga do agente; pis_cofins usa o outro worker.
+    assert other.result(2)[0] == "outro agente"
+    stats = stats_when(executor, lambda stats: stats["completed"] == 1)
+    assert (stats["running_by_agent"], stats["queued"]) == ({"irpj_csll": 1}, 1)
+    release.set()
+
+    assert first.result(2)[0] == "ok"
+    result, timing = queued.result(2)
+    assert result == "segundo"
+    assert timing.queue_wait_ms > 0 and timing.execution_ms >= 0
+    assert executor.agent_limit("irpj_csll") == 1 and executor.agent_limit("outro") == 2
+
+
+def test_full_queue_is_rejected_with_retry_after(executor):
+    release = threading.Event()
+    running = [executor.submit("pis_cofins", blocked(release)) for _ in range(2)]
+    executor.submit("pis_cofins", lambda: "na fila")
+
+    with pytest.raises(QueueFullError) as error:
+        executor.submit("icms_sp", lambda: "rejeitado")
+    assert error.value.retry_after >= 1
+    assert executor.stats()["rejected"] == 1
+
+    release.set()
+    assert [future.result(2)[0] for future in running] == ["ok", "ok"]
+
+
+def test_exceptions_reach_the_caller_and_free_the_slot(executor):
+    def failing():
+        raise RuntimeError("falha do LLM")
+
+    with pytest.raises(RuntimeError):
+        executor.run("irpj_csll", failing, timeout=2)
+    assert executor.run("irpj_csll", lambda: "ok", timeout=2)[0] == "ok"
+    assert stats_when(executor, lambda stats: stats["completed"] == 2)["running"] == 0
+
+
+def test_chat_returns_429_with_retry_after_when_queue_is_full(monkeypatch):
+    pytest.importorskip("flask")
+    pytest.importorskip("crewai")
+    os.environ.setdefault("GOOGLE_API_KEY", "test")
+    import orchestrator
+
+    saturated = CrewExecutor(max_workers=1, queue_depth=0)
+    release, started = threading.Event(), threading.Event()
+    saturated.submit("irpj_csll", blocked(release, started))
+    started.wait(2)
+    monkeypatch.setattr(orchestrator, "crew_executor", saturated)
+    try:
+        response = orchestrator.app.test_client().post("/api/chat", json={
+            "prompt": f"dedutibilidade de despesas com brindes {time.time()}",
+            "agent_id": "irpj_csll",
+            "task_type": "padrao",
+        })
+    finally:
+        release.set()
+        saturated.shutdown()
+
+    assert response.status_code == 429
+    retry_after = int(response.headers["Retry-After"])
+    assert retry_after >= 1 and response.get_json()["retry_after"] == retry_after
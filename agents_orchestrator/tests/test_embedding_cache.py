@@ -0,0 +1,78 @@
+"""Cache de embeddings em SQLite: acertos, invalidação por modelo e limite de entradas."""
+import time
+
+import numpy as np
+import pytest
+
+from shared.embedding_cache import CachedEmbedder, EmbeddingCache, embedding_key
+from shared.hashed_embedder import HashedNgramEmbedder
+
+
+class CountingEmbedder(HashedNgramEmbedder):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite")
+    yield cache
+    cache.close()
+
+
+def test_only_unseen_texts_are_embedded(cache):
+    inner = CountingEmbedder(dim=64)
+    embedder = CachedEmbedder(inner, cache)
+
+    first = embedder.embed(["brindes", "aluguel", "brindes"])
+    assert inner.embedded == ["brindes", "aluguel"]
+    assert len(cache) == 2
+
+    second = embedder.embed(["aluguel", "plr", "brindes"])
+    assert inner.embedded == ["brindes", "aluguel", "plr"]
+    np.testing.assert_array_equal(second[[0, 2]], first[[1, 0]])
+    np.testing.assert_allclose(second, HashedNgramEmbedder(dim=64).embed(["aluguel", "plr", "brindes"]))
+    assert cache.stats()["hits"] == 2
+
+
+def test_cache_survives_reopening(tmp_path, cache):
+    CachedEmbedder(HashedNgramEmbedder(dim=64), cache).embed(["brindes"])
+    cache.close()
+
+    reopened = EmbeddingCache(tmp_path / "embeddings.sqlite")
+    inner = CountingEmbedder(dim=64)
+    CachedEmbedder(inner, reopened).embed_one("brindes")
+    assert inner.embedded == []
+    assert (len(reopened), reopened.stats()["hit_rate"]) == (1, 1.0)
+    reopened.close()
+
+
+def test_changing_the_model_invalidates_entries(cache):
+    CachedEmbedder(HashedNgramEmbedder(dim=64), cache).embed(["brindes"])
+
+    for changed in (CountingEmbedder(dim=128), CountingEmbedder(dim=64, char_ngrams=(2, 4))):
+        CachedEmbedder(changed, cache).embed(["brindes"])
+        assert changed.embedded == ["brindes"]
+    assert embedding_key("m1", "brindes") != embedding_key("m2", "brindes")
+    assert len(cache) == 3
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite", max_entries=2)
+    keys = [embedding_key("m", text) for text in ("a", "b", "c")]
+    cache.put_many({keys[0]: np.ones(4)})
+    time.sleep(0.01)
+    cache.put_many({keys[1]: np.ones(4)})
+    time.sleep(0.01)
+    cache.get_many([keys[0]])
+    time.sleep(0.01)
+    cache.put_many({keys[2]: np.ones(4)})
+
+    assert set(cache.get_many(keys)) == {keys[0], keys[2]}
+    assert len(cache) == 2
+    cache.close()
@@ -0,0 +1,39 @@
+"""Fan-out: uma sub-pergunta com erro não derruba a resposta composta."""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("crewai")
+
+from shared.fan_out import SubQuestion
+
+
+@pytest.fixture(scope="module")
+def orchestrator():
+    import os
+    os.environ.setdefault("GOOGLE_API_KEY", "test")
+    import orchestrator
+    return orchestrator
+
+
+def test_failing_part_is_reported_as_error(orchestrator, monkeypatch):
+    def resolve_answer(agent_id, query, task_type="padrao", filters=None, reference_date=None):
+        if agent_id == "pis_cofins":
+            raise RuntimeError("falha inesperada")
+        return {"status": "success", "reply": f"Resposta de {agent_id}", "agent_used": agent_id,
+                "confidence": 0.9, "timestamp": datetime.now().isoformat()}, {"answered_by": "crew"}
+
+    monkeypatch.setattr(orchestrator, "resolve_answer", resolve_answer)
+    plan = [SubQuestion("irpj_csll", 0.8, "PLR no IRPJ"), SubQuestion("pis_cofins", 0.6, "PLR no PIS")]
+    request = {"task_type": "padrao", "filters": None, "reference_date": None}
+
+    with orchestrator.app.app_context():
+        response = orchestrator.answer_fan_out(plan, request)
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["metadata"]["agents_used"] == ["irpj_csll"]
+    statuses = {detail["agent"]: detail["status"] for detail in data["metadata"]["fan_out"]}
+    assert statuses == {"irpj_csll": "success", "pis_cofins": "error"}
+    assert "pis_cofins (erro)" in data["reply"]
@@ -0,0 +1,47 @@
+"""FAQ direto: só responde com registro do tributo citado na pergunta."""
+import pytest
+
+from shared.faq_index import FaqIndex
+from shared.hashed_embedder import HashedNgramEmbedder
+
+
+def record(record_id, tax, section, topic, tags, description):
+    return {"ID": record_id, "IMPOSTO": tax, "SECAO": section, "TOPICO": topic, "TAGS": tags,
+            "DESCRICAO DETALHADA": description, "BASE LEGAL": "Lei nº 7.689/1988", "DATA": "2025-10-23"}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FaqIndex(HashedNgramEmbedder(), [
+        record("csll_aliquota", "CSLL", "Alíquotas", "Alíquotas Padrão e Especiais",
+               "csll, aliquota, aliquota_geral", "A alíquota geral da CSLL é de 9%."),
+        record("irpj_adicional", "IRPJ", "Alíquotas", "Alíquota e Adicional",
+               "irpj, aliquota, adicional", "A alíquota do IRPJ é de 15%, com adicional de 10%."),
+        record("brindes", "IRPJ / CSLL", "Dedutibilidade", "Brindes",
+               "brindes, dedutibilidade", "Brindes são indedutíveis."),
+    ])
+
+
+@pytest.mark.parametrize("query, record_id", [
+    ("Qual a alíquota da CSLL?", "csll_aliquota"),
+    ("qual o adicional do IRPJ", "irpj_adicional"),
+])
+def test_matching_tax_is_answered(index, query, record_id):
+    match = index.match(query)
+    assert match is not None and match.record_id == record_id
+    assert match.confidence >= 0.6
+
+
+@pytest.mark.parametrize("query", [
+    "alíquota do PIS",       # nenhum registro de PIS: não pode virar a alíquota da CSLL
+    "alíquota do ICMS e da CSLL",
+    "qual a alíquota?",      # sem tributo: ambígua
+])
+def test_other_or_missing_tax_goes_to_llm(index, query):
+    assert index.match(query) is None
+
+
+def test_wrong_tax_is_rejected_even_with_low_threshold(index):
+    assert index.match("alíquota do PIS", min_confidence=0.0, min_margin=0.0) is None
+    match = index.match("alíquota da CSLL", min_confidence=0.0, min_margin=0.0)
+    assert match.record_id == "csll_aliquota"
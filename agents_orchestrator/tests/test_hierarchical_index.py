@@ -0,0 +1,60 @@
+"""Roteamento hierárquico: categoria -> UF -> agentes do ramo."""
+import pytest
+
+from shared.hierarchical_index import HierarchicalIndex
+from shared.keyword_index import KeywordIndex
+from shared.uf_lookup import UFLookup
+
+
+def test_normalize_flag_divides_by_total_weight():
+    groups = {"primary": ["icms", "difal"], "secondary": ["st"]}
+    for normalize, expected in ((True, 1.0 / 2.5), (False, 1.0)):
+        index = KeywordIndex(normalize=normalize)
+        index.add_agent("icms", groups)
+        index.add_agent("iss", {"primary": ["iss"]})
+        assert index.build().rank("Ícms na importação")[0] == ("icms", pytest.approx(expected))
+
+
+def test_without_normalize_broad_categories_are_not_penalized():
+    # Categoria com muitas palavras-chave não perde para uma com poucas só pelo total.
+    index = KeywordIndex(normalize=False)
+    index.add_agent("tributos_federais", {"primary": ["irpj", "csll", "pis", "cofins", "ipi", "iof"]})
+    index.add_agent("tributos_municipais", {"primary": ["iss", "iptu"], "secondary": ["irpj"]})
+    assert index.build().rank("IRPJ")[0][0] == "tributos_federais"
+
+
+@pytest.mark.parametrize("query, uf", [
+    ("ICMS em São Paulo", "SP"), ("alíquota do icms sp", "SP"), ("DIFAL no RJ", "RJ"),
+    ("substituição tributária no Pará", "PA"), ("crédito para exportação", None),
+    ("se o contribuinte optar", None), ("Mato Grosso do Sul", "MS"),
+])
+def test_uf_lookup(query, uf):
+    assert UFLookup().detect(query) == uf
+
+
+@pytest.fixture
+def index():
+    index = HierarchicalIndex()
+    index.add_agent("irpj_csll", "tributos_federais", None, {"primary": ["irpj", "csll"]})
+    index.add_agent("icms_sp", "tributos_estaduais", "SP", {"primary": ["icms", "sp"], "secondary": ["st"]})
+    index.add_agent("icms_rj", "tributos_estaduais", "RJ", {"primary": ["icms", "rj"], "secondary": ["st"]})
+    index.add_agent("icms_geral", "tributos_estaduais", None, {"primary": ["icms"]})
+    return index.build()
+
+
+def test_only_the_detected_branch_is_scored(index):
+    category, uf, ranking = index.rank("ICMS ST em São Paulo")
+    assert (category, uf) == ("tributos_estaduais", "SP")
+    assert [agent for agent, _ in ranking] == ["icms_sp"]
+
+
+def test_uf_without_branch_falls_back_to_category_branch(index):
+    assert index.rank("ICMS na Bahia") == ("tributos_estaduais", None, [("icms_geral", 1.0)])
+
+
+def test_uf_abbreviation_is_not_a_category_keyword(index):
+    # "sp" é palavra-chave de icms_sp, mas sozinha não escolhe a categoria.
+    assert index.category_index.rank("sp")[0][1] == 0
+    assert index.classify("IRPJ de empresa em SP") == ("tributos_federais", "SP")
+    assert index.rank("IRPJ de empresa em SP") == ("tributos_federais", None, [("irpj_csll", 0.5)])
+    assert index.rank("consulta genérica")[:1] == (None,)
@@ -0,0 +1,78 @@
+"""Rebuild do índice vetorial enquanto há leitores abertos."""
+import threading
+
+import numpy as np
+
+from shared.index_builder import IndexBuilder
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.vector_store import VectorStore
+
+
+def write_knowledge(path, count, version):
+    lines = []
+    for i in range(count):
+        lines += [
+            f"[ID]: REG-{i:04d}",
+            f"[TEMA]: Tema {i} v{version}",
+            f"[DESCRICAO DETALHADA]: Registro {i} da versão {version} sobre dedutibilidade de despesas.",
+            "---",
+        ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def assert_consistent(store):
+    assert len(store) == store.manifest["records"]
+    assert store.vectors.shape[0] == store.num_chunks == store.manifest["chunks"]
+    assert int(np.asarray(store.chunk_records).max()) == len(store) - 1
+    version = store.records[0]["TEMA"].rsplit(" v", 1)[1]
+    assert all(record["TEMA"].endswith(f" v{version}") for record in store.records)
+
+
+def test_open_store_survives_rebuild(tmp_path):
+    knowledge = tmp_path / "knowledge"
+    knowledge.mkdir()
+    output = tmp_path / "index"
+    builder = IndexBuilder(HashedNgramEmbedder(dim=64))
+
+    write_knowledge(knowledge / "base.txt", 10, 1)
+    builder.build("agente", knowledge, output)
+    old = VectorStore.load(output)
+
+    write_knowledge(knowledge / "base.txt", 25, 2)
+    builder.build("agente", knowledge, output, force=True)
+    new = VectorStore.load(output)
+
+    assert_consistent(old)
+    assert_consistent(new)
+    assert len(old) == 10 and len(new) == 25
+    assert old.path != new.path
+
+
+def test_readers_never_see_mixed_generations(tmp_path):
+    knowledge = tmp_path / "knowledge"
+    knowledge.mkdir()
+    output = tmp_path / "index"
+    builder = IndexBuilder(HashedNgramEmbedder(dim=64))
+    write_knowledge(knowledge / "base.txt", 5, 0)
+    builder.build("agente", knowledge, output)
+
+    stop = threading.Event()
+
+    def rebuild():
+        version = 1
+        while not stop.is_set():
+            write_knowledge(knowledge / "base.txt", 5 + version % 7, version)
+            builder.build("agente", knowledge, output, force=True)
+            version += 1
+
+    thread = threading.Thread(target=rebuild)
+    thread.start()
+    try:
+        for _ in range(200):
+            assert_consistent(VectorStore.load(output))
+    finally:
+        stop.set()
+        thread.join()
+
+    generations = [path for path in output.iterdir() if path.is_dir()]
+    assert len(generations) <= 2
@@ -0,0 +1,97 @@
+"""Jobs assíncronos: ciclo de vida, cancelamento e expiração por TTL."""
+import threading
+import time
+
+import pytest
+
+from shared.job_manager import (
+    CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobLimitError, JobManager,
+)
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, ttl_seconds=60, max_pending=2)
+    yield manager
+    manager._pool.shutdown(wait=False)
+
+
+def wait_status(manager, job, *statuses):
+    deadline = time.monotonic() + 2
+    while manager.get(job.job_id).status not in statuses and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return manager.get(job.job_id)
+
+
+def test_results_and_errors_are_kept(manager):
+    done = manager.submit(lambda job: {"reply": "ok"}, {"agent_id": "irpj_csll"})
+    assert wait_status(manager, done, SUCCEEDED).to_dict()["result"] == {"reply": "ok"}
+    assert done.to_dict()["agent_id"] == "irpj_csll"
+
+    def failing(job):
+        raise RuntimeError("falha do LLM")
+
+    failed = wait_status(manager, manager.submit(failing), FAILED)
+    assert failed.to_dict()["error"] == "falha do LLM" and "result" not in failed.to_dict()
+    assert manager.get("inexistente") is None
+
+
+def test_cancel_queued_job_never_runs(manager):
+    release = threading.Event()
+    busy = manager.submit(lambda job: release.wait(2))
+    ran = []
+    queued = manager.submit(lambda job: ran.append(1))
+    assert manager.get(queued.job_id).status == QUEUED
+
+    assert manager.cancel(queued.job_id).status == CANCELLED
+    release.set()
+    wait_status(manager, busy, SUCCEEDED)
+    time.sleep(0.05)
+    assert ran == [] and manager.get(queued.job_id).status == CANCELLED
+
+
+def test_cancel_running_job_discards_its_result(manager):
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def analysis(job):
+        started.set()
+        release.wait(2)
+        seen.append(job.cancelled)
+        return "tarde demais"
+
+    job = manager.submit(analysis)
+    started.wait(2)
+    assert manager.get(job.job_id).status == RUNNING
+    manager.cancel(job.job_id)
+    release.set()
+
+    time.sleep(0.05)
+    assert seen == [True]
+    assert (job.status, job.result) == (CANCELLED, None)
+    # Cancelar de novo (ou um job concluído) não muda nada.
+    assert manager.cancel(job.job_id).status == CANCELLED
+
+
+def test_pending_limit(manager):
+    release = threading.Event()
+    manager.submit(lambda job: release.wait(2))
+    manager.submit(lambda job: None)
+    with pytest.raises(JobLimitError):
+        manager.submit(lambda job: None)
+    release.set()
+
+
+def test_finished_jobs_expire_after_ttl(manager, monkeypatch):
+    job = wait_status(manager, manager.submit(lambda job: "ok"), SUCCEEDED)
+    release = threading.Event()
+    running = manager.submit(lambda job: release.wait(2))
+    wait_status(manager, running, RUNNING)
+
+    later = time.time() + 61
+    monkeypatch.setattr("shared.job_manager.time.time", lambda: later)
+    assert manager.get(job.job_id) is None
+    # Só jobs concluídos expiram; o que está rodando continua consultável.
+    assert manager.get(running.job_id).status == RUNNING
+    assert manager.stats()["jobs"] == {RUNNING: 1}
+    release.set()
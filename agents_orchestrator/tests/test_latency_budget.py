@@ -0,0 +1,141 @@
+"""Hedge em respostas transmitidas: o cliente nunca recebe trechos de uma chamada e o texto de outra."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from shared.latency_budget import LatencyBudget, PrimaryStream, race
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def calls(pool, primary, hedge):
+    submitted = []
+
+    def submit(is_primary):
+        submitted.append("primary" if is_primary else "hedge")
+        return pool.submit(primary if is_primary else hedge)
+    return submit, submitted
+
+
+def test_hedge_wins_and_silences_primary_before_first_chunk(pool):
+    chunks = []
+    stream = PrimaryStream(chunks.append)
+    release = threading.Event()
+
+    def primary():
+        release.wait(2)
+        stream.forward("tarde")
+        return "principal"
+
+    submit, submitted = calls(pool, primary, lambda: "hedge")
+    outcome = race(submit, LatencyBudget(deadline_seconds=2), hedge_delay=0.05, stream=stream)
+    release.set()
+
+    assert (outcome.path, outcome.value) == ("hedge", "hedge")
+    assert submitted == ["primary", "hedge"]
+    outcome.pending[0].result(2)
+    assert chunks == []
+
+
+def test_no_hedge_once_primary_is_streaming(pool):
+    chunks = []
+    stream = PrimaryStream(chunks.append)
+    release = threading.Event()
+
+    def primary():
+        stream.forward("Olá")
+        release.wait(2)
+        return "principal"
+
+    submit, submitted = calls(pool, primary, lambda: "hedge")
+    threading.Timer(0.2, release.set).start()
+    outcome = race(submit, LatencyBudget(deadline_seconds=2), hedge_delay=0.05, stream=stream)
+
+    assert (outcome.path, outcome.value) == ("primary", "principal")
+    assert submitted == ["primary"]
+    assert chunks == ["Olá"]
+
+
+def test_primary_that_started_streaming_after_hedge_still_wins(pool):
+    chunks = []
+    stream = PrimaryStream(chunks.append)
+    hedge_started, streamed, release = threading.Event(), threading.Event(), threading.Event()
+
+    def primary():
+        hedge_started.wait(2)
+        stream.forward("Olá")
+        streamed.set()
+        release.wait(2)
+        return "principal"
+
+    def hedge():
+        hedge_started.set()
+        streamed.wait(2)
+        threading.Timer(0.1, release.set).start()
+        return "hedge"
+
+    submit, submitted = calls(pool, primary, hedge)
+    outcome = race(submit, LatencyBudget(deadline_seconds=2), hedge_delay=0.05, stream=stream)
+
+    assert submitted == ["primary", "hedge"]
+    assert (outcome.path, outcome.value) == ("primary", "principal")
+    assert chunks == ["Olá"]
+
+
+def ok(value):
+    return value != "erro"
+
+
+def test_hedge_that_fails_fast_does_not_beat_primary(pool):
+    def primary():
+        time.sleep(0.2)
+        return "principal"
+
+    submit, submitted = calls(pool, primary, lambda: "erro")
+    outcome = race(submit, LatencyBudget(deadline_seconds=2), hedge_delay=0.05, accept=ok)
+
+    assert submitted == ["primary", "hedge"]
+    assert (outcome.path, outcome.value) == ("primary", "principal")
+
+
+def test_hedge_that_raises_does_not_beat_primary(pool):
+    def primary():
+        time.sleep(0.2)
+        return "principal"
+
+    def hedge():
+        raise RuntimeError("falha")
+
+    submit, _ = calls(pool, primary, hedge)
+    outcome = race(submit, LatencyBudget(deadline_seconds=2), hedge_delay=0.05, accept=ok)
+    assert (outcome.path, outcome.value) == ("primary", "principal")
+
+
+def test_primary_failure_is_returned_when_every_call_fails(pool):
+    def primary():
+        time.sleep(0.2)
+        return "erro"
+
+    submit, _ = calls(pool, primary, lambda: "erro")
+    outcome = race(submit, LatencyBudget(deadline_seconds=2), hedge_delay=0.05, accept=ok)
+    assert (outcome.path, outcome.value, outcome.pending) == ("primary", "erro", [])
+
+
+def test_failed_hedge_then_slow_primary_hits_deadline(pool):
+    release = threading.Event()
+
+    def primary():
+        release.wait(2)
+        return "principal"
+
+    submit, _ = calls(pool, primary, lambda: "erro")
+    outcome = race(submit, LatencyBudget(deadline_seconds=0.3), hedge_delay=0.05, accept=ok)
+    release.set()
+    assert outcome.path == "deadline"
+    assert len(outcome.pending) == 1
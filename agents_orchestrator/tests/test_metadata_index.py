@@ -0,0 +1,60 @@
+"""Pré-filtro por metadados: bitsets por campo/valor combinados antes da busca."""
+import numpy as np
+
+from shared.metadata_index import MetadataIndex, bits_to_mask
+
+from tests.test_retriever import RECORDS, make_retriever  # noqa: F401 (fixture)
+
+
+def test_bits_to_mask():
+    assert bits_to_mask(0b1001, 4).tolist() == [True, False, False, True]
+    assert bits_to_mask(1 << 9, 10).tolist() == [False] * 9 + [True]
+    assert bits_to_mask(0, 0).tolist() == []
+
+
+def test_filters_or_within_field_and_across_fields():
+    index = MetadataIndex.from_records(RECORDS)
+    assert index.values("imposto") == ["cofins", "csll", "irpj", "pis"]
+
+    def ids(filters):
+        mask = index.mask(index.normalize_filters(filters))
+        return [RECORDS[row]["ID"] for row in np.flatnonzero(mask)]
+
+    assert ids({"imposto": "CSLL"}) == ["IRPJ-BRINDES", "IRPJ-ALUGUEL"]
+    assert ids({"IMPOSTO": ["csll", "PIS"]}) == ["IRPJ-BRINDES", "IRPJ-ALUGUEL", "PIS-INSUMOS"]
+    assert ids({"IMPOSTO": ["pis"], "TEMA": ["brindes"]}) == []
+    assert ids({"Imposto": "IRPJ", "tema": "Estimativa mensal"}) == ["IRPJ-ESTIMATIVA", "IRPJ-ESTIMATIVA-2024"]
+    assert index.count({"IMPOSTO": ["irpj"]}) == 4
+    assert index.mask({}) is None and index.count({}) == len(RECORDS)
+
+
+def test_normalize_filters_drops_unknown_fields_and_blanks():
+    assert MetadataIndex().normalize_filters({"imposto": ["IRPJ", " "], "cor": "azul", "regime": []}) == {
+        "IMPOSTO": ["irpj"]
+    }
+
+
+def test_detect_and_save_load_roundtrip(tmp_path):
+    index = MetadataIndex.from_records(RECORDS)
+    assert index.detect("Crédito de PIS no lucro real") == {"IMPOSTO": ["pis"], "REGIME": ["lucro real"]}
+    assert index.detect("tema Aluguel", ["tema"]) == {"TEMA": ["aluguel"]}
+
+    index.save(tmp_path / "metadata.json")
+    loaded = MetadataIndex.load(tmp_path / "metadata.json")
+    assert loaded.postings == index.postings
+    assert loaded.bitset({"IMPOSTO": ["csll"]}) == index.bitset({"IMPOSTO": ["csll"]}) == 0b11
+
+
+def test_retriever_applies_explicit_and_detected_filters(make_retriever):  # noqa: F811
+    retriever = make_retriever({"temporal": {"enabled": False},
+                                "metadata_filters": {"auto_detect": True}})
+
+    result = retriever.retrieve("irpj_csll", "dedutível", filters={"imposto": "PIS"})
+    assert (result.record_ids, result.filters) == (["PIS-INSUMOS"], {"IMPOSTO": ["pis"]})
+
+    detected = retriever.retrieve("irpj_csll", "qual a regra da CSLL?")
+    assert detected.filters == {"IMPOSTO": ["csll"]}
+    assert sorted(detected.record_ids) == ["IRPJ-ALUGUEL", "IRPJ-BRINDES"]
+
+    # Filtro detectado que deixaria menos de top_k registros é descartado.
+    assert retriever.retrieve("irpj_csll", "crédito de PIS", top_k=2).filters == {}
@@ -0,0 +1,52 @@
+"""Índice comprimido: treinado só pelo build, apenas carregado nas consultas."""
+import numpy as np
+import pytest
+
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.index_builder import IndexBuilder
+from shared.quantized_index import QuantizedIndex, default_params, quantized_file, recall_at_k
+from shared.retriever import KnowledgeRetriever
+from shared.vector_store import VectorStore
+
+from tests.test_index_builder import write_knowledge
+
+
+def test_query_time_never_trains(tmp_path):
+    knowledge = tmp_path / "knowledge"
+    knowledge.mkdir()
+    write_knowledge(knowledge / "base.txt", 40, 1)
+    IndexBuilder(HashedNgramEmbedder(dim=64)).build("agente", knowledge, tmp_path / "index")
+
+    store = VectorStore.load(tmp_path / "index")
+    KnowledgeRetriever._attach_quantized("agente", store, {"index_type": "ivf_int8"})
+    assert store.quantized is None
+    assert not (store.path / quantized_file("ivf_int8")).exists()
+
+    QuantizedIndex.load_or_train(store.path, store.vectors, "ivf_int8", store.manifest["built_at"], nlist=4)
+    KnowledgeRetriever._attach_quantized("agente", store, {"index_type": "ivf_int8"})
+    assert store.quantized is not None and store.quantized.nlist == 4
+
+
+def clustered(num_vectors, dim, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=num_vectors)] + 0.3 * rng.standard_normal((num_vectors, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_default_params_are_sized_to_the_corpus():
+    assert default_params(987, 1024, "ivf_pq") == {"nlist": 25, "pq_m": 128, "ksub": 16}
+    assert default_params(100_000, 256, "ivf_pq") == {"nlist": 316, "pq_m": 32, "ksub": 256}
+    assert default_params(20, 64, "ivf_int8") == {"nlist": 1}
+
+
+@pytest.mark.parametrize("index_type, min_ratio", [("ivf_int8", 3.4), ("ivf_pq", 10)])
+def test_default_params_compress_the_corpus(index_type, min_ratio):
+    vectors = clustered(1000, 256)
+    index = QuantizedIndex.train(vectors, index_type)
+    assert vectors.nbytes / index.nbytes >= min_ratio
+
+    queries = vectors[:50] + 0.05
+    exact = [np.argsort(-(vectors @ query))[:10] for query in queries]
+    approximate = [index.search(query, vectors, 10)[0] for query in queries]
+    assert recall_at_k(exact, approximate) >= 0.9
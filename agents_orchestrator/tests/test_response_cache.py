@@ -0,0 +1,198 @@
+"""Cache de respostas: backends (memória, SQLite, Redis via servidor RESP falso) e versão do template."""
+import socketserver
+import threading
+import time
+
+import pytest
+
+from shared.response_cache import MemoryBackend, RedisBackend, ResponseCache, SQLiteBackend, TemplateVersion
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """Servidor RESP2 mínimo: AUTH, SELECT, GET, SET [PX|EX], SETEX, DEL, SCAN."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, password=None):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.drop_next = False
+
+    def alive(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.time():
+            del self.data[key]
+            return None
+        return item
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        authenticated = server.password is None
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            if server.drop_next:
+                server.drop_next = False
+                return
+            name = args[0].upper()
+            server.commands.append(name)
+            if name == "AUTH":
+                authenticated = args[1] == server.password
+                self.reply("+OK" if authenticated else "-WRONGPASS invalid password")
+            elif not authenticated:
+                self.reply("-NOAUTH Authentication required")
+            elif name == "SELECT":
+                self.reply("+OK")
+            elif name == "GET":
+                item = server.alive(args[1])
+                self.bulk(None if item is None else item[0])
+            elif name in ("SET", "SETEX"):
+                if name == "SETEX":
+                    key, ttl, value = args[1], float(args[2]), args[3]
+                else:
+                    key, value, options = args[1], args[2], [arg.upper() for arg in args[3:]]
+                    ttl = None
+                    if "PX" in options:
+                        ttl = float(args[3 + options.index("PX") + 1]) / 1000
+                    elif "EX" in options:
+                        ttl = float(args[3 + options.index("EX") + 1])
+                server.data[key] = (value, None if ttl is None else time.time() + ttl)
+                self.reply("+OK")
+            elif name == "DEL":
+                removed = sum(server.data.pop(key, None) is not None for key in args[1:])
+                self.reply(f":{removed}")
+            elif name == "SCAN":
+                prefix = args[args.index("MATCH") + 1].rstrip("*")
+                keys = [key for key in list(server.data) if key.startswith(prefix) and server.alive(key)]
+                self.wfile.write(b"*2\r\n$1\r\n0\r\n" + f"*{len(keys)}\r\n".encode())
+                for key in keys:
+                    self.bulk(key)
+            else:
+                self.reply(f"-ERR unknown command '{name}'")
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line.startswith(b"*")
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+
+    def reply(self, line):
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+
+    def bulk(self, value):
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        else:
+            data = value.encode("utf-8")
+            self.wfile.write(f"${len(data)}\r\n".encode() + data + b"\r\n")
+
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedis(password="segredo")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def redis_backend(redis_server):
+    backend = RedisBackend(port=redis_server.server_address[1], db=1, password="segredo", prefix="t:")
+    yield backend
+    backend._close()
+
+
+def test_redis_get_set_and_expiry(redis_server, redis_backend):
+    assert redis_backend.get("k") is None
+    redis_backend.set("k", "alíquota de 9%", ttl_seconds=0.2)
+    assert redis_backend.get("k") == "alíquota de 9%"
+    assert redis_server.commands[:2] == ["AUTH", "SELECT"]
+    assert "t:k" in redis_server.data
+
+    time.sleep(0.3)
+    assert redis_backend.get("k") is None
+
+
+def test_redis_clear_only_removes_prefixed_keys(redis_server, redis_backend):
+    redis_server.data["outro:x"] = ("1", None)
+    for key in ("a", "b", "c"):
+        redis_backend.set(key, key, ttl_seconds=60)
+    redis_backend.clear()
+    assert list(redis_server.data) == ["outro:x"]
+
+
+def test_redis_reconnects_after_dropped_connection(redis_server, redis_backend):
+    redis_backend.set("k", "v", ttl_seconds=60)
+    redis_server.drop_next = True
+    assert redis_backend.get("k") == "v"
+    assert redis_server.commands.count("AUTH") == 2
+
+
+def test_response_cache_survives_unavailable_redis(tmp_path):
+    cache = ResponseCache(RedisBackend(port=1, timeout=0.2), TemplateVersion(tmp_path))
+    key = cache.key("irpj_csll", "padrao", "alíquota da CSLL")
+    cache.set(key, {"reply": "9%"})
+    assert cache.get(key) is None
+    assert cache.errors == 2
+
+
+def test_template_change_invalidates_cached_answers(tmp_path):
+    agent_dir = tmp_path / "irpj_csll"
+    agent_dir.mkdir()
+    (agent_dir / "tasks.yaml").write_text("consulta_padrao:\n  description: v1\n", encoding="utf-8")
+    cache = ResponseCache(MemoryBackend(), TemplateVersion(tmp_path), ttl_seconds=60)
+
+    key = cache.key("irpj_csll", "padrao", "Alíquota da CSLL?")
+    cache.set(key, {"reply": "9%"})
+    assert cache.key("irpj_csll", "padrao", "aliquota da csll") == key
+    assert cache.get(key) == {"reply": "9%"}
+
+    (agent_dir / "tasks.yaml").write_text("consulta_padrao:\n  description: versão 2\n", encoding="utf-8")
+    new_key = cache.key("irpj_csll", "padrao", "Alíquota da CSLL?")
+    assert new_key != key
+    assert cache.get(new_key) is None
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_backend(request, tmp_path):
+    def make(max_entries):
+        if request.param == "memory":
+            return MemoryBackend(max_entries)
+        return SQLiteBackend(tmp_path / "responses.sqlite", max_entries)
+    return make
+
+
+def test_backend_ttl_expiry(make_backend):
+    backend = make_backend(10)
+    backend.set("curto", "x", ttl_seconds=0.05)
+    backend.set("longo", "y", ttl_seconds=60)
+    time.sleep(0.1)
+    assert backend.get("curto") is None
+    assert backend.get("longo") == "y"
+
+
+def test_backend_lru_eviction(make_backend):
+    backend = make_backend(2)
+    backend.set("a", "1", ttl_seconds=60)
+    time.sleep(0.01)
+    backend.set("b", "2", ttl_seconds=60)
+    time.sleep(0.01)
+    assert backend.get("a") == "1"  # "a" passa a ser o mais recente
+    time.sleep(0.01)
+    backend.set("c", "3", ttl_seconds=60)
+
+    assert backend.get("b") is None
+    assert (backend.get("a"), backend.get("c")) == ("1", "3")
+    assert backend.stats()["size"] == 2
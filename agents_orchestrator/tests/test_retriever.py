@@ -0,0 +1,94 @@
+"""Recuperação antes do kickoff: contexto, registros e carregamento do índice."""
+from pathlib import Path
+
+import pytest
+
+from shared.retriever import KnowledgeRetriever
+
+RECORDS = [
+    {"ID": "IRPJ-BRINDES", "TEMA": "Brindes", "IMPOSTO": "IRPJ / CSLL", "REGIME": "Lucro Real",
+     "DESCRICAO DETALHADA": "Despesas com brindes são indedutíveis na apuração do lucro real."},
+    {"ID": "IRPJ-ALUGUEL", "TEMA": "Aluguel", "IMPOSTO": "IRPJ / CSLL", "REGIME": "Lucro Real",
+     "DESCRICAO DETALHADA": "Aluguel de imóvel usado na atividade é dedutível."},
+    {"ID": "PIS-INSUMOS", "TEMA": "Insumos", "IMPOSTO": "PIS / COFINS", "REGIME": "Lucro Real",
+     "DESCRICAO DETALHADA": "Créditos de PIS e COFINS sobre insumos no regime não cumulativo."},
+    {"ID": "IRPJ-ESTIMATIVA", "TEMA": "Estimativa mensal", "IMPOSTO": "IRPJ", "REGIME": "Lucro Real",
+     "VERSAO LEGAL": "Regime antigo (pré-2024)",
+     "DESCRICAO DETALHADA": "Estimativa mensal do IRPJ com base na receita bruta."},
+    {"ID": "IRPJ-ESTIMATIVA-2024", "TEMA": "Estimativa mensal", "IMPOSTO": "IRPJ", "REGIME": "Lucro Real",
+     "VERSAO LEGAL": "A partir de 2024",
+     "DESCRICAO DETALHADA": "Estimativa mensal do IRPJ com base na receita bruta e ajustes."},
+]
+
+
+def write_records(path: Path, records) -> None:
+    lines = []
+    for record in records:
+        lines += [f"[{key}]: {value}" for key, value in record.items()] + ["---"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class Registry:
+    """Registro mínimo: conhecimento em <base>/<agente>/knowledge, sem índice gerado."""
+
+    def __init__(self, base_dir, rag_configs, global_config=None, categories=None):
+        self.base_dir = Path(base_dir)
+        self.global_config = {"enable_rag": True, **(global_config or {})}
+        self.rag_configs = rag_configs
+        self.categories = categories or {}
+
+    def get_agent_config(self, agent_id):
+        return {"rag_config": self.rag_configs.get(agent_id, {})}
+
+    def get_agent_category(self, agent_id):
+        return self.categories.get(agent_id, "geral")
+
+    def get_agent_knowledge_path(self, agent_id):
+        return self.base_dir / agent_id / "knowledge"
+
+    def get_agent_vectorstore_path(self, agent_id):
+        return self.base_dir / "indices" / agent_id
+
+
+@pytest.fixture
+def make_retriever(tmp_path):
+    def make(rag_config=None, records=RECORDS, **kwargs):
+        knowledge = tmp_path / "irpj_csll" / "knowledge"
+        knowledge.mkdir(parents=True, exist_ok=True)
+        write_records(knowledge / "base.txt", records)
+        config = {"enabled": True, "top_k": 2, **(rag_config or {})}
+        return KnowledgeRetriever(Registry(tmp_path, {"irpj_csll": config}, **kwargs))
+    return make
+
+
+def test_retrieval_is_gated_by_global_and_agent_flags(make_retriever):
+    assert make_retriever().is_enabled("irpj_csll")
+    assert not make_retriever(global_config={"enable_rag": False}).is_enabled("irpj_csll")
+    assert not make_retriever({"enabled": False}).is_enabled("irpj_csll")
+    assert not make_retriever().is_enabled("sem_config")
+
+
+def test_retrieve_returns_best_records_as_context(make_retriever):
+    retriever = make_retriever()
+    result = retriever.retrieve("irpj_csll", "brindes são dedutíveis?")
+
+    assert result.record_ids[0] == "IRPJ-BRINDES"
+    assert len(result.record_ids) == len(result.scores) == 2
+    assert result.scores == sorted(result.scores, reverse=True)
+    assert result.context.startswith("[IRPJ-BRINDES]\nTema: Brindes\nDescrição: Despesas com brindes")
+
+
+def test_context_is_capped_by_max_context_chars(make_retriever):
+    result = make_retriever({"top_k": 4, "max_context_chars": 60}).retrieve("irpj_csll", "lucro real")
+    # O primeiro bloco sempre entra (cortado); os seguintes só se couberem.
+    assert len(result.context) == 60
+    assert "\n\n" not in result.context
+
+
+def test_store_is_opened_once_and_only_when_needed(make_retriever):
+    retriever = make_retriever()
+    assert retriever.loaded_agents() == []
+    store = retriever.get_store("irpj_csll")
+    assert retriever.get_store("irpj_csll") is store
+    assert retriever.loaded_agents() == ["irpj_csll"]
+    assert retriever.retrieve("sem_conhecimento", "brindes").record_ids == []
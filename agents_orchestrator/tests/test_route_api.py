@@ -0,0 +1,47 @@
+"""/api/route: corpo inválido é 400, consulta válida devolve o ranking."""
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("crewai")
+
+
+@pytest.fixture(scope="module")
+def client():
+    import os
+    os.environ.setdefault("GOOGLE_API_KEY", "test")
+    import orchestrator
+    return orchestrator.app.test_client()
+
+
+def test_routes_query(client):
+    response = client.post("/api/route", json={"query": "Dedutibilidade de despesas no lucro real"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["primary_agent"] == "irpj_csll"
+    assert 0 <= data["confidence"] <= 1
+    assert len(data["suggestions"]) <= 3
+
+
+@pytest.mark.parametrize("body", [{"query": 5}, {"query": None}, {"query": "   "}, {}, [1], "texto"])
+def test_invalid_body_is_400(client, body):
+    response = client.post("/api/route", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_non_json_body_is_400(client):
+    assert client.post("/api/route", data="query=x").status_code == 400
+
+
+def test_batch_routes_every_query(client):
+    queries = ["Dedutibilidade de brindes no IRPJ", "alíquota da CSLL", "alíquota da CSLL?"]
+    response = client.post("/api/route/batch", json={"queries": queries})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 3
+    assert [result["index"] for result in data["results"]] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("body", [[1], "texto", {"queries": []}, {"queries": ["ok", 5]}, {"queries": "x"}])
+def test_invalid_batch_is_400(client, body):
+    assert client.post("/api/route/batch", json=body).status_code == 400
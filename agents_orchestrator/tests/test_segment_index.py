@@ -0,0 +1,116 @@
+"""Merge de segmentos: mesmo resultado de busca antes e depois."""
+import numpy as np
+import pytest
+
+from shared.segment_index import SegmentedIndex
+
+WORDS = ["irpj", "csll", "brindes", "dedutibilidade", "lucro", "real", "presumido", "carf",
+         "acórdão", "multa", "juros", "glosa", "despesa", "receita", "pis", "cofins"]
+QUERIES = ["brindes dedutibilidade", "lucro real glosa", "multa juros carf", "pis cofins receita", "irpj"]
+
+
+def documents(count, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        words = rng.choice(WORDS, size=int(rng.integers(3, 30)))
+        yield {"ID": f"DOC-{i:05d}", "EMENTA": " ".join(words)}
+
+
+@pytest.mark.parametrize("block", [1, 7, 1_000_000])
+def test_merge_preserves_search_results(tmp_path, block):
+    index = SegmentedIndex(tmp_path / "segments", max_segments=2, merge_factor=4, merge_block_postings=block)
+    docs = list(documents(300))
+    for start in range(0, len(docs), 30):
+        index.append(docs[start:start + 30])
+    assert len(index.segments) == 10
+
+    # top_k = corpus inteiro: empates no corte do top-k não mudam o conjunto comparado.
+    before = {query: dict(index.search(query, len(docs))) for query in QUERIES}
+    while index.merge_once():
+        pass
+    assert len(index.segments) <= 2
+
+    for query in QUERIES:
+        after = dict(index.search(query, len(docs)))
+        assert after.keys() == before[query].keys()
+        assert np.allclose([after[doc] for doc in after], [before[query][doc] for doc in after])
+
+    assert [index.records[i]["ID"] for i in range(len(docs))] == [doc["ID"] for doc in docs]
+    for segment in index.segments:
+        assert np.all(np.diff(np.asarray(segment.terms).astype(np.float64)) > 0)
+        assert np.all(np.diff(np.asarray(segment.ids).astype(np.float64)) > 0)
+        for position in range(len(segment.terms)):
+            docs_of_term = np.asarray(segment.doc_ids[segment.offsets[position]:segment.offsets[position + 1]])
+            assert np.all(np.diff(docs_of_term) > 0)
+
+    # Reabrir do disco e reindexar os mesmos [ID]s não duplica nada.
+    reopened = SegmentedIndex(tmp_path / "segments")
+    assert reopened.append(docs[:50]) == 0
+    assert reopened.stats()["documents"] == len(docs)
+
+
+class Registry:
+    def __init__(self, base_dir, rag_configs):
+        self.base_dir = base_dir
+        self.global_config = {"enable_rag": True}
+        self.rag_configs = rag_configs
+
+    def get_agent_config(self, agent_id):
+        return {"rag_config": self.rag_configs[agent_id]}
+
+
+def test_append_documents_requires_segments_backend(tmp_path):
+    from shared.retriever import KnowledgeRetriever
+
+    retriever = KnowledgeRetriever(Registry(tmp_path, {
+        "irpj": {"enabled": True},
+        "carf": {"enabled": True, "backend": "segments"},
+    }))
+    with pytest.raises(ValueError):
+        retriever.append_documents("irpj", documents(5))
+    assert "irpj" not in retriever.loaded_agents()
+
+    assert retriever.append_documents("carf", documents(5)) == 5
+    assert retriever.append_documents("carf", documents(8)) == 3
+    assert len(retriever.get_store("carf")) == 8
+    retriever.get_store("carf").stop_merger()
+
+
+@pytest.fixture
+def carf(tmp_path):
+    from shared.retriever import KnowledgeRetriever
+
+    retriever = KnowledgeRetriever(Registry(tmp_path, {"carf": {"enabled": True, "backend": "segments", "top_k": 5}}))
+    retriever.append_documents("carf", [
+        {"ID": "ac-irpj-2019", "IMPOSTO": "IRPJ", "VERSAO LEGAL": "Regime antigo (pré-2020)",
+         "EMENTA": "glosa de despesas com brindes"},
+        {"ID": "ac-irpj-2021", "IMPOSTO": "IRPJ", "VERSAO LEGAL": "A partir de 2020",
+         "EMENTA": "glosa de despesas com brindes"},
+        {"ID": "ac-pis", "IMPOSTO": "PIS / COFINS", "EMENTA": "glosa de créditos sobre brindes"},
+        {"EMENTA": "decisão sem identificador sobre glosa de brindes"},
+    ])
+    yield retriever
+    retriever.get_store("carf").stop_merger()
+
+
+def test_segment_records_without_id_use_document_id(carf):
+    result = carf.retrieve("carf", "glosa brindes")
+    assert len(result.record_ids) == 4
+    assert "3" in result.record_ids
+    assert "[3]" in result.context
+
+
+def test_segment_search_applies_filters(carf):
+    result = carf.retrieve("carf", "glosa brindes", filters={"imposto": "IRPJ"})
+    assert sorted(result.record_ids) == ["ac-irpj-2019", "ac-irpj-2021"]
+    assert result.filters == {"IMPOSTO": ["irpj"]}
+
+
+def test_segment_search_applies_reference_date(carf):
+    result = carf.retrieve("carf", "glosa brindes", reference_date="2019")
+    assert "ac-irpj-2021" not in result.record_ids
+    assert "ac-irpj-2019" in result.record_ids
+    assert result.reference_date == "2019"
+
+    later = carf.retrieve("carf", "glosa brindes", filters={"IMPOSTO": ["irpj"]}, reference_date="2023-05")
+    assert later.record_ids == ["ac-irpj-2021"]
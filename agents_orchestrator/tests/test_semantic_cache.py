@@ -0,0 +1,64 @@
+"""Cache semântico: paráfrases casam; anos, números e negações diferentes não."""
+import pytest
+
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.retriever import KnowledgeRetriever
+from shared.semantic_cache import SemanticCache, canonical_query
+
+SYNONYMS = {"percentual": "alíquota", "porcentagem": "alíquota"}
+THRESHOLD = 0.93
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(HashedNgramEmbedder(), max_entries=50)
+
+
+def answer(cache, namespace, asked, stored, threshold=THRESHOLD):
+    cache.add(namespace, canonical_query(stored, SYNONYMS), {"reply": stored})
+    match = cache.lookup(namespace, canonical_query(asked, SYNONYMS), threshold)
+    return None if match is None else match[0]["reply"]
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("alíquota da CSLL no ano-calendário 2023?", "alíquota da CSLL no ano-calendário 2024?"),
+    ("Brindes são dedutíveis?", "Brindes não são dedutíveis?"),
+    ("Limite de 30% do lucro real", "Limite de 40% do lucro real"),
+])
+def test_different_numbers_or_negation_never_match(cache, stored, asked):
+    # Nem com o limiar antigo (0.88) a assinatura deixa casar.
+    assert answer(cache, ("irpj_csll", "padrao"), asked, stored, threshold=0.88) is None
+
+
+def test_threshold_alone_separates_negation():
+    embedder = HashedNgramEmbedder()
+    a, b = (embedder.embed_one(canonical_query(q, SYNONYMS))
+            for q in ("Brindes são dedutíveis?", "Brindes não são dedutíveis?"))
+    assert float(a @ b) < THRESHOLD
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("alíquota da CSLL", "qual o percentual da CSLL"),
+    ("Quais despesas com veículos são dedutíveis no lucro real?",
+     "Despesas com veiculos sao dedutiveis no lucro real"),
+])
+def test_paraphrases_match(cache, stored, asked):
+    assert answer(cache, ("irpj_csll", "padrao"), asked, stored) == stored
+
+
+def test_year_in_question_goes_into_namespace(tmp_path):
+    class Registry:
+        base_dir = tmp_path
+        global_config = {}
+
+        def get_agent_config(self, agent_id):
+            return {}
+
+    retriever = KnowledgeRetriever(Registry())
+    scopes = [
+        retriever.cache_scope("irpj_csll", f"alíquota da CSLL no ano-calendário {year}?")
+        for year in (2023, 2024)
+    ]
+    assert [scope["reference_date"] for scope in scopes] == ["2023", "2024"]
+    assert SemanticCache.namespace("irpj_csll", "padrao", **scopes[0]) != \
+        SemanticCache.namespace("irpj_csll", "padrao", **scopes[1])
@@ -0,0 +1,77 @@
+"""Roteamento semântico: centróides TF-IDF por agente e pontuação em lote."""
+import numpy as np
+import pytest
+
+from agent_router import AgentRouter
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.semantic_index import SemanticIndex
+
+AGENTS = {
+    "irpj_csll": {"description": ["Imposto de renda e contribuição social das empresas"],
+                  "keywords": ["irpj", "csll", "lucro real", "lucro presumido"],
+                  "knowledge": ["Dedutibilidade de despesas com brindes", "Adicional de 10% do IRPJ"]},
+    "pis_cofins": {"description": ["Contribuições sobre a receita"],
+                   "keywords": ["pis", "cofins", "não cumulativo"],
+                   "knowledge": ["Créditos de insumos no regime não cumulativo"]},
+    "icms_sp": {"description": ["ICMS do estado de São Paulo"],
+                "keywords": ["icms", "substituição tributária", "difal"],
+                "knowledge": ["Substituição tributária nas operações interestaduais"]},
+}
+
+
+@pytest.fixture
+def index():
+    index = SemanticIndex(HashedNgramEmbedder(dim=512))
+    for agent_id, sources in AGENTS.items():
+        index.add_agent(agent_id, sources)
+    return index.build()
+
+
+@pytest.mark.parametrize("query, agent_id", [
+    ("despesas com brindes são dedutíveis no lucro real?", "irpj_csll"),
+    ("crédito de insumos no regime não cumulativo", "pis_cofins"),
+    ("substituição tributária interestadual", "icms_sp"),
+    ("Dedutibilidade de brindes", "irpj_csll"),
+])
+def test_rank_picks_the_closest_centroid(index, query, agent_id):
+    ranking = index.rank(query)
+    assert ranking[0][0] == agent_id
+    assert len(ranking) == len(AGENTS) and all(0.0 <= score <= 1.0 for _, score in ranking)
+
+
+def test_batch_scores_equal_single_scores(index):
+    queries = ["icms difal", "adicional do irpj", "cofins", "sem relação alguma"]
+    matrix = index.score_matrix(queries)
+    assert matrix.shape == (len(queries), len(AGENTS))
+    for row, query in enumerate(queries):
+        single = dict(index.rank(query))
+        np.testing.assert_allclose([single[agent] for agent in index.agent_ids], matrix[row], atol=1e-6)
+    assert index.rank_batch([]) == []
+
+
+def test_centroids_are_unit_vectors_and_source_weights_apply(index):
+    only_keywords = SemanticIndex(HashedNgramEmbedder(dim=512), {"description": 0, "knowledge": 0})
+    for agent_id, sources in AGENTS.items():
+        only_keywords.add_agent(agent_id, sources)
+    only_keywords.build()
+    np.testing.assert_allclose(np.linalg.norm(only_keywords.centroids, axis=1), 1.0, atol=1e-5)
+    # Sem o conhecimento, "brindes" quase não aproxima a consulta de irpj_csll.
+    assert dict(only_keywords.rank("brindes"))["irpj_csll"] < dict(index.rank("brindes"))["irpj_csll"] / 2
+
+    empty = SemanticIndex(HashedNgramEmbedder(dim=64)).build()
+    assert empty.centroids.shape == (0, 64)
+
+
+def test_router_uses_semantic_scores(index):
+    class Registry:
+        routing_config = {"mode": "semantic", "semantic": {"min_score": 0.05}}
+        semantic_index = index
+
+        def get_all_agent_ids(self):
+            return list(AGENTS)
+
+    router = AgentRouter(Registry())
+    results = router.route_batch(["crédito de cofins sobre insumos", "ICMS ST em São Paulo"])
+    assert [result.primary_agent for result in results] == ["pis_cofins", "icms_sp"]
+    assert router.route("crédito de cofins sobre insumos").primary_agent == "pis_cofins"
+    assert router.get_cache_stats()["hits"] == 1
@@ -0,0 +1,71 @@
+"""Single-flight: chamadas idênticas em andamento executam uma vez só."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from shared.single_flight import SingleFlight
+
+WAITERS = 8
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=WAITERS) as executor:
+        yield executor
+
+
+def run_concurrently(pool, flight, key, fn):
+    """Dispara ``WAITERS`` chamadas com a mesma chave enquanto ``fn`` está bloqueada."""
+    futures = [pool.submit(flight.do, key, fn) for _ in range(WAITERS)]
+    while flight.coalesced < WAITERS - 1:
+        time.sleep(0.005)
+    return futures
+
+
+def test_identical_calls_are_coalesced(pool):
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def crew():
+        calls.append(1)
+        release.wait(2)
+        return {"reply": "9%"}
+
+    futures = run_concurrently(pool, flight, ("irpj_csll", "padrao", "aliquota csll"), crew)
+    assert flight.stats() == {"executions": 1, "coalesced": WAITERS - 1, "in_flight": 1}
+    release.set()
+
+    results = [future.result(2) for future in futures]
+    assert len(calls) == 1
+    assert all(result is results[0][0] for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * (WAITERS - 1)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_exception_reaches_every_waiter_and_key_is_released(pool):
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(2)
+        raise TimeoutError("LLM indisponível")
+
+    futures = run_concurrently(pool, flight, "k", failing)
+    release.set()
+    for future in futures:
+        with pytest.raises(TimeoutError, match="LLM indisponível"):
+            future.result(2)
+
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+    assert flight.executions == 2
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.do("a", lambda: 3) == (3, False)
+    assert flight.stats() == {"executions": 3, "coalesced": 0, "in_flight": 0}
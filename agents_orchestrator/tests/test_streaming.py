@@ -0,0 +1,80 @@
+"""Repasse dos trechos do LLM: chega à requisição certa mesmo vindo de outra thread."""
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from shared import streaming
+
+
+class EventBus:
+    def __init__(self):
+        self.handlers = []
+
+    def on(self, event_type):
+        def register(handler):
+            self.handlers.append(handler)
+            return handler
+        return register
+
+    def emit_from_worker(self, event):
+        # Como o barramento do CrewAI que roda handlers síncronos num pool próprio.
+        worker = threading.Thread(target=lambda: [handler(None, event) for handler in self.handlers])
+        worker.start()
+        worker.join()
+
+
+class Crew:
+    def __init__(self, bus, chunks, task_id=None):
+        self.bus = bus
+        self.chunks = chunks
+        self.tasks = [SimpleNamespace(id=task_id or uuid.uuid4())]
+
+    def kickoff(self):
+        for chunk in self.chunks:
+            self.bus.emit_from_worker(SimpleNamespace(chunk=chunk, task_id=str(self.tasks[0].id)))
+        return "".join(self.chunks)
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = EventBus()
+    monkeypatch.setattr(streaming, "crewai_event_bus", bus)
+    monkeypatch.setattr(streaming, "LLMStreamChunkEvent", object)
+    monkeypatch.setattr(streaming, "_registered", False)
+    monkeypatch.setattr(streaming, "_sinks", {})
+    return bus
+
+
+def test_chunks_from_bus_worker_thread_reach_the_request(bus):
+    received = []
+    result = streaming.kickoff(Crew(bus, ["A alíquota ", "é 9%"]), received.append)
+    assert result == "A alíquota é 9%"
+    assert received == ["A alíquota ", "é 9%"]
+    assert streaming._sinks == {}
+
+
+def test_concurrent_requests_get_only_their_chunks(bus):
+    received = {"a": [], "b": []}
+    crews = {"a": Crew(bus, ["a1", "a2", "a3"]), "b": Crew(bus, ["b1", "b2"])}
+    threads = [threading.Thread(target=streaming.kickoff, args=(crews[name], received[name].append))
+               for name in crews]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert received == {"a": ["a1", "a2", "a3"], "b": ["b1", "b2"]}
+
+
+def test_events_without_task_fall_back_to_the_kickoff_thread(bus):
+    received = []
+
+    class LegacyCrew(Crew):
+        def kickoff(self):
+            for handler in self.bus.handlers:
+                handler(None, SimpleNamespace(chunk="trecho"))
+            return "trecho"
+
+    streaming.kickoff(LegacyCrew(bus, []), received.append)
+    assert received == ["trecho"]
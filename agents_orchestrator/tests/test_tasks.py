@@ -0,0 +1,25 @@
+"""Todo task_type do TASK_MAP tem task própria no tasks.yaml de cada agente."""
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("crewai")
+
+
+@pytest.fixture(scope="module")
+def orchestrator():
+    import os
+    os.environ.setdefault("GOOGLE_API_KEY", "test")
+    import orchestrator
+    return orchestrator
+
+
+def test_every_task_type_has_a_task(orchestrator):
+    assert orchestrator.check_task_map() == {}
+
+
+@pytest.mark.parametrize("task_type", ["padrao", "simples", "rapida", "edape"])
+def test_tasks_receive_retrieved_context(orchestrator, task_type):
+    for agent_id in orchestrator.registry.get_all_agent_ids():
+        task = orchestrator.load_agent_tasks(agent_id)[orchestrator.TASK_MAP[task_type]]
+        description = task["description"].format(query="Q", retrieved_context="<trechos>", additional_context="")
+        assert "<trechos>" in description
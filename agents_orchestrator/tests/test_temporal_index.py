@@ -0,0 +1,77 @@
+"""Vigência dos registros: intervalos de [VERSÃO LEGAL] e poda por data de referência."""
+from datetime import date
+
+import pytest
+
+from shared.temporal_index import OPEN_END, OPEN_START, TemporalIndex, detect_reference, parse_date, parse_validity
+
+from tests.test_retriever import make_retriever  # noqa: F401 (fixture)
+
+
+def day(value):
+    return date.fromisoformat(value).toordinal()
+
+
+@pytest.mark.parametrize("legal_version, record_date, expected", [
+    ("Regime antigo (pré-2024)", "", (OPEN_START, day("2024-01-01"))),
+    ("A partir de 2024", "", (day("2024-01-01"), OPEN_END)),
+    ("Vigente até 2023", "", (OPEN_START, day("2024-01-01"))),
+    ("Revogado em 2022-07-01", "", (OPEN_START, day("2022-07-01"))),
+    ("De 2019 a 2021-06", "", (day("2019-01-01"), day("2021-07-01"))),
+    ("Vigente desde a publicação", "15/03/2020", (day("2020-03-15"), OPEN_END)),
+    ("Vigente em 2025-10-23", "", (OPEN_START, OPEN_END)),
+    ("N/A", "", (OPEN_START, OPEN_END)),
+])
+def test_parse_validity(legal_version, record_date, expected):
+    assert parse_validity(legal_version, record_date) == expected
+
+
+def test_parse_date_and_reference_detection():
+    assert parse_date("2024-02") == (day("2024-02-01"), day("2024-03-01"))
+    assert parse_date("2024-12") == (day("2024-12-01"), day("2025-01-01"))
+    with pytest.raises(ValueError):
+        parse_date("fev/2024")
+    assert detect_reference("IRPJ do ano-calendário 2023") == "2023"
+    assert detect_reference("exercício de 2021") == "2021"
+    assert detect_reference("lucro de 2023") is None
+
+
+def test_mask_keeps_records_valid_at_reference():
+    index = TemporalIndex.from_records([
+        {"VERSAO LEGAL": "Regime antigo (pré-2024)"},
+        {"VERSAO LEGAL": "A partir de 2024"},
+        {"VERSAO LEGAL": "De 2019 a 2021"},
+        {},
+    ])
+    assert index.mask("2018").tolist() == [True, False, False, True]
+    assert index.mask("2020-05-10").tolist() == [True, False, True, True]
+    assert index.mask("2025").tolist() == [False, True, False, True]
+    # Um período pega tudo o que valeu em algum momento dele.
+    assert index.mask("2023-12").tolist() == [True, False, False, True]
+    assert index.mask(None) is None
+
+
+def test_unbounded_index_skips_filtering(tmp_path):
+    index = TemporalIndex.from_records([{}, {"VERSAO LEGAL": "Vigente em 2025"}])
+    assert not index.is_bounded and index.mask("2020") is None
+
+    bounded = TemporalIndex.from_records([{"VERSAO LEGAL": "A partir de 2024"}, {}])
+    bounded.save(tmp_path / "temporal.json")
+    assert TemporalIndex.load(tmp_path / "temporal.json").mask("2023").tolist() == [False, True]
+
+
+def test_retriever_prunes_by_reference_date(make_retriever):  # noqa: F811
+    retriever = make_retriever({"top_k": 5, "temporal": {"enabled": True, "default_to_today": False}})
+
+    def ids(query, **kwargs):
+        result = retriever.retrieve("irpj_csll", query, **kwargs)
+        return [record_id for record_id in result.record_ids if record_id.startswith("IRPJ-ESTIMATIVA")], result
+
+    explicit, result = ids("estimativa mensal do IRPJ", reference_date="2022")
+    assert (explicit, result.reference_date) == (["IRPJ-ESTIMATIVA"], "2022")
+
+    detected, result = ids("estimativa mensal do IRPJ no ano-calendário 2025")
+    assert (detected, result.reference_date) == (["IRPJ-ESTIMATIVA-2024"], "2025")
+
+    undated, result = ids("estimativa mensal do IRPJ")
+    assert result.reference_date is None and len(undated) == 2
@@ -0,0 +1,65 @@
+"""Índice único com partição por agente: a busca fica restrita às partições pedidas."""
+import numpy as np
+import pytest
+
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.index_builder import IndexBuilder
+from shared.retriever import KnowledgeRetriever
+from shared.vector_store import UNIFIED_INDEX, VectorStore
+
+from tests.test_retriever import Registry, write_records
+
+KNOWLEDGE = {
+    "irpj_csll": [{"ID": "IRPJ-1", "TEMA": "Multa de ofício", "DESCRICAO DETALHADA": "Multa de ofício no IRPJ."}],
+    "pis_cofins": [{"ID": "PIS-1", "TEMA": "Multa de ofício", "DESCRICAO DETALHADA": "Multa de ofício no PIS."}],
+    "doutrina_geral": [{"ID": "DOU-1", "TEMA": "Multa de ofício", "DESCRICAO DETALHADA": "Doutrina sobre multa."}],
+}
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    sources = {}
+    for agent_id, records in KNOWLEDGE.items():
+        knowledge = tmp_path / agent_id / "knowledge"
+        knowledge.mkdir(parents=True)
+        write_records(knowledge / "base.txt", records)
+        sources[agent_id] = knowledge
+    IndexBuilder(HashedNgramEmbedder(dim=64)).build_partitioned(sources, tmp_path / "indices" / UNIFIED_INDEX)
+
+    registry = Registry(
+        tmp_path, {agent_id: {"enabled": True, "top_k": 3} for agent_id in KNOWLEDGE},
+        global_config={"unified_index": {"enabled": True, "path": f"indices/{UNIFIED_INDEX}",
+                                         "cross_partition_categories": ["doutrina"]}},
+        categories={"irpj_csll": "tributos_federais", "pis_cofins": "tributos_federais",
+                    "doutrina_geral": "doutrina"},
+    )
+    return KnowledgeRetriever(registry)
+
+
+def test_partitions_are_stored_with_the_index(tmp_path, retriever):
+    store = VectorStore.load(tmp_path / "indices" / UNIFIED_INDEX)
+    assert store.partitions == list(KNOWLEDGE)
+    assert np.asarray(store.record_partitions).tolist() == [0, 1, 2]
+    assert store.partition_mask(["pis_cofins", "outro"]).tolist() == [False, True, False]
+
+
+def test_agent_searches_only_its_partition(retriever):
+    result = retriever.retrieve("irpj_csll", "multa de ofício")
+    assert (result.record_ids, result.partitions) == (["IRPJ-1"], ["irpj_csll"])
+    assert retriever.loaded_agents() == [UNIFIED_INDEX]
+
+
+def test_requested_partitions_and_categories(retriever):
+    assert sorted(retriever.retrieve("irpj_csll", "multa", partitions=["pis_cofins", "irpj_csll"]).record_ids) == [
+        "IRPJ-1", "PIS-1"
+    ]
+    assert retriever.retrieve("irpj_csll", "multa", partitions="tributos_federais").partitions == [
+        "irpj_csll", "pis_cofins"
+    ]
+    assert len(retriever.retrieve("irpj_csll", "multa", partitions="*").record_ids) == 3
+
+
+def test_cross_partition_category_searches_everything(retriever):
+    result = retriever.retrieve("doutrina_geral", "multa de ofício")
+    assert result.partitions == list(KNOWLEDGE)
+    assert sorted(result.record_ids) == ["DOU-1", "IRPJ-1", "PIS-1"]
@@ -0,0 +1,93 @@
+"""Índice mapeado em memória: leitura da geração publicada e pré-carga dos agentes mais consultados."""
+import numpy as np
+import pytest
+
+from shared.hashed_embedder import HashedNgramEmbedder
+from shared.index_builder import IndexBuilder
+from shared.index_prefetcher import IndexPrefetcher, TrafficCounter
+from shared.vector_store import MANIFEST_FILE, RECORDS_FILE, JsonlReader, VectorStore, generation_dir
+
+from tests.test_index_builder import write_knowledge
+
+
+@pytest.fixture
+def built(tmp_path):
+    knowledge = tmp_path / "knowledge"
+    knowledge.mkdir()
+    write_knowledge(knowledge / "base.txt", 30, 1)
+    IndexBuilder(HashedNgramEmbedder(dim=64)).build("agente", knowledge, tmp_path / "index")
+    return knowledge, tmp_path / "index"
+
+
+def test_load_maps_the_published_generation(built):
+    knowledge, index_dir = built
+    store = VectorStore.load(index_dir)
+
+    assert store.path == generation_dir(index_dir, store.manifest) != index_dir
+    assert isinstance(store.vectors, np.memmap) and isinstance(store.chunk_records, np.memmap)
+    assert isinstance(store.records, JsonlReader)
+    assert not (index_dir / RECORDS_FILE).exists()
+    assert (index_dir / MANIFEST_FILE).exists()
+
+
+def test_mapped_store_matches_in_memory_store(built):
+    knowledge, index_dir = built
+    mapped = VectorStore.load(index_dir)
+    loaded = VectorStore.load(index_dir, mmap_mode=None)
+    fresh = VectorStore.from_knowledge(knowledge, HashedNgramEmbedder(dim=64))
+
+    assert [record["ID"] for record in mapped.records] == [record["ID"] for record in fresh.records]
+    assert mapped.records[-1] == loaded.records[-1]
+    np.testing.assert_allclose(np.asarray(mapped.vectors), fresh.vectors, atol=1e-6)
+    for query in ("Registro 7 dedutibilidade", "Tema 21"):
+        assert mapped.search_records(query, 3) == pytest.approx(fresh.search_records(query, 3))
+
+
+def test_jsonl_reader(tmp_path):
+    path = tmp_path / "records.jsonl"
+    path.write_text('{"ID": "a"}\n{"ID": "b"}\n{"ID": "ç"}', encoding="utf-8")
+    reader = JsonlReader(path)
+
+    assert len(reader) == 3
+    assert (reader[0]["ID"], reader[-1]["ID"]) == ("a", "ç")
+    assert [record["ID"] for record in reader[1:]] == ["b", "ç"]
+    with pytest.raises(IndexError):
+        reader[3]
+
+    (tmp_path / "empty.jsonl").write_bytes(b"")
+    assert len(JsonlReader(tmp_path / "empty.jsonl")) == 0
+
+
+def test_traffic_counter_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("shared.index_prefetcher.time.monotonic", lambda: now[0])
+    counter = TrafficCounter(window_seconds=60)
+    for agent_id in ["irpj_csll", "irpj_csll", "pis_cofins"]:
+        counter.record(agent_id)
+    now[0] += 30
+    counter.record("icms_sp")
+    assert counter.top(2) == [("irpj_csll", 2), ("pis_cofins", 1)]
+
+    now[0] += 45
+    assert counter.top(5) == [("icms_sp", 1)]
+
+
+def test_prefetcher_warms_top_agents_and_survives_failures():
+    class Retriever:
+        traffic = TrafficCounter()
+        warmed = []
+
+        def warm(self, agent_id):
+            if agent_id == "quebrado":
+                raise OSError("índice corrompido")
+            self.warmed.append(agent_id)
+            return agent_id != "sem_indice"
+
+    retriever = Retriever()
+    for agent_id in ["irpj_csll"] * 3 + ["quebrado"] * 2 + ["sem_indice", "icms_sp"]:
+        retriever.traffic.record(agent_id)
+
+    prefetcher = IndexPrefetcher(retriever, top_n=3)
+    assert prefetcher.run_once() == ["irpj_csll"]
+    assert retriever.warmed == ["irpj_csll", "sem_indice"]
+    assert list(prefetcher.warmed) == ["irpj_csll"]